@@ -0,0 +1,104 @@
+"""
+Compare the direct solve of scenario LCAs (one LU factorization per scenario)
+with the iterative solve warm-started from the factorization of the source database.
+
+Usage: python benchmarks/benchmark_lca.py [n_activities] [n_scenarios] [n_changes] [n_functional_units]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from premise.lca import LCA
+from premise.utils import copy_database
+
+
+def make_database(n_activities, n_inputs=10, seed=0):
+    rng = np.random.default_rng(seed)
+    db = []
+    for i in range(n_activities):
+        exchanges = [
+            {
+                "name": f"activity {i}",
+                "product": f"product {i}",
+                "unit": "kilogram",
+                "location": "GLO",
+                "amount": 1,
+                "type": "production",
+            }
+        ]
+        # mostly upstream suppliers, and one random supplier to create loops
+        upstream = rng.integers(0, max(i, 1), n_inputs - 1)
+        for j in set(upstream) | {rng.integers(n_activities)}:
+            exchanges.append(
+                {
+                    "name": f"activity {j}",
+                    "product": f"product {j}",
+                    "unit": "kilogram",
+                    "location": "GLO",
+                    "amount": rng.uniform(0, 1 / n_inputs),
+                    "type": "technosphere",
+                }
+            )
+        db.append(
+            {
+                "name": f"activity {i}",
+                "reference product": f"product {i}",
+                "unit": "kilogram",
+                "location": "GLO",
+                "exchanges": exchanges,
+            }
+        )
+    return db
+
+
+def make_scenario(db, n_changes, seed):
+    rng = np.random.default_rng(seed)
+    scenario = copy_database(db)
+    for i in rng.choice(len(db), n_changes, replace=False):
+        exc = scenario[i]["exchanges"][rng.integers(1, len(scenario[i]["exchanges"]))]
+        exc["amount"] *= rng.uniform(0.5, 1.5)
+    return scenario
+
+
+def main(n_activities=3000, n_scenarios=10, n_changes=400, n_fu=3):
+    db = make_database(n_activities)
+    scenarios = [make_scenario(db, n_changes, seed) for seed in range(n_scenarios)]
+    functional_units = [
+        {(f"activity {i}", f"product {i}", "kilogram", "GLO"): 1} for i in range(n_fu)
+    ]
+
+    base = LCA(db)
+    start = time.perf_counter()
+    base.factorize()
+    base_time = time.perf_counter() - start
+
+    direct_time, iterative_time, error = 0, 0, 0
+    for scenario in scenarios:
+        direct, iterative = LCA(scenario), LCA(scenario)
+
+        start = time.perf_counter()
+        expected = direct.solve(functional_units)
+        direct_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        supply = iterative.solve(functional_units, base)
+        iterative_time += time.perf_counter() - start
+
+        error = max(error, np.abs(supply - expected).max() / np.abs(expected).max())
+
+    print(
+        f"{n_scenarios} scenarios of {n_activities} activities, "
+        f"{n_changes} changed exchanges, {n_fu} functional units"
+    )
+    print(f"direct solve: {direct_time:.2f} s")
+    print(
+        f"warm-started iterative solve: {iterative_time:.2f} s "
+        f"(+ {base_time:.2f} s to factorize the source database)"
+    )
+    print(f"max. relative difference: {error:.1e}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
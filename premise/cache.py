@@ -0,0 +1,171 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+
+from . import DATA_DIR, __version__
+
+CACHE_DIR = DATA_DIR / "cache"
+
+
+def get_file_hash(filepath):
+    """
+    Return the SHA-256 hash of the content of a file.
+
+    :param filepath: path to the file
+    :type filepath: str or pathlib.Path
+    :return: hexadecimal hash of the file content
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_cache_key(*args):
+    """
+    Return a key identifying a cached object, built from the
+    representation of `args` and the version of `premise`.
+
+    :return: hexadecimal hash
+    :rtype: str
+    """
+    return hashlib.sha256(repr((__version__,) + args).encode("utf-8")).hexdigest()
+
+
+def get_cache_filepath(category, key, extension="pickle"):
+    """
+    Return the path of the cache file for `key`.
+
+    :param category: type of cached object, used as sub-directory name
+    :type category: str
+    :param key: cache key, from :func:`get_cache_key`
+    :type key: str
+    :param extension: file extension
+    :type extension: str
+    :rtype: pathlib.Path
+    """
+    return CACHE_DIR / category / f"{key}.{extension}"
+
+
+def load_bytes_from_cache(category, key, extension):
+    """
+    Return the content of the cache file for `key`, or None if there is none.
+
+    :param category: type of cached object
+    :type category: str
+    :param key: cache key, from :func:`get_cache_key`
+    :type key: str
+    :param extension: file extension
+    :type extension: str
+    :rtype: bytes
+    """
+    filepath = get_cache_filepath(category, key, extension)
+
+    if not filepath.is_file():
+        return None
+
+    try:
+        with open(filepath, "rb") as f:
+            return f.read()
+    except OSError:
+        print(f"Could not read the cache file {filepath}, it will be ignored.")
+        return None
+
+
+def write_cache_file(filepath, write):
+    """
+    Write a cache file by calling `write` with a binary file object.
+    The file is first written under a temporary name and then renamed,
+    so that concurrent processes never read a partially written file.
+    Failing to write the cache does not raise an error.
+
+    :param filepath: path of the cache file
+    :type filepath: pathlib.Path
+    :param write: function that writes the content to the file object it receives
+    :type write: callable
+    """
+    tmp_filepath = None
+
+    try:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_filepath = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_filepath, filepath)
+    except OSError as err:
+        print(f"Could not write the cache file {filepath}: {err}")
+        if tmp_filepath is not None and os.path.exists(tmp_filepath):
+            os.remove(tmp_filepath)
+
+
+def save_bytes_to_cache(category, key, data, extension):
+    """
+    Write `data` to the cache file for `key`.
+
+    :param category: type of cached object
+    :type category: str
+    :param key: cache key, from :func:`get_cache_key`
+    :type key: str
+    :param data: content to write
+    :type data: bytes
+    :param extension: file extension
+    :type extension: str
+    """
+    write_cache_file(
+        get_cache_filepath(category, key, extension), lambda f: f.write(data)
+    )
+
+
+def load_from_cache(category, key):
+    """
+    Return the object cached under `key`, or None if there is none.
+
+    :param category: type of cached object
+    :type category: str
+    :param key: cache key, from :func:`get_cache_key`
+    :type key: str
+    """
+    filepath = get_cache_filepath(category, key)
+
+    if not filepath.is_file():
+        return None
+
+    try:
+        with open(filepath, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        print(f"Could not read the cache file {filepath}, it will be ignored.")
+        return None
+
+
+def save_to_cache(category, key, obj):
+    """
+    Store `obj` in the cache under `key`, as a pickle.
+    Failing to write the cache does not raise an error.
+
+    :param category: type of cached object
+    :type category: str
+    :param key: cache key, from :func:`get_cache_key`
+    :type key: str
+    :param obj: object to cache
+    """
+    write_cache_file(
+        get_cache_filepath(category, key),
+        lambda f: pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL),
+    )
+
+
+def clear_cache(category=None):
+    """
+    Delete cached objects.
+
+    :param category: type of cached objects to delete. If None, the whole cache is deleted.
+    :type category: str
+    """
+    path = CACHE_DIR if category is None else CACHE_DIR / category
+    if path.is_dir():
+        shutil.rmtree(path)
@@ -3,6 +3,7 @@ import uuid
 
 import wurst.searching as ws
 
+from .dataset_index import DatasetIndex
 from .geomap import Geomap
 
 
@@ -21,6 +22,7 @@ class Cars:
 
     def __init__(self, db, iam_data, pathway, year, model):
         self.db = db
+        self.index = DatasetIndex(self.db)
         self.iam_data = iam_data
         self.geo = Geomap(model=model)
         self.pathway = pathway
@@ -100,13 +102,7 @@ class Cars:
 
         def producer_in_locations(locs):
 
-            possible_producers = list(
-                ws.get_many(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.either(*[ws.equals("location", loc) for loc in locs]),
-                )
-            )
+            possible_producers = self.index.get_many(name, location=locs)
 
             if len(possible_producers) == 1:
                 selected_producer = possible_producers[0]
@@ -149,7 +145,7 @@ class Cars:
 
             if prod is None:
                 # let's use "any" dataset
-                producers = list(ws.get_many(self.db, ws.equals("name", name)))
+                producers = self.index.get_many(name)
                 if len(producers) == 0:
                     raise ValueError("No producers found for {}.".format(name))
                 prod = producers[0]
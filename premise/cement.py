@@ -8,6 +8,7 @@ from wurst import searching as ws
 from wurst import transformations as wt
 
 from .activity_maps import InventorySet
+from .dataset_index import ConsumerIndex, DatasetIndex
 from .geomap import Geomap
 from .utils import *
 
@@ -22,12 +23,15 @@ class Cement:
 
     def __init__(self, db, model, scenario, iam_data, year, version):
         self.db = db
+        self.index = DatasetIndex(self.db)
+        self.consumers = ConsumerIndex(self.db)
         self.model = model
         self.scenario = scenario
         self.iam_data = iam_data
         self.year = year
         self.version = version
         self.geo = Geomap(model=model)
+        self.relinker = Relinker(self.db, self.model, index=self.index)
 
         self.clinker_ratio_eco = get_clinker_ratio_ecoinvent(version)
         self.clinker_ratio_remind = get_clinker_ratio_remind(self.year)
@@ -50,11 +54,7 @@ class Cement:
 
         d_map = {
             self.geo.ecoinvent_to_iam_location(d["location"]): d["location"]
-            for d in ws.get_many(
-                self.db,
-                ws.equals("name", name),
-                ws.equals("reference product", ref_prod),
-            )
+            for d in self.index.get_many(name, reference_product=ref_prod)
         }
 
         list_iam_regions = [
@@ -69,11 +69,8 @@ class Cement:
 
         for d in d_iam_to_eco:
             try:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.equals("reference product", ref_prod),
-                    ws.equals("location", d_iam_to_eco[d]),
+                ds = self.index.get_one(
+                    name, reference_product=ref_prod, location=d_iam_to_eco[d]
                 )
 
                 d_act[d] = wt.copy_to_new_location(ds, d)
@@ -86,11 +83,6 @@ class Cement:
                 if "input" in d_act[d]:
                     d_act[d].pop("input")
 
-                if relink:
-                    d_act[d] = relink_technosphere_exchanges(
-                        d_act[d], self.db, self.model
-                    )
-
             except ws.NoResults:
                 print(
                     "No dataset {} found for the {} region {}".format(
@@ -99,10 +91,12 @@ class Cement:
                 )
                 continue
 
+        if relink:
+            self.relinker.relink_many(d_act.values())
+
         deleted_markets = [
             (act["name"], act["reference product"], act["location"])
-            for act in self.db
-            if (act["name"], act["reference product"]) == (name, ref_prod)
+            for act in self.index.get_many(name, reference_product=ref_prod)
         ]
 
         with open(
@@ -117,11 +111,15 @@ class Cement:
                 writer.writerow(line)
 
         # Remove old datasets
+        for act in self.index.get_many(name, reference_product=ref_prod):
+            self.consumers.remove(act)
+
         self.db = [
             act
             for act in self.db
             if (act["name"], act["reference product"]) != (name, ref_prod)
         ]
+        self.index.refresh(self.db)
 
         return d_act
 
@@ -742,7 +740,7 @@ class Cement:
 
                 ccs = wt.copy_to_new_location(ds, v["location"])
                 ccs["code"] = str(uuid.uuid4().hex)
-                ccs = relink_technosphere_exchanges(ccs, self.db, self.model)
+                ccs = self.relinker.relink(ccs)
 
                 if "input" in ccs:
                     ccs.pop("input")
@@ -814,10 +812,11 @@ class Cement:
                     exc["amount"] = np.clip(3.66 - excess_heat_generation, 0, 3.66)
 
                 # then, we need to find local suppliers of electricity, water, steam, etc.
-                relink_technosphere_exchanges(ccs, self.db, self.model)
+                self.relinker.relink(ccs)
 
                 # we add this new dataset to the database
                 self.db.append(ccs)
+                self.consumers.add(ccs)
 
                 # add an input from this CCS dataset in the clinker dataset
                 ccs_exc = {
@@ -905,71 +904,75 @@ class Cement:
         """
 
         list_ds = [
-            (ds["name"], ds["reference product"], ds["location"]) for ds in self.db
+            (ds["name"], ds["reference product"], ds["location"])
+            for ds in self.index.get_many(name, reference_product=ref_product)
         ]
 
-        for act in self.db:
-            excs = [
-                exc
-                for exc in act["exchanges"]
-                if (exc["name"], exc.get("product")) == (name, ref_product)
-                and exc["type"] == "technosphere"
-            ]
+        for act in self.consumers.consumers(name, ref_product):
+            with self.consumers.editing(act):
+                excs = [
+                    exc
+                    for exc in act["exchanges"]
+                    if (exc["name"], exc.get("product")) == (name, ref_product)
+                    and exc["type"] == "technosphere"
+                ]
 
-            amount = 0
-            for exc in excs:
-                amount += exc["amount"]
-                act["exchanges"].remove(exc)
+                amount = 0
+                for exc in excs:
+                    amount += exc["amount"]
+                    act["exchanges"].remove(exc)
 
-            if amount > 0:
-                new_exc = {
-                    "name": name,
-                    "product": ref_product,
-                    "amount": amount,
-                    "type": "technosphere",
-                    "unit": "kilogram",
-                }
-
-                if (name, ref_product, act["location"]) in list_ds:
-                    new_exc["location"] = act["location"]
-                else:
-                    try:
-                        new_loc = self.geo.ecoinvent_to_iam_location(act["location"])
-                    except KeyError:
-                        new_loc = ""
+                if amount > 0:
+                    new_exc = {
+                        "name": name,
+                        "product": ref_product,
+                        "amount": amount,
+                        "type": "technosphere",
+                        "unit": "kilogram",
+                    }
 
-                    if (name, ref_product, new_loc) in list_ds:
-                        new_exc["location"] = new_loc
+                    if (name, ref_product, act["location"]) in list_ds:
+                        new_exc["location"] = act["location"]
                     else:
-                        # new locations in ei3.7, not yet defined in `constructive_geometries`
-                        if act["location"] in (
-                            "North America without Quebec",
-                            "US only",
-                        ):
-                            new_loc = self.geo.ecoinvent_to_iam_location("US")
-                            new_exc["location"] = new_loc
-
-                        elif act["location"] in ("RoW", "GLO"):
-                            new_loc = self.geo.ecoinvent_to_iam_location("CN")
-                            new_exc["location"] = new_loc
+                        try:
+                            new_loc = self.geo.ecoinvent_to_iam_location(
+                                act["location"]
+                            )
+                        except KeyError:
+                            new_loc = ""
 
-                        elif act["location"] in (
-                            "RER w/o RU",
-                            "WECC",
-                            "UCTE without Germany",
-                        ):
-                            new_loc = self.geo.ecoinvent_to_iam_location("RER")
+                        if (name, ref_product, new_loc) in list_ds:
                             new_exc["location"] = new_loc
-
                         else:
-                            print(
-                                "Issue with {} used in {}: cannot find the IAM equivalent for "
-                                "the location {}".format(
-                                    name, act["name"], act["location"]
+                            # new locations in ei3.7, not yet defined in `constructive_geometries`
+                            if act["location"] in (
+                                "North America without Quebec",
+                                "US only",
+                            ):
+                                new_loc = self.geo.ecoinvent_to_iam_location("US")
+                                new_exc["location"] = new_loc
+
+                            elif act["location"] in ("RoW", "GLO"):
+                                new_loc = self.geo.ecoinvent_to_iam_location("CN")
+                                new_exc["location"] = new_loc
+
+                            elif act["location"] in (
+                                "RER w/o RU",
+                                "WECC",
+                                "UCTE without Germany",
+                            ):
+                                new_loc = self.geo.ecoinvent_to_iam_location("RER")
+                                new_exc["location"] = new_loc
+
+                            else:
+                                print(
+                                    "Issue with {} used in {}: cannot find the IAM equivalent for "
+                                    "the location {}".format(
+                                        name, act["name"], act["location"]
+                                    )
                                 )
-                            )
 
-                act["exchanges"].append(new_exc)
+                    act["exchanges"].append(new_exc)
 
     def adjust_clinker_ratio(self, d_act):
         """Adjust the cement suppliers composition for "cement, unspecified", in order to reach
@@ -1174,6 +1177,8 @@ class Cement:
             d for d in self.build_clinker_production_datasets().values()
         ]
         self.db.extend(clinker_prod_datasets)
+        for dataset in clinker_prod_datasets:
+            self.consumers.add(dataset)
 
         created_datasets.extend(
             [
@@ -1187,6 +1192,8 @@ class Cement:
             d for d in self.build_clinker_market_datasets().values()
         ]
         self.db.extend(clinker_market_datasets)
+        for dataset in clinker_market_datasets:
+            self.consumers.add(dataset)
 
         created_datasets.extend(
             [
@@ -1209,6 +1216,8 @@ class Cement:
 
         act_cement_unspecified = self.adjust_clinker_ratio(act_cement_unspecified)
         self.db.extend([v for v in act_cement_unspecified.values()])
+        for dataset in act_cement_unspecified.values():
+            self.consumers.add(dataset)
 
         created_datasets.extend(
             [
@@ -1288,6 +1297,8 @@ class Cement:
             ):
                 act_cement = self.fetch_proxies(i[0], i[1])
                 self.db.extend([v for v in act_cement.values()])
+                for dataset in act_cement.values():
+                    self.consumers.add(dataset)
                 created_datasets.extend(
                     [
                         (act["name"], act["reference product"], act["location"])
@@ -1362,6 +1373,8 @@ class Cement:
             ):
                 act_cement = self.update_cement_production_datasets(i[0], i[1])
                 self.db.extend([v for v in act_cement.values()])
+                for dataset in act_cement.values():
+                    self.consumers.add(dataset)
 
                 created_datasets.extend(
                     [
@@ -1489,6 +1502,8 @@ class Cement:
             ):
                 act_cement = self.fetch_proxies(i[0], i[1])
                 self.db.extend([v for v in act_cement.values()])
+                for dataset in act_cement.values():
+                    self.consumers.add(dataset)
 
                 created_datasets.extend(
                     [
@@ -1636,6 +1651,8 @@ class Cement:
             ):
                 act_cement = self.update_cement_production_datasets(i[0], i[1])
                 self.db.extend([v for v in act_cement.values()])
+                for dataset in act_cement.values():
+                    self.consumers.add(dataset)
 
                 created_datasets.extend(
                     [
@@ -1,6 +1,8 @@
 import csv
+import os
 import pprint
 
+import bw2data
 import bw2io
 import wurst
 from bw2data.database import DatabaseChooser
@@ -48,6 +50,39 @@ class DatabaseCleaner:
             # Parameter field is converted from a list to a dictionary
             self.transform_parameter_field()
 
+    @staticmethod
+    def get_source_fingerprint(source_db, source_type, source_file_path):
+        """
+        Return a tuple that identifies the state of the source database, without extracting it.
+        For a brightway database, it is made of the project name, the database name,
+        its number of activities and its last modification time.
+        For ecospold files, it is made of the name, size and modification time of each file.
+
+        :param source_db: name of the source database
+        :type source_db: str
+        :param source_type: type of the database source. Can be ´brightway´ or 'ecospold'.
+        :type source_type: str
+        :param source_file_path: filepath of the database if `source_type` == 'ecospold'.
+        :type source_file_path: str
+        :return: fingerprint of the source database
+        :rtype: tuple
+        """
+
+        if source_type == "brightway":
+            return (
+                bw2data.projects.current,
+                source_db,
+                len(DatabaseChooser(source_db)),
+                bw2data.databases.get(source_db, {}).get("modified"),
+            )
+
+        files = sorted(
+            (f.name, f.stat().st_size, f.stat().st_mtime_ns)
+            for f in os.scandir(source_file_path)
+            if f.is_file()
+        )
+        return str(source_file_path), source_db, tuple(files)
+
     def add_negative_CO2_flows_for_biomass_ccs(self):
         """
         Rescale the amount of all exchanges of carbon dioxide, non-fossil by a factor -9 (.9/-.1),
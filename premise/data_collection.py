@@ -1,11 +1,19 @@
 import csv
-from io import StringIO
+from io import BytesIO, StringIO
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
-from cryptography.fernet import Fernet
+import xarray as xr
+from cryptography.fernet import Fernet, InvalidToken
 
 from . import DATA_DIR
+from .cache import (
+    get_cache_key,
+    get_file_hash,
+    load_bytes_from_cache,
+    save_bytes_to_cache,
+)
 
 IAM_ELEC_MARKETS = DATA_DIR / "electricity" / "electricity_markets.csv"
 IAM_ELEC_EFFICIENCIES = DATA_DIR / "electricity" / "electricity_efficiencies.csv"
@@ -13,6 +21,28 @@ IAM_ELEC_EMISSIONS = DATA_DIR / "electricity" / "electricity_emissions.csv"
 GAINS_TO_IAM_FILEPATH = DATA_DIR / "GAINS_emission_factors" / "GAINStoREMINDtechmap.csv"
 GNR_DATA = DATA_DIR / "cement" / "additional_data_GNR.csv"
 
+# strings read as missing values in IAM result files
+MISSING_VALUES = {
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "n/a",
+    "nan",
+    "null",
+}
+
 
 class IAMDataCollection:
     """
@@ -20,15 +50,31 @@ class IAMDataCollection:
 
     :ivar pathway: name of a IAM pathway
     :vartype pathway: str
+    :ivar use_cache: if True, parsed IAM data is stored in the local cache and reloaded from it
+    :vartype use_cache: bool
+    :ivar iam_data_cache: IAM data already parsed, by cache key, to share between the scenarios
+        of a :class:`.NewDatabase` that use the same IAM result file
+    :vartype iam_data_cache: dict
 
     """
 
-    def __init__(self, model, pathway, year, filepath_iam_files, key):
+    def __init__(
+        self,
+        model,
+        pathway,
+        year,
+        filepath_iam_files,
+        key,
+        use_cache=False,
+        iam_data_cache=None,
+    ):
         self.model = model
         self.pathway = pathway
         self.year = year
         self.filepath_iam_files = filepath_iam_files
         self.key = key
+        self.use_cache = use_cache
+        self.iam_data_cache = {} if iam_data_cache is None else iam_data_cache
         self.data = self.get_iam_data()
         self.regions = [r for r in self.data.region.values]
 
@@ -112,6 +158,11 @@ class IAMDataCollection:
         * variable
         * year
 
+        Parsed data is kept in :attr:`iam_data_cache`, so that scenarios using the same IAM
+        result file do not parse it again, and, if :attr:`use_cache` is True, on disk as well.
+        The cache key is based on the content of the file and on the decryption key.
+        If the file is encrypted, the data cached on disk is encrypted as well.
+
         :return: an multi-dimensional array with IAM data
         :rtype: xarray.core.dataarray.DataArray
 
@@ -120,51 +171,120 @@ class IAMDataCollection:
         file_ext = self.model + "_" + self.pathway + ".csv"
         filepath = Path(self.filepath_iam_files) / file_ext
 
-        if self.key is None:
+        if self.key is None and not filepath.is_file():
             # Uses a non-encrypted file
-            try:
-                with open(filepath, "rb") as file:
-                    # read the encrypted data
-                    encrypted_data = file.read()
-            except FileNotFoundError:
-                file_ext = self.model + "_" + self.pathway + ".mif"
-                filepath = Path(self.filepath_iam_files) / file_ext
-                with open(filepath, "rb") as file:
-                    # read the encrypted data
-                    encrypted_data = file.read()
-
-            # create a temp csv-like file to pass to pandas.read_csv()
-            DATA = StringIO(str(encrypted_data, "latin-1"))
+            file_ext = self.model + "_" + self.pathway + ".mif"
+            filepath = Path(self.filepath_iam_files) / file_ext
 
-        else:
-            # Uses an encrypted file
-            f = Fernet(self.key)
-            with open(filepath, "rb") as file:
-                # read the encrypted data
-                encrypted_data = file.read()
+        cache_key = get_cache_key(self.model, get_file_hash(filepath), self.key)
+
+        if cache_key not in self.iam_data_cache:
+            array = self.load_iam_data_from_cache(cache_key) if self.use_cache else None
+
+            if array is None:
+                if self.key is None:
+                    # the file is read line by line
+                    with open(filepath, encoding="latin-1", newline="") as file:
+                        array = self.parse_iam_data(file)
+                else:
+                    # an encrypted file can only be decrypted as a whole
+                    with open(filepath, "rb") as file:
+                        data = Fernet(self.key).decrypt(file.read())
+
+                    # wrap the decoded content in a file-like object
+                    array = self.parse_iam_data(StringIO(str(data, "latin-1")))
+
+                if self.use_cache:
+                    self.save_iam_data_to_cache(cache_key, array)
+
+            self.iam_data_cache[cache_key] = array
+
+        return self.iam_data_cache[cache_key].copy()
+
+    def load_iam_data_from_cache(self, cache_key):
+        """
+        Load parsed IAM data from the disk cache.
+
+        :param cache_key: cache key of the IAM result file
+        :type cache_key: str
+        :return: an multi-dimensional array with IAM data, or None if not cached
+        :rtype: xarray.core.dataarray.DataArray
+        """
+
+        data = load_bytes_from_cache("iam_data", cache_key, "npz")
+
+        if data is None:
+            return None
+
+        try:
+            if self.key is not None:
+                data = Fernet(self.key).decrypt(data)
+
+            with np.load(BytesIO(data)) as npz:
+                return xr.DataArray(
+                    npz["values"],
+                    coords=[
+                        ("region", npz["region"].astype(object)),
+                        ("variables", npz["variables"].astype(object)),
+                        ("year", npz["year"]),
+                    ],
+                    name="value",
+                )
+        except (InvalidToken, OSError, ValueError, KeyError):
+            print("Could not read cached IAM data, the IAM file will be parsed.")
+            return None
+
+    def save_iam_data_to_cache(self, cache_key, array):
+        """
+        Save parsed IAM data to the disk cache, as a `npz` file.
+
+        :param cache_key: cache key of the IAM result file
+        :type cache_key: str
+        :param array: an multi-dimensional array with IAM data
+        :type array: xarray.core.dataarray.DataArray
+        """
+
+        buffer = BytesIO()
+        np.savez(
+            buffer,
+            values=array.values,
+            region=array.region.values.astype(str),
+            variables=array.variables.values.astype(str),
+            year=array.year.values,
+        )
+        data = buffer.getvalue()
+
+        if self.key is not None:
+            data = Fernet(self.key).encrypt(data)
+
+        save_bytes_to_cache("iam_data", cache_key, data, "npz")
+
+    def parse_iam_data(self, data):
+        """
+        Parse the content of a IAM result file.
+        The file is read line by line, and only the variables needed are kept,
+        before being arranged in an array. Values reported several times
+        for the same region, variable and year (e.g., in different units) are averaged.
+
+        :param data: content of the IAM result file, as a text file object
+        :type data: io.TextIOBase
+        :return: an multi-dimensional array with IAM data
+        :rtype: xarray.core.dataarray.DataArray
+        """
 
-            # decrypt data
-            decrypted_data = f.decrypt(encrypted_data)
-            DATA = StringIO(str(decrypted_data, "latin-1"))
+        reader = csv.reader(data, delimiter=";")
+        header = next(reader)
 
         if self.model == "remind":
-            df = pd.read_csv(
-                DATA,
-                sep=";",
-                index_col=["Region", "Variable", "Unit"],
-                encoding="latin-1",
-            ).drop(columns=["Model", "Scenario"])
-
-            # Filter the dataframe
+            index_cols = [header.index(c) for c in ("Region", "Variable", "Unit")]
+
+            # Filter the data
             list_var = ("SE", "Tech", "FE", "Production", "Emi|CCO2", "Emi|CO2")
 
         elif self.model == "image":
+            index_cols = [2, 3, 4]
 
-            df = pd.read_csv(
-                DATA, index_col=[2, 3, 4], encoding="latin-1", sep=";"
-            ).drop(columns=["Model", "Scenario"])
-
-            # Filter the dataframe
+            # Filter the data
             list_var = (
                 "Secondary Energy",
                 "Efficiency",
@@ -179,30 +299,68 @@ class IAMDataCollection:
                 )
             )
 
-        if len(df.columns == 20):
-            df.drop(columns=df.columns[-1], inplace=True)
+        excluded_cols = set(index_cols) | {
+            header.index("Model"),
+            header.index("Scenario"),
+        }
+        # the last column is empty, as lines end with a separator
+        year_cols = [i for i in range(len(header)) if i not in excluded_cols][:-1]
+        years = [int(header[i]) for i in year_cols]
+
+        region_col, variable_col = index_cols[:2]
+        sums, counts = {}, {}
+
+        for row in reader:
+            if not row:
+                continue
+
+            region, variable = row[region_col], row[variable_col]
+
+            if (
+                not variable.startswith(list_var)
+                or region in MISSING_VALUES
+                or variable in MISSING_VALUES
+            ):
+                continue
+
+            values = np.array(
+                [
+                    np.nan
+                    if i >= len(row) or row[i] in MISSING_VALUES
+                    else float(row[i])
+                    for i in year_cols
+                ]
+            )
 
-        df.columns = df.columns.astype(int)
-        df = df.reset_index()
+            if (region, variable) not in sums:
+                sums[(region, variable)] = np.zeros(len(years))
+                counts[(region, variable)] = np.zeros(len(years))
 
-        df = df.loc[df["Variable"].str.startswith(list_var)]
+            sums[(region, variable)] += np.nan_to_num(values)
+            counts[(region, variable)] += ~np.isnan(values)
 
-        df = df.rename(
-            columns={"Region": "region", "Variable": "variables", "Unit": "unit"}
-        )
+        regions = sorted({r for r, _ in sums})
+        variables = sorted({v for _, v in sums})
+        region_index = {r: i for i, r in enumerate(regions)}
+        variable_index = {v: i for i, v in enumerate(variables)}
 
-        array = (
-            df.melt(
-                id_vars=["region", "variables", "unit"],
-                var_name="year",
-                value_name="value",
-            )[["region", "variables", "year", "value"]]
-            .groupby(["region", "variables", "year"])["value"]
-            .mean()
-            .to_xarray()
-        )
+        values = np.full((len(regions), len(variables), len(years)), np.nan)
 
-        return array
+        for (region, variable), total in sums.items():
+            count = counts[(region, variable)]
+            values[region_index[region], variable_index[variable]] = np.divide(
+                total, count, out=np.full(len(years), np.nan), where=count > 0
+            )
+
+        return xr.DataArray(
+            values,
+            coords=[
+                ("region", np.array(regions, dtype=object)),
+                ("variables", np.array(variables, dtype=object)),
+                ("year", np.array(years, dtype=np.int64)),
+            ],
+            name="value",
+        )
 
     @staticmethod
     def get_gains_data():
@@ -0,0 +1,419 @@
+import bisect
+from collections import defaultdict
+from contextlib import contextmanager
+
+from wurst import searching as ws
+
+
+class DatasetIndex:
+    """
+    Hash-based index over the datasets of a wurst database, to avoid
+    full scans of the database with `wurst.searching` filters.
+
+    Datasets are indexed by (name, reference product, location, unit) and by name.
+    Results are returned in the order in which datasets appear in the database.
+
+    The index holds a reference to the database list. Datasets appended
+    to (or removed from) that list are picked up at the next lookup:
+    the index is extended if the datasets indexed so far are still at the head of the list,
+    and is rebuilt otherwise.
+    If the database list is replaced by another list, :meth:`refresh` must be called
+    with the new list. If datasets of the list are replaced in place (`db[i] = ds`),
+    or if the name, reference product, location or unit of a dataset of the list is changed,
+    :meth:`rebuild` must be called: neither can be detected without going through the whole list.
+
+    :ivar db: database in list-of-dict format
+    :vartype db: list
+
+    """
+
+    def __init__(self, db):
+        self.db = None
+        self.refresh(db)
+
+    @staticmethod
+    def get_key(ds):
+        """
+        Return the (name, reference product, location, unit) key of a dataset.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        :return: dataset key
+        :rtype: tuple
+        """
+        return ds["name"], ds["reference product"], ds["location"], ds["unit"]
+
+    def refresh(self, db=None):
+        """
+        Bring the index in sync with the database.
+        If `db` is given and is not the list currently indexed, the index is rebuilt from `db`.
+        Otherwise, datasets appended to the indexed list since the last lookup are indexed,
+        and the index is rebuilt if datasets were removed from it, which shifts
+        the last indexed dataset from its position.
+
+        :param db: database in list-of-dict format
+        :type db: list
+        """
+
+        if db is not None and db is not self.db:
+            self.db = db
+            self._build()
+        elif self.size and (
+            len(self.db) < self.size or self.db[self.size - 1] is not self.last
+        ):
+            self._build()
+        elif len(self.db) > self.size:
+            for ds in self.db[self.size :]:
+                self._add(ds)
+
+    def rebuild(self):
+        """
+        Rebuild the index from the indexed list, after datasets of the list were
+        replaced in place, or renamed or relocated.
+        """
+        self._build()
+
+    def _build(self):
+        self.by_key = defaultdict(list)
+        self.by_name = defaultdict(list)
+        self.order = {}
+        self.size = 0
+        self.last = None
+        self._sorted_names = None
+
+        for ds in self.db:
+            self._add(ds)
+
+    def _add(self, ds):
+        self.order[id(ds)] = self.size
+        self.size += 1
+        self.last = ds
+
+        if ds["name"] not in self.by_name:
+            self._sorted_names = None
+
+        self.by_key[self.get_key(ds)].append(ds)
+        self.by_name[ds["name"]].append(ds)
+
+    def _sort(self, datasets):
+        return sorted(datasets, key=lambda ds: self.order[id(ds)])
+
+    def get(self, name, reference_product, location, unit):
+        """
+        Return the datasets matching exactly the given
+        name, reference product, location and unit.
+
+        :return: list of wurst datasets
+        :rtype: list
+        """
+        self.refresh()
+        return list(self.by_key.get((name, reference_product, location, unit), []))
+
+    def get_many(self, name, reference_product=None, location=None, unit=None):
+        """
+        Return the datasets which name is `name`, or one of `name`, if a list is given.
+        Datasets can further be filtered by reference product, unit and location(s).
+        Equivalent to `ws.get_many` with `ws.equals` (and `ws.either`) filters.
+
+        :param name: dataset name, or list of dataset names
+        :type name: str or list
+        :param reference_product: reference product of the dataset
+        :type reference_product: str
+        :param location: location, or list of locations, of the dataset
+        :type location: str or list
+        :param unit: unit of the dataset
+        :type unit: str
+        :return: list of wurst datasets, in database order
+        :rtype: list
+        """
+        self.refresh()
+
+        names = [name] if isinstance(name, str) else list(dict.fromkeys(name))
+
+        if location is not None and isinstance(location, str):
+            location = [location]
+        if location is not None:
+            location = set(location)
+
+        datasets = [
+            ds
+            for n in names
+            for ds in self.by_name.get(n, [])
+            if (
+                reference_product is None
+                or ds["reference product"] == reference_product
+            )
+            and (location is None or ds["location"] in location)
+            and (unit is None or ds["unit"] == unit)
+        ]
+
+        if len(names) > 1:
+            datasets = self._sort(datasets)
+
+        return datasets
+
+    def get_one(self, name, reference_product=None, location=None, unit=None):
+        """
+        Return the only dataset matching the given criteria.
+        Same arguments as :meth:`get_many`.
+
+        :return: a wurst dataset
+        :rtype: dict
+        :raises ws.NoResults: if no dataset is found
+        :raises ws.MultipleResults: if more than one dataset is found
+        """
+        datasets = self.get_many(name, reference_product, location, unit)
+
+        if not datasets:
+            raise ws.NoResults("No results found")
+        if len(datasets) > 1:
+            raise ws.MultipleResults(
+                "Multiple results found:\n{}".format(
+                    "\n".join(str(self.get_key(ds)) for ds in datasets)
+                )
+            )
+        return datasets[0]
+
+    def starting_with(self, prefix):
+        """
+        Return the datasets which name starts with `prefix`.
+
+        :param prefix: beginning of a dataset name
+        :type prefix: str
+        :return: list of wurst datasets, in database order
+        :rtype: list
+        """
+        self.refresh()
+
+        if self._sorted_names is None:
+            self._sorted_names = sorted(self.by_name)
+
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        datasets = []
+
+        for name in self._sorted_names[start:]:
+            if not name.startswith(prefix):
+                break
+            datasets.extend(self.by_name[name])
+
+        return self._sort(datasets)
+
+
+class ConsumerIndex:
+    """
+    Reverse index of a wurst database, mapping technosphere exchanges,
+    identified by their (name, product, unit), to the datasets consuming them.
+    It is used to find the few consumers of a product without
+    going through every exchange of every dataset.
+
+    Lookups return the consuming datasets, in the order in which they were indexed,
+    which is the database order as long as datasets are appended to the database.
+    The matching exchanges are to be selected from the dataset's exchanges by the caller,
+    so that positions of exchanges in a dataset never go stale.
+
+    The index is built from the database once, and is then kept in sync by the caller:
+    datasets added to the database are indexed with :meth:`add`,
+    datasets removed from it are dropped with :meth:`remove`,
+    and :meth:`update` is called on datasets which technosphere exchanges were
+    added, removed or renamed. Such edits are best made within :meth:`editing`,
+    which re-indexes the dataset however the edit ends, so that no branch of the
+    caller can leave the index out of sync.
+    The index keeps a reference to the datasets it holds.
+
+    """
+
+    def __init__(self, db):
+        self.by_key = defaultdict(dict)
+        self.keys_by_name = defaultdict(set)
+        self.datasets = {}
+        self.keys = {}
+        self.order = {}
+        self.size = 0
+
+        for ds in db:
+            self.add(ds)
+
+    @staticmethod
+    def get_keys(ds):
+        """
+        Return the (name, product, unit) keys of the technosphere exchanges of a dataset.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        :return: exchange keys
+        :rtype: set
+        """
+        return {
+            (exc.get("name"), exc.get("product"), exc.get("unit"))
+            for exc in ds["exchanges"]
+            if exc["type"] == "technosphere"
+        }
+
+    def add(self, ds):
+        """
+        Index a dataset added to the database.
+        Same as :meth:`update`, if the dataset is already indexed.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        """
+        i = id(ds)
+
+        if i not in self.datasets:
+            self.datasets[i] = ds
+            self.keys[i] = set()
+            self.order[i] = self.size
+            self.size += 1
+
+        self.update(ds)
+
+    def update(self, ds):
+        """
+        Re-index the technosphere exchanges of a dataset of the database.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        :raises KeyError: if the dataset is not indexed
+        """
+        i = id(ds)
+        if self.datasets.get(i) is not ds:
+            raise KeyError(f"Dataset {ds['name']} is not indexed.")
+
+        keys = self.get_keys(ds)
+
+        for key in self.keys[i] - keys:
+            del self.by_key[key][i]
+            if not self.by_key[key]:
+                del self.by_key[key]
+                self.keys_by_name[key[0]].discard(key)
+
+        for key in keys - self.keys[i]:
+            self.by_key[key][i] = ds
+            self.keys_by_name[key[0]].add(key)
+
+        self.keys[i] = keys
+
+    @contextmanager
+    def editing(self, ds):
+        """
+        Context manager to edit the exchanges of a dataset of the database:
+        the dataset is re-indexed with :meth:`update` when leaving the context,
+        whether its exchanges were changed or not.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        :raises KeyError: if the dataset is not indexed
+        """
+        try:
+            yield ds
+        finally:
+            self.update(ds)
+
+    def remove(self, ds):
+        """
+        Drop a dataset removed from the database from the index.
+        Datasets that are not indexed are ignored.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        """
+        i = id(ds)
+        if self.datasets.get(i) is not ds:
+            return
+
+        for key in self.keys.pop(i):
+            del self.by_key[key][i]
+            if not self.by_key[key]:
+                del self.by_key[key]
+                self.keys_by_name[key[0]].discard(key)
+
+        del self.datasets[i]
+        del self.order[i]
+
+    def _collect(self, keys):
+        consumers = {}
+        for key in keys:
+            consumers.update(self.by_key.get(key, {}))
+
+        return sorted(consumers.values(), key=lambda ds: self.order[id(ds)])
+
+    def consumers(self, name, product=None):
+        """
+        Return the datasets with a technosphere exchange named `name`
+        (or one of `name`, if a list is given), and for product `product`, if given.
+
+        :param name: exchange name, or list of exchange names
+        :type name: str or list
+        :param product: exchange product
+        :type product: str
+        :return: list of wurst datasets, in database order
+        :rtype: list
+        """
+        names = [name] if isinstance(name, str) else name
+
+        return self._collect(
+            key
+            for n in names
+            for key in self.keys_by_name.get(n, ())
+            if product is None or key[1] == product
+        )
+
+    def find(self, fltr):
+        """
+        Return the datasets with a technosphere exchange which (name, product, unit)
+        satisfies `fltr`.
+
+        :param fltr: function taking a (name, product, unit) tuple and returning a boolean
+        :type fltr: callable
+        :return: list of wurst datasets, in database order
+        :rtype: list
+        """
+        return self._collect(key for key in list(self.by_key) if fltr(key))
+
+
+class KeyIndex:
+    """
+    Sets of the codes and of the (name, reference product, location) keys
+    of the datasets of a wurst database, to test in constant time
+    whether a dataset is already in the database.
+
+    The index is built from the database once. Datasets added to the database
+    afterwards are indexed with :meth:`add`.
+
+    """
+
+    def __init__(self, db):
+        self.codes = set()
+        self.keys = set()
+
+        for ds in db:
+            self.add(ds)
+
+    def add(self, ds):
+        """
+        Index a dataset added to the database.
+
+        :param ds: a wurst dataset
+        :type ds: dict
+        """
+        self.codes.add(ds["code"])
+        self.keys.add((ds["name"], ds["reference product"], ds["location"]))
+
+    def has_code(self, code):
+        """
+        Return True if a dataset of the database has the code `code`.
+
+        :param code: dataset code
+        :type code: str
+        :rtype: bool
+        """
+        return code in self.codes
+
+    def has_key(self, name, reference_product, location):
+        """
+        Return True if a dataset of the database has the given
+        name, reference product and location.
+
+        :rtype: bool
+        """
+        return (name, reference_product, location) in self.keys
@@ -3,19 +3,28 @@ import copy
 import os
 import pickle
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
+from itertools import repeat
 from pathlib import Path
 
+import bw2data
+import numpy as np
 import wurst
+import xarray as xr
 
 from . import DATA_DIR, INVENTORY_DIR
+from .cache import get_cache_key, get_file_hash, load_from_cache, save_to_cache
 from .cars import Cars
 from .cement import Cement
 from .clean_datasets import DatabaseCleaner
 from .data_collection import IAMDataCollection
+from .dataset_index import KeyIndex
 from .electricity import Electricity
-from .export import Export
+from .export import Export, write_brightway_databases
 from .inventory_imports import (
+    FILEPATH_BIOSPHERE_FLOWS,
+    FILEPATH_MIGRATION_MAP,
     AdditionalInventory,
     BiofuelInventory,
     BiogasInventory,
@@ -31,10 +40,19 @@ from .inventory_imports import (
     TruckInventory,
     Trucks,
     VariousVehicles,
+    load_inventories,
 )
+from .lca import LCA, load_characterization_factors
 from .renewables import SolarPV
 from .steel import Steel
-from .utils import add_modified_tags, build_superstructure_db, eidb_label
+from .utils import (
+    add_modified_tags,
+    build_superstructure_db,
+    copy_database,
+    eidb_label,
+    find_changed_datasets,
+    get_delta_database,
+)
 
 FILEPATH_CARMA_INVENTORIES = INVENTORY_DIR / "lci-Carma-CCS.xlsx"
 FILEPATH_CHP_INVENTORIES = INVENTORY_DIR / "lci-combined-heat-power-plant-CCS.xlsx"
@@ -420,6 +438,22 @@ def check_scenarios(scenario, key):
     return scenario
 
 
+def _update_scenario(new_db, scenario):
+    """
+    Execute all transformation functions on a single scenario.
+    Used by :meth:`NewDatabase.update_all` to process scenarios in separate processes.
+
+    :param new_db: a :class:`NewDatabase` instance
+    :param scenario: scenario dictionary from :attr:`NewDatabase.scenarios`
+    :type scenario: dict
+    :return: the transformed scenario
+    :rtype: dict
+    """
+    new_db.scenarios = [scenario]
+    new_db.update_all()
+    return scenario
+
+
 class NewDatabase:
     """
     Class that represents a new wurst inventory database, modified according to IAM data.
@@ -430,6 +464,15 @@ class NewDatabase:
     :vartype source_db: str
     :ivar source_version: version of the ecoinvent source database. Currently works with ecoinvent 3.5, 3.6, 3.7, 3.7.1.
     :vartype source_version: str
+    :ivar use_cache: if True, the cleaned database, with inventories imported, is stored in a local cache
+        and reloaded from it as long as the source database and the inventories do not change.
+        Inventories parsed from Excel files are also cached individually, once linked,
+        as well as the inventories of vehicle fleets generated with `carculator` and the parsed IAM result files.
+        The cache is written to the `cache` folder of the `premise` data directory,
+        and can be emptied with :func:`premise.cache.clear_cache`. False by default.
+    :vartype use_cache: bool
+    :ivar parallel_import: if True, and `direct_import` is False, inventory files are loaded in separate processes.
+    :vartype parallel_import: bool
 
     """
 
@@ -443,6 +486,8 @@ class NewDatabase:
         source_file_path=None,
         additional_inventories=None,
         direct_import=True,
+        use_cache=False,
+        parallel_import=False,
     ):
 
         self.source = source_db
@@ -463,15 +508,27 @@ class NewDatabase:
         else:
             self.additional_inventories = None
 
-        print(
-            "\n////////////////////// EXTRACTING SOURCE DATABASE ///////////////////////"
-        )
-        self.db = self.clean_database()
-        print(
-            "\n/////////////////// IMPORTING DEFAULT INVENTORIES ////////////////////"
-        )
-        self.import_inventories(direct_import)
+        self.use_cache = use_cache
+        cache_key = self.get_cache_key(direct_import) if use_cache else None
+        self.db = load_from_cache("databases", cache_key) if use_cache else None
+
+        if self.db is not None:
+            print("\nSource database and inventories loaded from cache.")
+        else:
+            print(
+                "\n////////////////////// EXTRACTING SOURCE DATABASE ///////////////////////"
+            )
+            self.db = self.clean_database()
+            print(
+                "\n/////////////////// IMPORTING DEFAULT INVENTORIES ////////////////////"
+            )
+            self.import_inventories(direct_import, use_cache, parallel_import)
+
+            if use_cache:
+                save_to_cache("databases", cache_key, self.db)
 
+        # IAM result files are parsed once for all scenarios
+        iam_data_cache = {}
         for scenario in self.scenarios:
             scenario["external data"] = IAMDataCollection(
                 model=scenario["model"],
@@ -479,8 +536,56 @@ class NewDatabase:
                 year=scenario["year"],
                 filepath_iam_files=scenario["filepath"],
                 key=key,
+                use_cache=use_cache,
+                iam_data_cache=iam_data_cache,
             )
-            scenario["database"] = copy.deepcopy(self.db)
+            # a full copy per scenario: sector transformations modify datasets
+            # and exchanges in place, so none of them can be shared with `self.db`
+            scenario["database"] = copy_database(self.db)
+
+        # LCA matrices of each scenario, built by `calculate`
+        self.lca = {}
+
+    def get_cache_key(self, direct_import):
+        """
+        Return the key under which the cleaned database, with inventories imported, is cached.
+        It depends on the state of the source database, its version, the import mode,
+        the content of the inventory files shipped with `premise` for that import mode,
+        and the content of additional inventories, if any.
+
+        :param direct_import: whether inventories are imported from pickled files
+        :type direct_import: bool
+        :return: cache key
+        :rtype: str
+        """
+
+        if direct_import:
+            inventories = [get_file_hash(self.get_inventories_filepath())]
+        else:
+            inventories = [
+                (importer.__name__, get_file_hash(file))
+                for importer, file in self.get_inventories()
+            ] + [get_file_hash(FILEPATH_MIGRATION_MAP)]
+
+        additional_inventories = [
+            (
+                str(file["filepath"]),
+                get_file_hash(file["filepath"]),
+                file["ecoinvent version"],
+            )
+            for file in self.additional_inventories or []
+        ]
+
+        return get_cache_key(
+            DatabaseCleaner.get_source_fingerprint(
+                self.source, self.source_type, self.source_file_path
+            ),
+            self.version,
+            direct_import,
+            inventories,
+            get_file_hash(FILEPATH_BIOSPHERE_FLOWS),
+            additional_inventories,
+        )
 
     def clean_database(self):
         """
@@ -492,96 +597,125 @@ class NewDatabase:
             self.source, self.source_type, self.source_file_path
         ).prepare_datasets()
 
-    def import_inventories(self, direct_import):
+    def get_inventories_filepath(self):
+        """
+        Return the path of the pickled inventories imported when `direct_import` is True.
+
+        :rtype: pathlib.Path
+        """
+        if self.version in ["3.7", "3.7.1"]:
+            return FILE_PATH_INVENTORIES_EI_37
+        if self.version == "3.6":
+            return FILE_PATH_INVENTORIES_EI_36
+        return FILE_PATH_INVENTORIES_EI_35
+
+    def get_inventories(self):
+        """
+        Return the inventories parsed from Excel files when `direct_import` is False,
+        in the order in which they are merged into the database.
+
+        :return: list of (importer class, path of the inventory file)
+        :rtype: list
+        """
+        inventories = [
+            (CarmaCCSInventory, FILEPATH_CARMA_INVENTORIES),
+            (CarmaCCSInventory, FILEPATH_CHP_INVENTORIES),
+            (DACInventory, FILEPATH_DAC_INVENTORIES),
+            (BiogasInventory, FILEPATH_BIOGAS_INVENTORIES),
+        ]
+
+        for file in (
+            FILEPATH_HYDROGEN_INVENTORIES,
+            FILEPATH_HYDROGEN_BIOGAS_INVENTORIES,
+            FILEPATH_HYDROGEN_COAL_GASIFICATION_INVENTORIES,
+            FILEPATH_HYDROGEN_NATGAS_INVENTORIES,
+            FILEPATH_HYDROGEN_WOODY_INVENTORIES,
+        ):
+            inventories.append((HydrogenInventory, file))
+
+        for file in (
+            FILEPATH_SYNGAS_INVENTORIES,
+            FILEPATH_SYNGAS_FROM_COAL_INVENTORIES,
+        ):
+            inventories.append((SyngasInventory, file))
+
+        inventories.append((BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES))
+
+        for file in (
+            FILEPATH_SYNFUEL_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_COAL_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_BIOGAS_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_BIOMASS_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_BIOMASS_CCS_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_NAT_GAS_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_NAT_GAS_CCS_INVENTORIES,
+            FILEPATH_SYNFUEL_FROM_PETROLEUM_INVENTORIES,
+        ):
+            inventories.append((SynfuelInventory, file))
+
+        inventories.append((GeothermalInventory, FILEPATH_GEOTHERMAL_HEAT_INVENTORIES))
+
+        for file in (
+            FILEPATH_METHANOL_FUELS_INVENTORIES,
+            FILEPATH_METHANOL_FROM_COAL_FUELS_INVENTORIES,
+            FILEPATH_METHANOL_FROM_BIOMASS_FUELS_INVENTORIES,
+            FILEPATH_METHANOL_FROM_BIOGAS_FUELS_INVENTORIES,
+            FILEPATH_METHANOL_FROM_NATGAS_FUELS_INVENTORIES,
+        ):
+            inventories.append((LPGInventory, file))
+
+        inventories.append((VariousVehicles, FILEPATH_VARIOUS_VEHICLES))
+
+        return inventories
+
+    def import_inventories(
+        self, direct_import, use_cache=False, parallel=False, n_jobs=None
+    ):
         """
         This method will trigger the import of a number of pickled inventories
         and merge them into the database dictionary.
+
+        :param direct_import: if True, pickled inventories are imported. Otherwise, they are parsed from Excel files.
+        :type direct_import: bool
+        :param use_cache: if True, inventories parsed from Excel files are stored in a local cache, once linked,
+            and reloaded from it as long as the files do not change.
+        :type use_cache: bool
+        :param parallel: if True, Excel files are loaded in separate processes.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+            Defaults to the number of CPUs.
+        :type n_jobs: int
         """
 
         print("Importing necessary inventories...\n")
 
+        if parallel:
+            n_jobs = n_jobs or os.cpu_count()
+        else:
+            n_jobs = 1
+
         if direct_import:
 
             # we unpickle inventories here
             # and append them directly to the end of the database
 
-            if self.version in ["3.7", "3.7.1"]:
-                fp = FILE_PATH_INVENTORIES_EI_37
-            elif self.version == "3.6":
-                fp = FILE_PATH_INVENTORIES_EI_36
-            else:
-                fp = FILE_PATH_INVENTORIES_EI_35
-
-            with open(fp, "rb") as handle:
+            with open(self.get_inventories_filepath(), "rb") as handle:
                 data = self.check_for_duplicates(pickle.load(handle))
                 self.db.extend(data)
 
         else:
             # Manual import
-            for file in (FILEPATH_CARMA_INVENTORIES, FILEPATH_CHP_INVENTORIES):
-                carma = CarmaCCSInventory(self.db, self.version, file)
-                carma.merge_inventory()
-
-            dac = DACInventory(self.db, self.version, FILEPATH_DAC_INVENTORIES)
-            dac.merge_inventory()
-
-            biogas = BiogasInventory(self.db, self.version, FILEPATH_BIOGAS_INVENTORIES)
-            biogas.merge_inventory()
-
-            for file in (
-                FILEPATH_HYDROGEN_INVENTORIES,
-                FILEPATH_HYDROGEN_BIOGAS_INVENTORIES,
-                FILEPATH_HYDROGEN_COAL_GASIFICATION_INVENTORIES,
-                FILEPATH_HYDROGEN_NATGAS_INVENTORIES,
-                FILEPATH_HYDROGEN_WOODY_INVENTORIES,
-            ):
-
-                hydro = HydrogenInventory(self.db, self.version, file)
-                hydro.merge_inventory()
-
-            for file in (
-                FILEPATH_SYNGAS_INVENTORIES,
-                FILEPATH_SYNGAS_FROM_COAL_INVENTORIES,
-            ):
-                syngas = SyngasInventory(self.db, self.version, file)
-                syngas.merge_inventory()
-
-            bio = BiofuelInventory(self.db, self.version, FILEPATH_BIOFUEL_INVENTORIES)
-            bio.merge_inventory()
-
-            for file in (
-                FILEPATH_SYNFUEL_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_COAL_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOGAS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOMASS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_BIOMASS_CCS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_NAT_GAS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_NAT_GAS_CCS_INVENTORIES,
-                FILEPATH_SYNFUEL_FROM_PETROLEUM_INVENTORIES,
-            ):
-                synfuel = SynfuelInventory(self.db, self.version, file)
-                synfuel.merge_inventory()
+            inventories = self.get_inventories()
 
-            geo_heat = GeothermalInventory(
-                self.db, self.version, FILEPATH_GEOTHERMAL_HEAT_INVENTORIES
-            )
-            geo_heat.merge_inventory()
-
-            for file in (
-                FILEPATH_METHANOL_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_COAL_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_BIOMASS_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_BIOGAS_FUELS_INVENTORIES,
-                FILEPATH_METHANOL_FROM_NATGAS_FUELS_INVENTORIES,
-            ):
+            # files are loaded in parallel, but merged in order,
+            # as each inventory is checked against the previous ones
+            loaded = load_inventories(inventories, self.version, use_cache, n_jobs)
+            key_index = KeyIndex(self.db)
 
-                lpg = LPGInventory(self.db, self.version, file)
-                lpg.merge_inventory()
-
-            various_veh = VariousVehicles(
-                self.db, self.version, FILEPATH_VARIOUS_VEHICLES
-            )
-            various_veh.merge_inventory()
+            for (importer, file), import_db in zip(inventories, loaded):
+                importer(
+                    self.db, self.version, file, use_cache, import_db, key_index
+                ).merge_inventory()
 
         print("Done!\n")
 
@@ -591,9 +725,19 @@ class NewDatabase:
                 "\n/////////////////// IMPORTING USER-DEFINED INVENTORIES ////////////////////"
             )
 
-            for file in self.additional_inventories:
+            files = [file["filepath"] for file in self.additional_inventories]
+            loaded = load_inventories(
+                [(AdditionalInventory, file) for file in files],
+                self.version,
+                use_cache,
+                n_jobs,
+            )
+
+            key_index = KeyIndex(self.db)
+
+            for file, import_db in zip(files, loaded):
                 additional = AdditionalInventory(
-                    self.db, self.version, file["filepath"]
+                    self.db, self.version, file, use_cache, import_db, key_index
                 )
                 additional.prepare_inventory()
                 additional.merge_inventory()
@@ -685,6 +829,7 @@ class NewDatabase:
                     steel = Steel(
                         db=scenario["database"],
                         model=scenario["model"],
+                        scenario=scenario["pathway"],
                         iam_data=scenario["external data"],
                         year=scenario["year"],
                     )
@@ -696,9 +841,21 @@ class NewDatabase:
                     " to proceed to the steel sector transformation."
                 )
 
-    def update_cars(self):
+    def update_cars(self, parallel=False, n_jobs=None):
+        """
+        Import passenger car inventories, and relink them to the scenario's electricity and fuel markets.
+
+        :param parallel: if True, the `carculator` inventories of custom fleets
+            are created for several regions in separate processes.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+            Defaults to the number of CPUs.
+        :type n_jobs: int
+        """
         print("\n/////////////////// PASSENGER CARS ////////////////////")
 
+        n_jobs = (n_jobs or os.cpu_count()) if parallel else 1
+
         for scenario in self.scenarios:
             if "exclude" not in scenario or "update_cars" not in scenario["exclude"]:
 
@@ -714,6 +871,8 @@ class NewDatabase:
                         regions=scenario["passenger_cars"]["regions"],
                         filters=scenario["passenger_cars"]["filters"],
                         iam_data=scenario["external data"].data,
+                        use_cache=self.use_cache,
+                        n_jobs=n_jobs,
                     )
 
                 else:
@@ -739,10 +898,22 @@ class NewDatabase:
                 )
                 scenario["database"] = crs.update_cars()
 
-    def update_trucks(self):
+    def update_trucks(self, parallel=False, n_jobs=None):
+        """
+        Import truck inventories, and relink them to the scenario's electricity and fuel markets.
+
+        :param parallel: if True, the `carculator_truck` inventories of custom fleets
+            are created for several regions in separate processes.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+            Defaults to the number of CPUs.
+        :type n_jobs: int
+        """
 
         print("\n/////////////////// MEDIUM AND HEAVY DUTY TRUCKS ////////////////////")
 
+        n_jobs = (n_jobs or os.cpu_count()) if parallel else 1
+
         for scenario in self.scenarios:
             if "exclude" not in scenario or "update_trucks" not in scenario["exclude"]:
                 if scenario["trucks"]:
@@ -759,6 +930,8 @@ class NewDatabase:
                         regions=scenario["trucks"]["regions"],
                         filters=scenario["trucks"]["filters"],
                         iam_data=scenario["external data"].data,
+                        use_cache=self.use_cache,
+                        n_jobs=n_jobs,
                     )
 
                 else:
@@ -787,44 +960,93 @@ class NewDatabase:
                 print("Update efficiency of solar PVs.\n")
                 scenario["database"] = solar_PV.update_efficiency_of_solar_PV()
 
-    def update_all(self):
+    def update_all(self, parallel=False, n_jobs=None):
         """
         Shortcut method to execute all transformation functions.
+
+        :param parallel: if True, each scenario is transformed in a separate process.
+            With a single scenario, vehicle inventories of custom fleets are created
+            for several regions in separate processes instead.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+        By default, one process per scenario, up to the number of CPUs.
+        :type n_jobs: int
         """
 
-        self.update_cars()
-        self.update_trucks()
+        if parallel and len(self.scenarios) > 1:
+            if n_jobs is None:
+                n_jobs = min(len(self.scenarios), os.cpu_count())
+
+            if not os.path.exists(DATA_DIR / "logs"):
+                os.makedirs(DATA_DIR / "logs")
+
+            # the source database is not needed by the workers
+            worker = copy.copy(self)
+            worker.db = None
+            worker.scenarios = None
+            worker.lca = {}
+
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                updated = list(
+                    executor.map(_update_scenario, repeat(worker), self.scenarios)
+                )
+
+            # each worker writes the logs of its scenario in files of their own
+            for scenario, updated_scenario in zip(self.scenarios, updated):
+                scenario.update(updated_scenario)
+
+            return
+
+        self.update_cars(parallel, n_jobs)
+        self.update_trucks(parallel, n_jobs)
         self.update_electricity()
         self.update_solar_PV()
         self.update_cement()
         self.update_steel()
 
     def write_superstructure_db_to_brightway(
-        self, name=f"super_db_{date.today()}", filepath=None
+        self, name=f"super_db_{date.today()}", filepath=None, file_format="excel"
     ):
         """
         Register a super-structure database, according to https://github.com/dgdekoning/brightway-superstructure
+        :param file_format: format of the "scenarios difference file": "excel" (default), "csv" or "parquet".
+        The "csv" and "parquet" files are written row by row and are not limited in size.
+        :type file_format: str
         :return: filepath of the "scenarios difference file"
         """
 
         self.db = build_superstructure_db(
-            self.db, self.scenarios, db_name=name, fp=filepath
+            self.db, self.scenarios, db_name=name, fp=filepath, file_format=file_format
         )
 
         print("Done!")
 
-        wurst.write_brightway2_database(
-            self.db,
-            name,
-        )
+        write_brightway_databases([self.db], [name])
 
-    def write_db_to_brightway(self, name=None):
+    def write_db_to_brightway(
+        self, name=None, parallel=False, n_jobs=None, delta=False, base_name=None
+    ):
         """
         Register the new database into an open brightway2 project.
+        All databases are written in a single transaction.
         :param name: to give a (list) of custom name(s) to the database.
         Should either be a string if there's only one database to export.
         Or a list of strings if there are several databases.
         :type name: str
+        :param parallel: if True, the databases are prepared for writing in separate processes.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+        By default, one process per database, up to the number of CPUs.
+        :type n_jobs: int
+        :param delta: if True, each new database only contains the datasets that are new or
+        differ from the source database, and links to the base database `base_name` for the others.
+        As the datasets of the base database still link to the base versions of the changed datasets,
+        LCAs with such a database have to be calculated with :func:`premise.export.get_delta_lca`,
+        which relinks them in the technosphere matrix.
+        :type delta: bool
+        :param base_name: name of the base database, i.e., the source database with the imported inventories.
+        It is written first, unless it already exists in the project. Defaults to "premise_base_" + today's date.
+        :type base_name: str
         """
 
         if name:
@@ -847,21 +1069,72 @@ class NewDatabase:
                 "The number of databases does not match the number of `name` given."
             )
 
-        print("Write new database(s) to Brightway2.")
-        for s, scenario in enumerate(self.scenarios):
+        if parallel:
+            if n_jobs is None:
+                n_jobs = min(len(self.scenarios), os.cpu_count())
+        else:
+            n_jobs = 1
 
+        print("Write new database(s) to Brightway2.")
+        for scenario in self.scenarios:
             # we ensure first the absence of duplicate datasets
             scenario["database"] = self.check_for_duplicates(scenario["database"])
 
-            wurst.write_brightway2_database(
-                scenario["database"],
-                name[s],
+        data = [scenario["database"] for scenario in self.scenarios]
+
+        if delta:
+            base_name = base_name or f"premise_base_{date.today()}"
+            self.db = self.check_for_duplicates(self.db)
+
+            data, links = zip(
+                *(
+                    get_delta_database(db, codes, n, base_name)
+                    for db, codes, n in zip(
+                        data, find_changed_datasets(self.db, data), name
+                    )
+                )
             )
+            data = list(data)
+
+            if base_name in bw2data.databases:
+                missing = {
+                    exc["input"]
+                    for db in data
+                    for ds in db
+                    for exc in ds["exchanges"]
+                    if exc.get("input", ("",))[0] == base_name
+                } | {
+                    (base_name, code)
+                    for db_links in links
+                    for link in db_links
+                    for code in link
+                }
+                missing = [key for key in missing if key not in bw2data.mapping]
+                if missing:
+                    raise ValueError(
+                        f"The database {base_name} does not contain {len(missing)} "
+                        f"datasets needed by the new databases, e.g. {missing[0]}."
+                    )
+                print(f"Using {base_name} as base database.")
+            else:
+                data, name = [self.db] + data, [base_name] + name
+
+        write_brightway_databases(data, name, n_jobs=n_jobs)
 
-    def write_db_to_matrices(self, filepath=None):
+        if delta:
+            # links of the base database to resolve when calculating, see `get_delta_lca`
+            for n, db_links in zip(name[-len(links) :], links):
+                bw2data.databases[n]["premise delta"] = {
+                    "base": base_name,
+                    "links": [list(link) for link in db_links],
+                }
+            bw2data.databases.flush()
+
+    def write_db_to_matrices(self, filepath=None, format="csv", delta=False):
         """
 
-        Exports the new database as a sparse matrix representation in csv files.
+        Exports the new database as a sparse matrix representation in csv files,
+        `scipy.sparse` npz files or parquet files.
 
         :param filepath: path provided by the user to store the exported matrices.
         If it is a string, the path is used as main directory from which
@@ -871,63 +1144,102 @@ class NewDatabase:
         "iam model" / "pathway" / "year" subdirectories are created under
         "premise" / "data" / "export".
         :type filepath: str or list
+        :param format: format of the matrices: "csv" (default), "npz" (`scipy.sparse` matrices) or "parquet".
+        See :meth:`.Export.export_db_to_matrices`.
+        :type format: str
+        :param delta: if True, the source database is exported once, in a "base" directory
+        next to the scenario directories, and the matrices of each scenario only contain
+        the rows of the datasets that are new or differ from the source database.
+        :type delta: bool
 
         """
 
         if filepath is not None:
             if isinstance(filepath, str):
+                base_filepath = Path(filepath) / "base"
                 filepath = [
                     (Path(filepath) / s["model"] / s["pathway"] / str(s["year"]))
                     for s in self.scenarios
                 ]
             elif isinstance(filepath, list):
                 filepath = [Path(f) for f in filepath]
+                base_filepath = (
+                    Path(os.path.commonpath([f.parent for f in filepath])) / "base"
+                )
             else:
                 raise TypeError(
                     f"Expected a string or a sequence of strings for `filepath`, not {type(filepath)}."
                 )
         else:
+            base_filepath = DATA_DIR / "export" / "base"
             filepath = [
                 (DATA_DIR / "export" / s["model"] / s["pathway"] / str(s["year"]))
                 for s in self.scenarios
             ]
 
         print("Write new database(s) to matrix.")
-        for s, scenario in enumerate(self.scenarios):
-
+        for scenario in self.scenarios:
             # we ensure first the absence of duplicate datasets
             scenario["database"] = self.check_for_duplicates(scenario["database"])
 
+        changed = [None] * len(self.scenarios)
+        if delta:
+            self.db = self.check_for_duplicates(self.db)
+            changed = find_changed_datasets(
+                self.db, [scenario["database"] for scenario in self.scenarios]
+            )
+            Export(self.db, filepath=base_filepath).export_db_to_matrices(format=format)
+
+        for s, scenario in enumerate(self.scenarios):
             Export(
                 scenario["database"],
                 scenario["model"],
                 scenario["pathway"],
                 scenario["year"],
                 filepath[s],
-            ).export_db_to_matrices()
+                changed=changed[s],
+                base=base_filepath if delta else None,
+            ).export_db_to_matrices(format=format)
 
-    def write_db_to_simapro(self, filepath=None):
+    def write_db_to_simapro(
+        self, filepath=None, delta=False, parallel=False, n_jobs=None
+    ):
         """
         Exports database as a CSV file to be imported in Simapro 9.x
 
         :param filepath: path provided by the user to store the exported import file
         :type filepath: str
+        :param delta: if True, the source database is exported once, in a "base" directory
+        next to the scenario directories, and the file of each scenario only contains
+        the datasets that are new or differ from the source database.
+        The base file must be imported in SimaPro first.
+        :type delta: bool
+        :param parallel: if True, datasets are written in separate processes.
+        :type parallel: bool
+        :param n_jobs: number of processes to use if `parallel` is True.
+        By default, the number of CPUs.
+        :type n_jobs: int
 
         """
 
         if filepath is not None:
             if isinstance(filepath, str):
+                base_filepath = Path(filepath) / "base"
                 filepath = [
                     (Path(filepath) / s["model"] / s["pathway"] / str(s["year"]))
                     for s in self.scenarios
                 ]
             elif isinstance(filepath, list):
                 filepath = [Path(f) for f in filepath]
+                base_filepath = (
+                    Path(os.path.commonpath([f.parent for f in filepath])) / "base"
+                )
             else:
                 raise TypeError(
                     f"Expected a string or a sequence of strings for `filepath`, not {type(filepath)}."
                 )
         else:
+            base_filepath = DATA_DIR / "export" / "simapro" / "base"
             filepath = [
                 (
                     DATA_DIR
@@ -944,19 +1256,36 @@ class NewDatabase:
             if not os.path.exists(fp):
                 os.makedirs(fp)
 
-        print("Write Simapro import file(s).")
-        for s, scenario in enumerate(self.scenarios):
+        if parallel:
+            n_jobs = n_jobs or os.cpu_count()
+        else:
+            n_jobs = 1
 
+        print("Write Simapro import file(s).")
+        for scenario in self.scenarios:
             # we ensure first the absence of duplicate datasets
             scenario["database"] = self.check_for_duplicates(scenario["database"])
 
+        changed = [None] * len(self.scenarios)
+        if delta:
+            self.db = self.check_for_duplicates(self.db)
+            changed = find_changed_datasets(
+                self.db, [scenario["database"] for scenario in self.scenarios]
+            )
+            Export(
+                self.db, "ecoinvent", "base", self.version, base_filepath
+            ).export_db_to_simapro(n_jobs=n_jobs)
+
+        for s, scenario in enumerate(self.scenarios):
             Export(
                 scenario["database"],
                 scenario["model"],
                 scenario["pathway"],
                 scenario["year"],
                 filepath[s],
-            ).export_db_to_simapro()
+                changed=changed[s],
+                base=base_filepath if delta else None,
+            ).export_db_to_simapro(n_jobs=n_jobs)
 
     def write_db_to_brightway25(self, name=None):
         """
@@ -995,6 +1324,74 @@ class NewDatabase:
 
             wurst.write_brightway25_database(scenario["database"], name[s], self.source)
 
+    def calculate(self, functional_units, method, warm_start=False):
+        """
+        Calculate LCA scores of the new databases, without writing them to Brightway2.
+        Duplicate datasets are removed from the databases first.
+        The technosphere matrix of each scenario is factorized once
+        and reused by the following calls, as long as the content of the scenario database does not change.
+
+        :param functional_units: a dictionary with (name, reference product, unit, location)
+            of activities as keys and demanded amounts as values, or a list of such dictionaries.
+        :type functional_units: dict or list
+        :param method: path to a csv file of characterization factors, or a list of paths.
+            See :func:`.lca.load_characterization_factors` for the format.
+        :type method: str or list
+        :param warm_start: if True, the technosphere matrix of the source database is factorized once,
+            and the scenarios are solved iteratively from it, instead of being factorized one by one.
+            Faster when scenarios differ little from the source database and few functional units are calculated.
+        :type warm_start: bool
+        :return: LCA scores, with dimensions `scenario`, `functional unit` and `method`
+        :rtype: xarray.core.dataarray.DataArray
+        """
+
+        if isinstance(functional_units, dict):
+            functional_units = [functional_units]
+
+        if isinstance(method, (str, Path)):
+            method = [method]
+
+        if not functional_units or not method:
+            raise ValueError("At least one functional unit and one method are needed.")
+
+        cfs = [load_characterization_factors(m) for m in method]
+
+        def get_lca(key, db):
+            if key not in self.lca or not self.lca[key].is_built_from(db):
+                self.lca[key] = LCA(db)
+            return self.lca[key]
+
+        base = None
+        if warm_start:
+            self.db = self.check_for_duplicates(self.db)
+            base = get_lca("source", self.db)
+
+        scores = []
+        for s, scenario in enumerate(self.scenarios):
+            # duplicate datasets would make the technosphere matrix singular
+            scenario["database"] = self.check_for_duplicates(scenario["database"])
+            scores.append(
+                get_lca(s, scenario["database"]).calculate(
+                    functional_units, cfs, base=base
+                )
+            )
+
+        return xr.DataArray(
+            np.array(scores),
+            coords=[
+                (
+                    "scenario",
+                    [
+                        eidb_label(s["model"], s["pathway"], s["year"])
+                        for s in self.scenarios
+                    ],
+                ),
+                ("functional unit", list(range(len(functional_units)))),
+                ("method", [Path(m).stem for m in method]),
+            ],
+            name="score",
+        )
+
     def check_for_duplicates(self, db):
 
         """Check for the absence of duplicates before export"""
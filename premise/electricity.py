@@ -9,6 +9,7 @@ from wurst import searching as ws
 
 from . import DATA_DIR
 from .activity_maps import InventorySet
+from .dataset_index import ConsumerIndex, DatasetIndex
 from .geomap import Geomap
 from .utils import get_lower_heating_values
 
@@ -30,6 +31,8 @@ class Electricity:
 
     def __init__(self, db, iam_data, model, pathway, year):
         self.db = db
+        self.index = DatasetIndex(self.db)
+        self.consumers = ConsumerIndex(self.db)
         self.iam_data = iam_data
         self.model = model
         self.geo = Geomap(model=model)
@@ -56,18 +59,10 @@ class Electricity:
         :rtype: list
         """
 
-        return ws.get_many(
-            self.db,
-            *[
-                ws.either(
-                    *[
-                        ws.equals("name", supplier)
-                        for supplier in ecoinvent_technologies
-                    ]
-                ),
-                ws.either(*[ws.equals("location", loc) for loc in ecoinvent_regions]),
-                ws.equals("unit", "kilowatt hour"),
-            ]
+        return self.index.get_many(
+            ecoinvent_technologies,
+            location=ecoinvent_regions,
+            unit="kilowatt hour",
         )
 
     @staticmethod
@@ -591,8 +586,8 @@ class Electricity:
 
                 with open(
                     DATA_DIR
-                    / "logs/log created electricity markets {} {}-{}.csv".format(
-                        self.scenario, self.year, date.today()
+                    / "logs/log created electricity markets {} {} {}-{}.csv".format(
+                        self.model, self.scenario, self.year, date.today()
                     ),
                     "a",
                 ) as csv_file:
@@ -602,6 +597,7 @@ class Electricity:
 
                 new_dataset["exchanges"] = new_exchanges
                 self.db.append(new_dataset)
+                self.consumers.add(new_dataset)
 
     def create_new_markets_medium_voltage(self):
         """
@@ -844,11 +840,12 @@ class Electricity:
                     )
 
                 self.db.append(new_dataset)
+                self.consumers.add(new_dataset)
 
         with open(
             DATA_DIR
-            / "logs/log created electricity markets {} {}-{}.csv".format(
-                self.scenario, self.year, date.today()
+            / "logs/log created electricity markets {} {} {}-{}.csv".format(
+                self.model, self.scenario, self.year, date.today()
             ),
             "a",
         ) as csv_file:
@@ -1096,13 +1093,14 @@ class Electricity:
                 new_dataset["exchanges"] = new_exchanges
 
                 self.db.append(new_dataset)
+                self.consumers.add(new_dataset)
 
         # Writing log of created markets
 
         with open(
             DATA_DIR
-            / "logs/log created electricity markets {} {}-{}.csv".format(
-                self.scenario, self.year, date.today()
+            / "logs/log created electricity markets {} {} {}-{}.csv".format(
+                self.model, self.scenario, self.year, date.today()
             ),
             "w",
         ) as csv_file:
@@ -1141,28 +1139,37 @@ class Electricity:
         Does not return anything.
         """
 
+        voltages = [
+            (
+                "market group for electricity, high voltage",
+                "electricity, high voltage",
+            ),
+            (
+                "market group for electricity, medium voltage",
+                "electricity, medium voltage",
+            ),
+            (
+                "market group for electricity, low voltage",
+                "electricity, low voltage",
+            ),
+        ]
+
         # Filter all activities that consume electricity
+        consumers = self.consumers.find(
+            lambda key: (
+                any(name[1] in (key[0] or "") for name in voltages)
+                or key[2] == "kilowatt hour"
+            )
+            and "cobalt" not in (key[0] or "")
+        )
 
         for ds in ws.get_many(
-            self.db,
+            consumers,
             ws.exclude(ws.contains("name", "market group for electricity")),
             ws.doesnt_contain_any("name", ["cobalt industry"]),
         ):
 
-            for name in [
-                (
-                    "market group for electricity, high voltage",
-                    "electricity, high voltage",
-                ),
-                (
-                    "market group for electricity, medium voltage",
-                    "electricity, medium voltage",
-                ),
-                (
-                    "market group for electricity, low voltage",
-                    "electricity, low voltage",
-                ),
-            ]:
+            for name in voltages:
 
                 excs = list(
                     ws.get_many(
@@ -1212,6 +1219,8 @@ class Electricity:
 
                     ds["exchanges"].append(new_exc)
 
+            self.consumers.update(ds)
+
     def find_ecoinvent_fuel_efficiency(self, ds, fuel_filters):
         """
         This method calculates the efficiency value set initially, in case it is not specified in the parameter
@@ -1506,12 +1515,20 @@ class Electricity:
             for line in markets_to_delete:
                 writer.writerow(line)
 
+        for i in self.db:
+            if (
+                any(stop in i["name"] for stop in list_to_remove)
+                and "cobalt industry" not in i["reference product"]
+            ):
+                self.consumers.remove(i)
+
         self.db = [
             i
             for i in self.db
             if not any(stop in i["name"] for stop in list_to_remove)
             or "cobalt industry" in i["reference product"]
         ]
+        self.index.refresh(self.db)
 
         # We then need to create high voltage REMIND electricity markets
         print("Create high voltage markets.")
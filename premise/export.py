@@ -1,17 +1,57 @@
 import csv
 import datetime
+import io
 import json
+import math
 import os
+import pickle
 import re
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
+import bw2calc
+import bw2data
+import numpy as np
 import pandas as pd
+from bw2data.backends.peewee import sqlite3_lci_db
+from bw2data.errors import InvalidExchange, UntypedExchange
+from bw2data.search import IndexManager
+from scipy import sparse
+from wurst.linking import (
+    change_db_name,
+    check_duplicate_codes,
+    check_internal_linking,
+    link_internal,
+)
 
 from . import DATA_DIR, __version__
 
 FILEPATH_BIOSPHERE_FLOWS = DATA_DIR / "flows_biosphere_37.csv"
 
 
+def check_parquet_engine(engines=("pyarrow", "fastparquet")):
+    """
+    Check that a library to write parquet files is installed.
+
+    :param engines: names of the libraries that can be used
+    :type engines: tuple
+    :raises ImportError: if none of `engines` is installed
+    """
+    for engine in engines:
+        try:
+            __import__(engine)
+            return
+        except ImportError:
+            continue
+
+    raise ImportError(
+        "Writing parquet files requires {}. Install it, e.g., with `pip install premise[parquet]`"
+        " or `conda install pyarrow`.".format(" or ".join(f"`{e}`" for e in engines))
+    )
+
+
 def create_index_of_A_matrix(db):
     """
     Create a dictionary with row/column indices of the A matrix as key and a tuple (activity name, reference product,
@@ -67,6 +107,706 @@ def create_index_of_B_matrix():
     return csv_dict
 
 
+def prepare_brightway_rows(data, name):
+    """
+    Prepare the rows of the `activitydataset` and `exchangedataset` tables
+    of a Brightway2 project for database `name`.
+    The datasets are relinked and checked the same way `wurst.write_brightway2_database` does,
+    and the `data` column is pickled here, so that this can run in a separate process.
+    `data` is left untouched: datasets and exchanges are copied before being relinked.
+
+    :param data: wurst inventory database
+    :type data: list
+    :param name: name of the Brightway2 database
+    :type name: str
+    :return: a tuple with the set of locations, the activity rows, the exchange rows
+        and the fields of the search index
+    :rtype: tuple
+    """
+
+    # relinking only sets keys of the datasets and of their exchanges
+    data = [dict(ds, exchanges=[dict(exc) for exc in ds["exchanges"]]) for ds in data]
+
+    # Restore parameters to Brightway2 format
+    for ds in data:
+        if "parameters" in ds:
+            ds["parameters"] = {k: {"amount": v} for k, v in ds["parameters"].items()}
+
+    change_db_name(data, name)
+    link_internal(data)
+    check_internal_linking(data)
+    check_duplicate_codes(data)
+
+    locations, activities, exchanges, documents = set(), [], [], []
+
+    for ds in data:
+        key = (name, ds["code"])
+
+        for exc in ds["exchanges"]:
+            if "input" not in exc or "amount" not in exc:
+                raise InvalidExchange
+            if "type" not in exc:
+                raise UntypedExchange
+            exc["output"] = key
+            exchanges.append(
+                (
+                    pickle.dumps(exc, protocol=pickle.HIGHEST_PROTOCOL),
+                    exc["input"][1],
+                    exc["input"][0],
+                    key[1],
+                    key[0],
+                    exc["type"],
+                )
+            )
+
+        act = {k: v for k, v in ds.items() if k != "exchanges"}
+        activities.append(
+            (
+                pickle.dumps(act, protocol=pickle.HIGHEST_PROTOCOL),
+                key[1],
+                key[0],
+                act.get("location"),
+                act.get("name"),
+                act.get("reference product"),
+                act.get("type", "process"),
+            )
+        )
+
+        if ds.get("location"):
+            locations.add(ds["location"])
+
+        documents.append(
+            {
+                k: act[k]
+                for k in (
+                    "name",
+                    "comment",
+                    "reference product",
+                    "categories",
+                    "location",
+                    "database",
+                    "code",
+                )
+                if k in act
+            }
+        )
+
+    return locations, activities, exchanges, documents
+
+
+def write_brightway_databases(data, names, n_jobs=1):
+    """
+    Write several databases to the current Brightway2 project in one go.
+    Rows are prepared by :func:`prepare_brightway_rows` and inserted in a single transaction,
+    with the table indices dropped while writing and rebuilt once at the end,
+    the way `bw2data` does it for a single database in `Database.write`.
+    If `n_jobs` > 1, the rows are prepared in worker processes.
+    If anything fails, all the databases are removed from the project, with their
+    metadata, search indices, and the keys and locations added to the mappings.
+
+    :param data: list of wurst inventory databases
+    :type data: list
+    :param names: name of each database
+    :type names: list
+    :param n_jobs: number of processes to use
+    :type n_jobs: int
+    """
+
+    for name in names:
+        if name in bw2data.databases:
+            raise ValueError(f"The database {name} already exists.")
+
+    if len(set(names)) < len(names):
+        raise ValueError("The names of the databases should be unique.")
+
+    if n_jobs > 1 and len(data) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            rows = list(executor.map(prepare_brightway_rows, data, names))
+    else:
+        rows = [prepare_brightway_rows(db, name) for db, name in zip(data, names)]
+
+    keys = [
+        (name, act[1])
+        for name, (_, activities, _, _) in zip(names, rows)
+        for act in activities
+    ]
+    locations = {
+        location
+        for locs, _, _, _ in rows
+        for location in locs
+        if location not in bw2data.geomapping
+    }
+
+    try:
+        for name, (_, activities, _, _) in zip(names, rows):
+            bw2data.Database(name).register(format="Wurst")
+            bw2data.databases[name]["number"] = len(activities)
+            bw2data.databases.set_modified(name)
+        bw2data.mapping.add(keys)
+        bw2data.geomapping.add(locations)
+
+        # the table indices are shared by all databases of the project
+        backend = bw2data.Database(names[0])
+        backend._drop_indices()
+        try:
+            with sqlite3_lci_db.db.atomic():
+                cursor = sqlite3_lci_db.db.cursor()
+                for _, activities, exchanges, _ in rows:
+                    cursor.executemany(
+                        'INSERT INTO "activitydataset" ("data", "code", "database", '
+                        '"location", "name", "product", "type") VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        activities,
+                    )
+                    cursor.executemany(
+                        'INSERT INTO "exchangedataset" ("data", "input_code", "input_database", '
+                        '"output_code", "output_database", "type") VALUES (?, ?, ?, ?, ?, ?)',
+                        exchanges,
+                    )
+        finally:
+            backend._add_indices()
+
+        # same as `Database.make_searchable(reset=True)`,
+        # without reading the datasets back from SQLite
+        for name, (_, _, _, documents) in zip(names, rows):
+            bw2data.databases[name]["searchable"] = True
+            manager = IndexManager(bw2data.Database(name).filename)
+            manager.create()
+            manager.add_datasets(documents)
+        bw2data.databases.flush()
+
+        for name in names:
+            bw2data.Database(name).process()
+
+    except Exception as err:
+        # `Database.process` leaves its own SQLite connection open when it fails,
+        # which locks the tables until the frames of the traceback are cleared
+        traceback.clear_frames(err.__traceback__)
+
+        # deleting a database also deletes its rows and its search index
+        for name in names:
+            if name in bw2data.databases:
+                del bw2data.databases[name]
+        bw2data.mapping.delete([key for key in keys if key in bw2data.mapping])
+        bw2data.geomapping.delete(
+            [location for location in locations if location in bw2data.geomapping]
+        )
+        raise
+
+    for name in names:
+        print(f"Created database: {name}")
+
+
+def get_delta_lca(name, demand, method=None):
+    """
+    Calculate an LCA with a delta database written by `NewDatabase.write_db_to_brightway(delta=True)`.
+    The datasets of the base database that consume a dataset changed in the scenario
+    still link to the base database in Brightway2, so these links, stored in the metadata of the
+    delta database, are moved to the changed datasets in the technosphere matrix before solving it.
+    Functional units in the base database are replaced by their version in the delta database, if any.
+
+    :param name: name of the delta database
+    :type name: str
+    :param demand: functional unit, as a dictionary of activity keys and amounts
+    :type demand: dict
+    :param method: LCIA method, if any
+    :type method: tuple
+    :return: a LCA object, with its inventory, and its score if `method` is given, calculated
+    :rtype: bw2calc.LCA
+    :raises ValueError: if `name` is not a delta database
+    """
+
+    if name not in bw2data.databases or "premise delta" not in bw2data.databases[name]:
+        raise ValueError(f"{name} is not a delta database written by premise.")
+
+    base_name = bw2data.databases[name]["premise delta"]["base"]
+    links = bw2data.databases[name]["premise delta"]["links"]
+
+    demand = {
+        (name, key[1])
+        if key[0] == base_name and (name, key[1]) in bw2data.mapping
+        else key: amount
+        for key, amount in demand.items()
+    }
+    databases = set.union(
+        *(
+            bw2data.Database(db).find_graph_dependents()
+            for db in {name} | {key[0] for key in demand}
+        )
+    )
+
+    lca = bw2calc.LCA(demand, method)
+    # `LCA` only loads the databases the functional unit depends on,
+    # and ignores its `database_filepath` argument
+    lca.database_filepath = [
+        bw2data.Database(db).filepath_processed() for db in sorted(databases)
+    ]
+    lca.load_lci_data()
+
+    matrix = lca.technosphere_matrix.tolil()
+    for consumer, supplier in links:
+        col = lca.activity_dict[(base_name, consumer)]
+        row = lca.product_dict[(base_name, supplier)]
+        matrix[lca.product_dict[(name, supplier)], col] += matrix[row, col]
+        matrix[row, col] = 0
+    lca.technosphere_matrix = matrix.tocsr()
+
+    lca.build_demand_array()
+    lca.lci_calculation()
+    if method:
+        lca.load_lcia_data()
+        lca.lcia_calculation()
+
+    return lca
+
+
+SIMAPRO_FIELDS = [
+    "Process",
+    "Category type",
+    "Type",
+    "Process name",
+    "Time Period",
+    "Geography",
+    "Technology",
+    "Representativeness",
+    "Waste treatment allocation",
+    "Cut off rules",
+    "Capital goods",
+    "Date",
+    "Boundary with nature",
+    "Infrastructure",
+    "Record",
+    "Generator",
+    "Literature references",
+    "External documents",
+    "Comment",
+    "Collection method",
+    "Data treatment",
+    "Verification",
+    "System description",
+    "Allocation rules",
+    "Products",
+    "Waste treatment",
+    "Materials/fuels",
+    "Resources",
+    "Emissions to air",
+    "Emissions to water",
+    "Emissions to soil",
+    "Final waste flows",
+    "Non material emission",
+    "Social issues",
+    "Economic issues",
+    "Waste to treatment",
+    "End",
+]
+
+SIMAPRO_UNITS = {
+    "kilogram": "kg",
+    "cubic meter": "m3",
+    "cubic meter-year": "m3y",
+    "kilowatt hour": "kWh",
+    "kilometer": "km",
+    "ton kilometer": "tkm",
+    "ton-kilometer": "tkm",
+    "megajoule": "MJ",
+    "unit": "p",
+    "square meter": "m2",
+    "kilowatt": "p",
+    "hour": "hr",
+    "square meter-year": "m2a",
+    "meter": "m",
+    "vehicle-kilometer": "vkm",
+    "person-kilometer": "personkm",
+    "person kilometer": "personkm",
+    "meter-year": "my",
+    "kilo Becquerel": "kBq",
+    "kg*day": "kg*day",
+    "hectare": "ha",
+    "kilometer-year": "kmy",
+    "litre": "l",
+    "guest night": "guestnight",
+}
+
+SIMAPRO_SUBCOMPARTMENTS = {
+    "low population density, long-term": "low. pop., long-term",
+    "lower stratosphere + upper troposphere": "stratosphere + troposphere",
+    "non-urban air or from high stacks": "low. pop.",
+    "urban air close to ground": "high. pop.",
+    "biotic": "biotic",
+    "in air": "in air",
+    "in ground": "in ground",
+    "in water": "in water",
+    "land": "land",
+    "agricultural": "agricultural",
+    "forestry": "forestry",
+    "industrial": "industrial",
+    "ground-": "groundwater",
+    "ground-, long-term": "groundwater, long-term",
+    "ocean": "ocean",
+    "surface water": "river",
+}
+
+
+def write_simapro_process(writer, ds, context):
+    """
+    Write the SimaPro CSV block of a dataset.
+
+    :param writer: csv writer
+    :param ds: dataset
+    :type ds: dict
+    :param context: lookup tables, see :meth:`Export.get_simapro_context`
+    :type context: dict
+    """
+
+    main_category, category = ("", "")
+
+    if ds["name"] in context["simapro categories"]:
+
+        main_category, category = (
+            context["simapro categories"][ds["name"]]["main category"],
+            context["simapro categories"][ds["name"]]["category"],
+        )
+    else:
+
+        if any(
+            i in ds["name"]
+            for i in (
+                "transport, passenger car",
+                "transport, heavy",
+                "transport, medium",
+            )
+        ):
+            main_category, category = ("transport", r"Road\Transformation")
+
+        if any(i in ds["name"] for i in ("Passenger car", "Heavy duty", "Medium duty")):
+            main_category, category = ("transport", r"Road\Infrastructure")
+
+        if main_category == "":
+
+            main_category, category = (
+                context["categories"][(ds["name"], ds["reference product"])][
+                    "main category"
+                ],
+                context["categories"][(ds["name"], ds["reference product"])][
+                    "category"
+                ],
+            )
+
+    for item in SIMAPRO_FIELDS:
+
+        if main_category.lower() == "waste treatment" and item == "Products":
+            continue
+
+        if main_category.lower() != "waste treatment" and item in (
+            "Waste treatment",
+            "Waste treatment allocation",
+        ):
+            continue
+
+        writer.writerow([item])
+
+        if item == "Process name":
+
+            name = (
+                ds["reference product"]
+                + " {"
+                + ds.get("location", "GLO")
+                + "}"
+                + "| "
+                + ds["name"]
+                + " "
+                + "| Cut-off, U"
+            )
+            writer.writerow([name])
+
+        if item == "Type":
+            writer.writerow(["Unit process"])
+
+        if item == "Category type":
+            writer.writerow([main_category])
+
+        if item == "Generator":
+            writer.writerow(["premise " + str(__version__)])
+
+        if item == "Geography":
+            writer.writerow([ds["location"]])
+
+        if item == "Date":
+            writer.writerow([context["date"]])
+
+        if item == "Comment":
+
+            if ds["name"] in context["references"]:
+                string = re.sub(
+                    "[^a-zA-Z0-9 \.,]", "", context["references"][ds["name"]]["source"]
+                )
+
+                if context["references"][ds["name"]]["description"] != "":
+                    string += " " + re.sub(
+                        "[^a-zA-Z0-9 \.,]",
+                        "",
+                        context["references"][ds["name"]]["description"],
+                    )
+
+                writer.writerow([string])
+            else:
+                if "comment" in ds:
+                    string = re.sub("[^a-zA-Z0-9 \.,]", "", ds["comment"])
+                    writer.writerow([string])
+
+        if item in (
+            "Cut off rules",
+            "Capital goods",
+            "Technology",
+            "Representativeness",
+            "Waste treatment allocation",
+            "Boundary with nature",
+            "Allocation rules",
+            "Collection method",
+            "Verification",
+            "Time Period",
+            "Record",
+        ):
+            writer.writerow(["Unspecified"])
+        if item == "Literature references":
+            writer.writerow(["Ecoinvent 3"])
+        if item == "System description":
+            writer.writerow(["Ecoinvent v3"])
+        if item == "Infrastructure":
+            writer.writerow(["Yes"])
+        if item == "External documents":
+            writer.writerow(
+                ["https://premise.readthedocs.io/en/latest/introduction.html"]
+            )
+        if item in ("Waste treatment", "Products"):
+            for e in ds["exchanges"]:
+                if e["type"] == "production":
+                    name = (
+                        e["product"]
+                        + " {"
+                        + e.get("location", "GLO")
+                        + "}"
+                        + "| "
+                        + e["name"]
+                        + " "
+                        + "| Cut-off, U"
+                    )
+
+                    if item == "Waste treatment":
+                        writer.writerow(
+                            [
+                                name,
+                                SIMAPRO_UNITS[e["unit"]],
+                                1.0,
+                                "not defined",
+                                category,
+                            ]
+                        )
+
+                    else:
+                        writer.writerow(
+                            [
+                                name,
+                                SIMAPRO_UNITS[e["unit"]],
+                                1.0,
+                                "100%",
+                                "not defined",
+                                category,
+                            ]
+                        )
+        if item == "Materials/fuels":
+            for e in ds["exchanges"]:
+                if e["type"] == "technosphere":
+
+                    if e["name"] in context["simapro categories"]:
+                        exc_cat = context["simapro categories"][e["name"]][
+                            "main category"
+                        ].lower()
+                    else:
+                        exc_cat = context["categories"][e["name"], e["product"]][
+                            "main category"
+                        ].lower()
+
+                    if exc_cat != "waste treatment":
+                        name = (
+                            e["product"]
+                            + " {"
+                            + e.get("location", "GLO")
+                            + "}"
+                            + "| "
+                            + e["name"]
+                            + " "
+                            + "| Cut-off, U"
+                        )
+
+                        writer.writerow(
+                            [
+                                name,
+                                SIMAPRO_UNITS[e["unit"]],
+                                "{:.3E}".format(e["amount"]),
+                                "undefined",
+                                0,
+                                0,
+                                0,
+                            ]
+                        )
+        if item == "Resources":
+            for e in ds["exchanges"]:
+                if (
+                    e["type"] == "biosphere"
+                    and e["categories"][0] == "natural resource"
+                ):
+                    if len(e["categories"]) > 1:
+                        sub_compartment = SIMAPRO_SUBCOMPARTMENTS.get(
+                            e["categories"][1], ""
+                        )
+                    else:
+                        sub_compartment = ""
+
+                    writer.writerow(
+                        [
+                            context["biosphere"].get(e["name"], e["name"]),
+                            sub_compartment,
+                            SIMAPRO_UNITS[e["unit"]],
+                            "{:.3E}".format(e["amount"]),
+                            "undefined",
+                            0,
+                            0,
+                            0,
+                        ]
+                    )
+        if item == "Emissions to air":
+            for e in ds["exchanges"]:
+                if e["type"] == "biosphere" and e["categories"][0] == "air":
+
+                    if len(e["categories"]) > 1:
+                        sub_compartment = SIMAPRO_SUBCOMPARTMENTS.get(
+                            e["categories"][1], ""
+                        )
+                    else:
+                        sub_compartment = ""
+
+                    if e["name"].lower() == "water":
+                        e = dict(e, unit="kilogram", amount=e["amount"] / 1000)
+
+                    writer.writerow(
+                        [
+                            context["biosphere"].get(e["name"], e["name"]),
+                            sub_compartment,
+                            SIMAPRO_UNITS[e["unit"]],
+                            "{:.3E}".format(e["amount"]),
+                            "undefined",
+                            0,
+                            0,
+                            0,
+                        ]
+                    )
+        if item == "Emissions to water":
+            for e in ds["exchanges"]:
+                if e["type"] == "biosphere" and e["categories"][0] == "water":
+                    if e["name"].lower() == "water":
+                        e = dict(e, unit="kilogram", amount=e["amount"] / 1000)
+
+                    if len(e["categories"]) > 1:
+                        sub_compartment = SIMAPRO_SUBCOMPARTMENTS.get(
+                            e["categories"][1], ""
+                        )
+                    else:
+                        sub_compartment = ""
+
+                    writer.writerow(
+                        [
+                            context["biosphere"].get(e["name"], e["name"]),
+                            sub_compartment,
+                            SIMAPRO_UNITS[e["unit"]],
+                            "{:.3E}".format(e["amount"]),
+                            "undefined",
+                            0,
+                            0,
+                            0,
+                        ]
+                    )
+        if item == "Emissions to soil":
+            for e in ds["exchanges"]:
+                if e["type"] == "biosphere" and e["categories"][0] == "soil":
+                    if len(e["categories"]) > 1:
+                        sub_compartment = SIMAPRO_SUBCOMPARTMENTS.get(
+                            e["categories"][1], ""
+                        )
+                    else:
+                        sub_compartment = ""
+
+                    writer.writerow(
+                        [
+                            context["biosphere"].get(e["name"], e["name"]),
+                            sub_compartment,
+                            SIMAPRO_UNITS[e["unit"]],
+                            "{:.3E}".format(e["amount"]),
+                            "undefined",
+                            0,
+                            0,
+                            0,
+                        ]
+                    )
+        if item == "Waste to treatment":
+            for e in ds["exchanges"]:
+                if e["type"] == "technosphere":
+
+                    if e["name"] in context["simapro categories"]:
+                        exc_cat = context["simapro categories"][e["name"]][
+                            "main category"
+                        ].lower()
+                    else:
+                        exc_cat = context["categories"][e["name"], e["product"]][
+                            "main category"
+                        ].lower()
+
+                    if exc_cat == "waste treatment":
+
+                        name = (
+                            e["product"]
+                            + " {"
+                            + e.get("location", "GLO")
+                            + "}"
+                            + "| "
+                            + e["name"]
+                            + " "
+                            + "| Cut-off, U"
+                        )
+
+                        writer.writerow(
+                            [
+                                name,
+                                SIMAPRO_UNITS[e["unit"]],
+                                "{:.3E}".format(e["amount"] * -1),
+                                "undefined",
+                                0,
+                                0,
+                                0,
+                            ]
+                        )
+
+        writer.writerow([])
+
+
+def render_simapro_processes(datasets, context):
+    """
+    Render the SimaPro CSV blocks of several datasets as text.
+    Used by :meth:`Export.export_db_to_simapro` to render datasets in separate processes.
+
+    :param datasets: datasets
+    :type datasets: list
+    :param context: lookup tables, see :meth:`Export.get_simapro_context`
+    :type context: dict
+    :return: the SimaPro CSV blocks
+    :rtype: str
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    for ds in datasets:
+        write_simapro_process(writer, ds, context)
+    return buffer.getvalue()
+
+
 class Export:
     """
     Class that exports the transformed data into matrices:
@@ -75,6 +815,7 @@ class Export:
 
     The A and B matrices are exported as csv files in a sparse representation (only non-zero values are listed), like so:
     - index row, index column, value of exchange
+    They can also be exported as `scipy.sparse` matrices (npz files) or parquet tables.
 
     Dictionaries to map row numbers to activities and products names are also exported.
 
@@ -84,159 +825,357 @@ class Export:
     :vartype pathway: str
     :ivar year: year of a Remind pathway
     :vartype year: int
+    :ivar changed: if given, codes of the only datasets to export,
+        the other datasets being exported separately, in a base export.
+        The whole database is still used to index and categorize exchanges.
+    :vartype changed: set
+    :ivar base: directory of the base export, if `changed` is given
+    :vartype base: pathlib.Path
 
     """
 
-    def __init__(self, db, model=None, scenario=None, year=None, filepath=None):
+    def __init__(
+        self,
+        db,
+        model=None,
+        scenario=None,
+        year=None,
+        filepath=None,
+        changed=None,
+        base=None,
+    ):
         self.db = db
         self.model = model
         self.scenario = scenario
         self.year = year
         self.filepath = filepath
+        self.changed = changed
+        self.base = base
         self.bio_codes = self.rev_index(create_codes_index_of_B_matrix())
+        self.index_A = None
 
-    def create_A_matrix_coordinates(self):
-        index_A = create_index_of_A_matrix(self.db)
-        list_rows = []
+    def iter_datasets(self):
+        """
+        Iterate over the datasets to export: all datasets of :attr:`db`,
+        or only those whose code is in :attr:`changed`.
+        """
+        if self.changed is None:
+            return iter(self.db)
+        return (ds for ds in self.db if ds["code"] in self.changed)
 
-        for ds in self.db:
+    def get_index_of_A_matrix(self):
+        """
+        Return the index of the A matrix, from :func:`create_index_of_A_matrix`.
+        It is built once per `Export` instance.
+
+        :return: a dictionary to map activities to indices
+        :rtype: dict
+        """
+        if self.index_A is None:
+            self.index_A = create_index_of_A_matrix(self.db)
+        return self.index_A
+
+    def iter_A_matrix_coordinates(self):
+        index_A = self.get_index_of_A_matrix()
+
+        for ds in self.iter_datasets():
+            row = index_A[
+                (
+                    ds["name"],
+                    ds["reference product"],
+                    ds["unit"],
+                    ds["location"],
+                )
+            ]
             for exc in ds["exchanges"]:
                 if exc["type"] == "production":
-                    row = [
-                        index_A[
-                            (
-                                ds["name"],
-                                ds["reference product"],
-                                ds["unit"],
-                                ds["location"],
-                            )
-                        ],
-                        index_A[
-                            (
-                                exc["name"],
-                                exc["product"],
-                                exc["unit"],
-                                exc["location"],
-                            )
-                        ],
-                        exc["amount"],
-                    ]
-                    list_rows.append(row)
+                    yield row, index_A[
+                        (
+                            exc["name"],
+                            exc["product"],
+                            exc["unit"],
+                            exc["location"],
+                        )
+                    ], exc["amount"]
                 if exc["type"] == "technosphere":
-                    row = [
-                        index_A[
-                            (
-                                ds["name"],
-                                ds["reference product"],
-                                ds["unit"],
-                                ds["location"],
-                            )
-                        ],
-                        index_A[
-                            (
-                                exc["name"],
-                                exc["product"],
-                                exc["unit"],
-                                exc["location"],
-                            )
-                        ],
-                        exc["amount"] * -1,
-                    ]
-                    list_rows.append(row)
-        return list_rows
+                    yield row, index_A[
+                        (
+                            exc["name"],
+                            exc["product"],
+                            exc["unit"],
+                            exc["location"],
+                        )
+                    ], exc["amount"] * -1
+
+    def iter_B_matrix_coordinates(self):
+        index_B = create_index_of_B_matrix()
+        rev_index_B = self.create_rev_index_of_B_matrix()
+        index_A = self.get_index_of_A_matrix()
+
+        for ds in self.iter_datasets():
+            for exc in ds["exchanges"]:
+                if exc["type"] == "biosphere":
+                    try:
+                        code = exc["input"][1]
+                        lookup = rev_index_B[code]
+                        ind_B = index_B[lookup]
+                    except KeyError:
+                        print(
+                            "Cannot find the biosphere flow",
+                            exc["name"],
+                            exc["categories"],
+                        )
+                        continue
+
+                    yield index_A[
+                        (
+                            ds["name"],
+                            ds["reference product"],
+                            ds["unit"],
+                            ds["location"],
+                        )
+                    ], ind_B, exc["amount"] * -1
+
+    def create_A_matrix_coordinates(self):
+        return [list(row) for row in self.iter_A_matrix_coordinates()]
 
     def create_B_matrix_coordinates(self):
+        return [list(row) for row in self.iter_B_matrix_coordinates()]
 
+    def create_A_matrix_arrays(self):
+        """
+        Return the coordinates of the A matrix as arrays of row indices (int32),
+        column indices (int32) and values (float64).
+        The arrays are allocated once, for the number of exchanges, and filled in place.
+
+        :rtype: tuple
+        """
+        index_A = self.get_index_of_A_matrix()
+        datasets = list(self.iter_datasets())
+        signs = {"production": 1, "technosphere": -1}
+
+        size = sum(exc["type"] in signs for ds in datasets for exc in ds["exchanges"])
+        rows = np.empty(size, dtype=np.int32)
+        cols = np.empty(size, dtype=np.int32)
+        values = np.empty(size, dtype=np.float64)
+
+        i = 0
+        for ds in datasets:
+            row = index_A[
+                (
+                    ds["name"],
+                    ds["reference product"],
+                    ds["unit"],
+                    ds["location"],
+                )
+            ]
+            for exc in ds["exchanges"]:
+                if exc["type"] in signs:
+                    rows[i] = row
+                    cols[i] = index_A[
+                        (
+                            exc["name"],
+                            exc["product"],
+                            exc["unit"],
+                            exc["location"],
+                        )
+                    ]
+                    values[i] = exc["amount"] * signs[exc["type"]]
+                    i += 1
+
+        return rows, cols, values
+
+    def create_B_matrix_arrays(self):
+        """
+        Return the coordinates of the B matrix as arrays of row indices (int32),
+        column indices (int32) and values (float64).
+        The arrays are allocated once, for the number of biosphere exchanges, and filled in place.
+        Biosphere flows that cannot be found are left out.
+
+        :rtype: tuple
+        """
         index_B = create_index_of_B_matrix()
         rev_index_B = self.create_rev_index_of_B_matrix()
-        index_A = create_index_of_A_matrix(self.db)
-        list_rows = []
+        index_A = self.get_index_of_A_matrix()
+        datasets = list(self.iter_datasets())
 
-        for ds in self.db:
+        size = sum(
+            exc["type"] == "biosphere" for ds in datasets for exc in ds["exchanges"]
+        )
+        rows = np.empty(size, dtype=np.int32)
+        cols = np.empty(size, dtype=np.int32)
+        values = np.empty(size, dtype=np.float64)
+
+        i = 0
+        for ds in datasets:
+            row = index_A[
+                (
+                    ds["name"],
+                    ds["reference product"],
+                    ds["unit"],
+                    ds["location"],
+                )
+            ]
             for exc in ds["exchanges"]:
                 if exc["type"] == "biosphere":
                     try:
                         code = exc["input"][1]
                         lookup = rev_index_B[code]
                         ind_B = index_B[lookup]
-
-                        row = [
-                            index_A[
-                                (
-                                    ds["name"],
-                                    ds["reference product"],
-                                    ds["unit"],
-                                    ds["location"],
-                                )
-                            ],
-                            ind_B,
-                            exc["amount"] * -1,
-                        ]
                     except KeyError:
                         print(
                             "Cannot find the biosphere flow",
                             exc["name"],
                             exc["categories"],
                         )
-                    list_rows.append(row)
-        return list_rows
+                        continue
+
+                    rows[i] = row
+                    cols[i] = ind_B
+                    values[i] = exc["amount"] * -1
+                    i += 1
+
+        return rows[:i], cols[:i], values[:i]
+
+    def export_db_to_matrices(self, format="csv"):
+        """
+        Export the A and B matrices, as well as their indices.
+
+        With `format="csv"`, matrices are written in csv files, one line per exchange.
+        With `format="npz"`, matrices are written as `scipy.sparse` CSR matrices
+        (to be read with `scipy.sparse.load_npz`), with activities as rows, and products
+        or biosphere flows as columns. Duplicate exchanges are summed.
+        Indices are written in csv files, as with `format="csv"`.
+        With `format="parquet"`, matrices are written as parquet tables of
+        (row index, column index, value), as are the indices.
+        This requires `pyarrow` or `fastparquet`.
+
+        If only the changed datasets are exported (see :attr:`changed`), the matrices only contain
+        the rows of these datasets, in the indexing of the whole database, and a `delta.json` file
+        lists these rows and the directory of the base export. The other rows are found in
+        the base matrices, matching activities by their index entries.
+
+        :param format: "csv", "npz" or "parquet"
+        :type format: str
+        """
+
+        if format not in ("csv", "npz", "parquet"):
+            raise ValueError(
+                f"Unknown format {format} for matrices. Must be one of 'csv', 'npz' or 'parquet'."
+            )
 
-    def export_db_to_matrices(self):
+        if format == "parquet":
+            check_parquet_engine()
 
         if not os.path.exists(self.filepath):
             os.makedirs(self.filepath)
 
-        # Export A matrix
-        with open(self.filepath / "A_matrix.csv", "w") as f:
-            writer = csv.writer(
-                f,
-                delimiter=";",
-                lineterminator="\n",
-            )
-            writer.writerow(["index of activity", "index of product", "value"])
-            rows = self.create_A_matrix_coordinates()
-            for row in rows:
-                writer.writerow(row)
+        index_A = self.get_index_of_A_matrix()
+        index_B = create_index_of_B_matrix()
 
-        # Export A index
-        with open(self.filepath / "A_matrix_index.csv", "w") as f:
-            writer = csv.writer(
-                f,
-                delimiter=";",
-                lineterminator="\n",
+        if format == "csv":
+            self.export_matrix_to_csv(
+                "A_matrix",
+                ["index of activity", "index of product", "value"],
+                self.iter_A_matrix_coordinates(),
+            )
+            self.export_matrix_to_csv(
+                "B_matrix",
+                ["index of activity", "index of biosphere flow", "value"],
+                self.iter_B_matrix_coordinates(),
             )
-            index_A = create_index_of_A_matrix(self.db)
-            for d in index_A:
-                data = list(d) + [index_A[d]]
-                writer.writerow(data)
 
-        index_B = create_index_of_B_matrix()
+        if format == "npz":
+            shape_A = (len(self.db), len(self.db))
+            shape_B = (len(self.db), max(index_B.values()) + 1)
+
+            for name, shape, (rows, cols, values) in (
+                ("A_matrix", shape_A, self.create_A_matrix_arrays()),
+                ("B_matrix", shape_B, self.create_B_matrix_arrays()),
+            ):
+                matrix = sparse.coo_matrix((values, (rows, cols)), shape=shape)
+                sparse.save_npz(self.filepath / f"{name}.npz", matrix.tocsr())
+
+        if format == "parquet":
+            for name, columns, (rows, cols, values) in (
+                (
+                    "A_matrix",
+                    ["index of activity", "index of product", "value"],
+                    self.create_A_matrix_arrays(),
+                ),
+                (
+                    "B_matrix",
+                    ["index of activity", "index of biosphere flow", "value"],
+                    self.create_B_matrix_arrays(),
+                ),
+            ):
+                pd.DataFrame(dict(zip(columns, (rows, cols, values)))).to_parquet(
+                    self.filepath / f"{name}.parquet", index=False
+                )
+
+            for name, columns, index in (
+                (
+                    "A_matrix_index",
+                    ["name", "reference product", "unit", "location"],
+                    index_A,
+                ),
+                (
+                    "B_matrix_index",
+                    ["name", "compartment", "subcompartment", "unit"],
+                    index_B,
+                ),
+            ):
+                df = pd.DataFrame(list(index), columns=columns)
+                df["index"] = np.array(list(index.values()), dtype=np.int32)
+                df.to_parquet(self.filepath / f"{name}.parquet", index=False)
+        else:
+            self.export_index_to_csv("A_matrix_index", index_A)
+            self.export_index_to_csv("B_matrix_index", index_B)
+
+        if self.changed is not None:
+            with open(self.filepath / "delta.json", "w") as f:
+                json.dump(
+                    {
+                        "base": str(self.base),
+                        "rows": sorted(
+                            index_A[
+                                (
+                                    ds["name"],
+                                    ds["reference product"],
+                                    ds["unit"],
+                                    ds["location"],
+                                )
+                            ]
+                            for ds in self.iter_datasets()
+                        ),
+                    },
+                    f,
+                    indent=4,
+                )
 
-        # Export B matrix
-        with open(self.filepath / "B_matrix.csv", "w") as f:
+        print("Matrices saved in {}.".format(self.filepath))
+
+    def export_matrix_to_csv(self, name, header, coordinates):
+        with open(self.filepath / f"{name}.csv", "w") as f:
             writer = csv.writer(
                 f,
                 delimiter=";",
                 lineterminator="\n",
             )
-            writer.writerow(["index of activity", "index of biosphere flow", "value"])
-            rows = self.create_B_matrix_coordinates()
-            for row in rows:
-                writer.writerow(row)
+            writer.writerow(header)
+            writer.writerows(coordinates)
 
-        # Export B index
-        with open(self.filepath / "B_matrix_index.csv", "w") as f:
+    def export_index_to_csv(self, name, index):
+        with open(self.filepath / f"{name}.csv", "w") as f:
             writer = csv.writer(
                 f,
                 delimiter=";",
                 lineterminator="\n",
             )
-            for d in index_B:
-                data = list(d) + [index_B[d]]
+            for d in index:
+                data = list(d) + [index[d]]
                 writer.writerow(data)
 
-        print("Matrices saved in {}.".format(self.filepath))
-
     @staticmethod
     def create_rev_index_of_B_matrix():
         if not FILEPATH_BIOSPHERE_FLOWS.is_file():
@@ -281,7 +1220,7 @@ class Export:
             raise FileNotFoundError(
                 "The dictionary of Simapro categories could not be found."
             )
-        with open(filepath) as f:
+        with open(filepath, encoding="cp1252") as f:
             csv_list = [[val.strip() for val in r.split(";")] for r in f.readlines()]
         header, *data = csv_list
 
@@ -308,7 +1247,7 @@ class Export:
             raise FileNotFoundError(
                 "The dictionary of Simapro categories could not be found."
             )
-        with open(filepath) as f:
+        with open(filepath, encoding="utf-8") as f:
             csv_list = [[val.strip() for val in r.split(";")] for r in f.readlines()]
         header, *data = csv_list
 
@@ -322,75 +1261,58 @@ class Export:
 
         return dict_cat
 
+    def get_simapro_context(self):
+        """
+        Return the lookup tables needed to write the SimaPro CSV blocks of datasets.
+
+        :return: a dictionary with the SimaPro names of biosphere flows ("biosphere"),
+            the SimaPro categories of datasets ("simapro categories" by name and
+            "categories" by (name, reference product)), the "references" of datasets
+            and the export "date".
+        :rtype: dict
+        """
+        return {
+            "biosphere": self.get_simapro_biosphere_dictionnary(),
+            "simapro categories": self.get_simapro_category_of_exchange(),
+            "categories": self.get_category_of_exchange(),
+            "references": self.load_references(),
+            "date": f"{datetime.datetime.today():%d.%m.%Y}",
+        }
+
     def get_category_of_exchange(self):
         """
         This function returns a dictionnary with (name, reference product) as keys,
         and {'main category': 'xxxxxx', 'category': 'yyyyyy'} as values.
         This is useful for Simapro export, to categorize datasets into a tree structure.
+        Each classification code is looked up once.
         :return: dict
         """
 
         dict_classifications = self.load_simapro_categories()
         dict_categories = {}
+        lookups = {}
+
+        def lookup(classification):
+            if classification not in lookups:
+                row = dict_classifications[classification.split(":")[0].strip()]
+                if row["category 3"] != "":
+                    category = row["category 2"] + "\\" + row["category 3"]
+                else:
+                    category = row["category 2"]
+                lookups[classification] = (row["category 1"], category)
+            return lookups[classification]
 
         for ds in self.db:
             if (ds["name"], ds["reference product"]) not in dict_categories:
                 main_category, category = (None, None)
 
-                if "classifications" in ds:
-                    if len(ds["classifications"]) > 0:
-                        for x in ds["classifications"]:
-                            if x[0] == "ISIC rev.4 ecoinvent":
-                                main_category = dict_classifications[
-                                    x[1].split(":")[0].strip()
-                                ]["category 1"]
-
-                                if (
-                                    dict_classifications[x[1].split(":")[0].strip()][
-                                        "category 3"
-                                    ]
-                                    != ""
-                                ):
-                                    category = (
-                                        dict_classifications[
-                                            x[1].split(":")[0].strip()
-                                        ]["category 2"]
-                                        + "\ ".strip()
-                                        + dict_classifications[
-                                            x[1].split(":")[0].strip()
-                                        ]["category 3"]
-                                    )
-                                else:
-                                    category = dict_classifications[
-                                        x[1].split(":")[0].strip()
-                                    ]["category 2"]
-
-                        if not main_category:
-                            for x in ds["classifications"]:
-                                if x[0] == "CPC":
-                                    main_category = dict_classifications[
-                                        x[1].split(":")[0].strip()
-                                    ]["category 1"]
-
-                                    if (
-                                        dict_classifications[
-                                            x[1].split(":")[0].strip()
-                                        ]["category 3"]
-                                        != ""
-                                    ):
-                                        category = (
-                                            dict_classifications[
-                                                x[1].split(":")[0].strip()
-                                            ]["category 2"]
-                                            + "\ ".strip()
-                                            + dict_classifications[
-                                                x[1].split(":")[0].strip()
-                                            ]["category 3"]
-                                        )
-                                    else:
-                                        category = dict_classifications[
-                                            x[1].split(":")[0].strip()
-                                        ]["category 2"]
+                # ISIC classifications first, CPC otherwise
+                for system in ("ISIC rev.4 ecoinvent", "CPC"):
+                    for x in ds.get("classifications", []):
+                        if x[0] == system:
+                            main_category, category = lookup(x[1])
+                    if main_category:
+                        break
 
                 if not main_category:
                     main_category = "material"
@@ -412,7 +1334,7 @@ class Export:
         filepath = DATA_DIR / filename
         if not filepath.is_file():
             raise FileNotFoundError("The dictionary of references could not be found.")
-        with open(filepath) as f:
+        with open(filepath, encoding="cp1252") as f:
             csv_list = [[val.strip() for val in r.split(";")] for r in f.readlines()]
         header, *data = csv_list
 
@@ -423,13 +1345,20 @@ class Export:
 
         return dict_reference
 
-    def export_db_to_simapro(self):
+    def export_db_to_simapro(self, n_jobs=1):
+        """
+        Export the datasets to a CSV file to be imported in SimaPro 9.x.
+        The block of each dataset is written by :func:`write_simapro_process`.
+        If `n_jobs` > 1, blocks are rendered as text by chunks of datasets in worker processes,
+        and written to the file, in the order of the database, as they come.
+
+        :param n_jobs: number of processes to use
+        :type n_jobs: int
+        """
 
         if not os.path.exists(self.filepath):
             os.makedirs(self.filepath)
 
-        dict_bio = self.get_simapro_biosphere_dictionnary()
-
         headers = [
             "{SimaPro 9.1.1.1}",
             "{processes}",
@@ -449,92 +1378,6 @@ class Export:
             "{Include sub product stages and processes: Yes}",
         ]
 
-        fields = [
-            "Process",
-            "Category type",
-            "Type",
-            "Process name",
-            "Time Period",
-            "Geography",
-            "Technology",
-            "Representativeness",
-            "Waste treatment allocation",
-            "Cut off rules",
-            "Capital goods",
-            "Date",
-            "Boundary with nature",
-            "Infrastructure",
-            "Record",
-            "Generator",
-            "Literature references",
-            "External documents",
-            "Comment",
-            "Collection method",
-            "Data treatment",
-            "Verification",
-            "System description",
-            "Allocation rules",
-            "Products",
-            "Waste treatment",
-            "Materials/fuels",
-            "Resources",
-            "Emissions to air",
-            "Emissions to water",
-            "Emissions to soil",
-            "Final waste flows",
-            "Non material emission",
-            "Social issues",
-            "Economic issues",
-            "Waste to treatment",
-            "End",
-        ]
-
-        simapro_units = {
-            "kilogram": "kg",
-            "cubic meter": "m3",
-            "cubic meter-year": "m3y",
-            "kilowatt hour": "kWh",
-            "kilometer": "km",
-            "ton kilometer": "tkm",
-            "ton-kilometer": "tkm",
-            "megajoule": "MJ",
-            "unit": "p",
-            "square meter": "m2",
-            "kilowatt": "p",
-            "hour": "hr",
-            "square meter-year": "m2a",
-            "meter": "m",
-            "vehicle-kilometer": "vkm",
-            "person-kilometer": "personkm",
-            "person kilometer": "personkm",
-            "meter-year": "my",
-            "kilo Becquerel": "kBq",
-            "kg*day": "kg*day",
-            "hectare": "ha",
-            "kilometer-year": "kmy",
-            "litre": "l",
-            "guest night": "guestnight",
-        }
-
-        simapro_subs = {
-            "low population density, long-term": "low. pop., long-term",
-            "lower stratosphere + upper troposphere": "stratosphere + troposphere",
-            "non-urban air or from high stacks": "low. pop.",
-            "urban air close to ground": "high. pop.",
-            "biotic": "biotic",
-            "in air": "in air",
-            "in ground": "in ground",
-            "in water": "in water",
-            "land": "land",
-            "agricultural": "agricultural",
-            "forestry": "forestry",
-            "industrial": "industrial",
-            "ground-": "groundwater",
-            "ground-, long-term": "groundwater, long-term",
-            "ocean": "ocean",
-            "surface water": "river",
-        }
-
         filename = (
             "simapro_export_"
             + self.model
@@ -545,9 +1388,7 @@ class Export:
             + ".csv"
         )
 
-        dict_cat_simapro = self.get_simapro_category_of_exchange()
-        dict_cat = self.get_category_of_exchange()
-        dict_refs = self.load_references()
+        context = self.get_simapro_context()
 
         with open(
             self.filepath / filename, "w", newline="", encoding="utf-8"
@@ -557,351 +1398,23 @@ class Export:
                 writer.writerow([item])
             writer.writerow([])
 
-            for ds in self.db:
-
-                main_category, category = ("", "")
-
-                if ds["name"] in dict_cat_simapro:
-
-                    main_category, category = (
-                        dict_cat_simapro[ds["name"]]["main category"],
-                        dict_cat_simapro[ds["name"]]["category"],
-                    )
-                else:
-
-                    if any(
-                        i in ds["name"]
-                        for i in (
-                            "transport, passenger car",
-                            "transport, heavy",
-                            "transport, medium",
-                        )
-                    ):
-                        main_category, category = ("transport", r"Road\Transformation")
-
-                    if any(
-                        i in ds["name"]
-                        for i in ("Passenger car", "Heavy duty", "Medium duty")
-                    ):
-                        main_category, category = ("transport", r"Road\Infrastructure")
-
-                    if main_category == "":
-
-                        main_category, category = (
-                            dict_cat[(ds["name"], ds["reference product"])][
-                                "main category"
-                            ],
-                            dict_cat[(ds["name"], ds["reference product"])]["category"],
-                        )
-
-                for item in fields:
-
-                    if (
-                        main_category.lower() == "waste treatment"
-                        and item == "Products"
-                    ):
-                        continue
-
-                    if main_category.lower() != "waste treatment" and item in (
-                        "Waste treatment",
-                        "Waste treatment allocation",
+            datasets = list(self.iter_datasets())
+
+            if n_jobs > 1 and len(datasets) > 1:
+                # a few chunks per process, to balance the load
+                chunk_size = math.ceil(len(datasets) / (n_jobs * 4))
+                chunks = [
+                    datasets[i : i + chunk_size]
+                    for i in range(0, len(datasets), chunk_size)
+                ]
+                with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                    for text in executor.map(
+                        render_simapro_processes, chunks, repeat(context)
                     ):
-                        continue
-
-                    writer.writerow([item])
-
-                    if item == "Process name":
-
-                        name = (
-                            ds["reference product"]
-                            + " {"
-                            + ds.get("location", "GLO")
-                            + "}"
-                            + "| "
-                            + ds["name"]
-                            + " "
-                            + "| Cut-off, U"
-                        )
-                        writer.writerow([name])
-
-                    if item == "Type":
-                        writer.writerow(["Unit process"])
-
-                    if item == "Category type":
-                        writer.writerow([main_category])
-
-                    if item == "Generator":
-                        writer.writerow(["premise " + str(__version__)])
-
-                    if item == "Geography":
-                        writer.writerow([ds["location"]])
-
-                    if item == "Date":
-                        writer.writerow([f"{datetime.datetime.today():%d.%m.%Y}"])
-
-                    if item == "Comment":
-
-                        if ds["name"] in dict_refs:
-                            string = re.sub(
-                                "[^a-zA-Z0-9 \.,]", "", dict_refs[ds["name"]]["source"]
-                            )
-
-                            if dict_refs[ds["name"]]["description"] != "":
-                                string += " " + re.sub(
-                                    "[^a-zA-Z0-9 \.,]",
-                                    "",
-                                    dict_refs[ds["name"]]["description"],
-                                )
-
-                            writer.writerow([string])
-                        else:
-                            if "comment" in ds:
-                                string = re.sub("[^a-zA-Z0-9 \.,]", "", ds["comment"])
-                                writer.writerow([string])
-
-                    if item in (
-                        "Cut off rules",
-                        "Capital goods",
-                        "Technology",
-                        "Representativeness",
-                        "Waste treatment allocation",
-                        "Boundary with nature",
-                        "Allocation rules",
-                        "Collection method",
-                        "Verification",
-                        "Time Period",
-                        "Record",
-                    ):
-                        writer.writerow(["Unspecified"])
-                    if item == "Literature references":
-                        writer.writerow(["Ecoinvent 3"])
-                    if item == "System description":
-                        writer.writerow(["Ecoinvent v3"])
-                    if item == "Infrastructure":
-                        writer.writerow(["Yes"])
-                    if item == "External documents":
-                        writer.writerow(
-                            [
-                                "https://premise.readthedocs.io/en/latest/introduction.html"
-                            ]
-                        )
-                    if item in ("Waste treatment", "Products"):
-                        for e in ds["exchanges"]:
-                            if e["type"] == "production":
-                                name = (
-                                    e["product"]
-                                    + " {"
-                                    + e.get("location", "GLO")
-                                    + "}"
-                                    + "| "
-                                    + e["name"]
-                                    + " "
-                                    + "| Cut-off, U"
-                                )
-
-                                if item == "Waste treatment":
-                                    writer.writerow(
-                                        [
-                                            name,
-                                            simapro_units[e["unit"]],
-                                            1.0,
-                                            "not defined",
-                                            category,
-                                        ]
-                                    )
-
-                                else:
-                                    writer.writerow(
-                                        [
-                                            name,
-                                            simapro_units[e["unit"]],
-                                            1.0,
-                                            "100%",
-                                            "not defined",
-                                            category,
-                                        ]
-                                    )
-                    if item == "Materials/fuels":
-                        for e in ds["exchanges"]:
-                            if e["type"] == "technosphere":
-
-                                if e["name"] in dict_cat_simapro:
-                                    exc_cat = dict_cat_simapro[e["name"]][
-                                        "main category"
-                                    ].lower()
-                                else:
-                                    exc_cat = dict_cat[e["name"], e["product"]][
-                                        "main category"
-                                    ].lower()
-
-                                if exc_cat != "waste treatment":
-                                    name = (
-                                        e["product"]
-                                        + " {"
-                                        + e.get("location", "GLO")
-                                        + "}"
-                                        + "| "
-                                        + e["name"]
-                                        + " "
-                                        + "| Cut-off, U"
-                                    )
-
-                                    writer.writerow(
-                                        [
-                                            name,
-                                            simapro_units[e["unit"]],
-                                            "{:.3E}".format(e["amount"]),
-                                            "undefined",
-                                            0,
-                                            0,
-                                            0,
-                                        ]
-                                    )
-                    if item == "Resources":
-                        for e in ds["exchanges"]:
-                            if (
-                                e["type"] == "biosphere"
-                                and e["categories"][0] == "natural resource"
-                            ):
-                                if len(e["categories"]) > 1:
-                                    sub_compartment = simapro_subs.get(
-                                        e["categories"][1], ""
-                                    )
-                                else:
-                                    sub_compartment = ""
-
-                                writer.writerow(
-                                    [
-                                        dict_bio.get(e["name"], e["name"]),
-                                        sub_compartment,
-                                        simapro_units[e["unit"]],
-                                        "{:.3E}".format(e["amount"]),
-                                        "undefined",
-                                        0,
-                                        0,
-                                        0,
-                                    ]
-                                )
-                    if item == "Emissions to air":
-                        for e in ds["exchanges"]:
-                            if e["type"] == "biosphere" and e["categories"][0] == "air":
-
-                                if len(e["categories"]) > 1:
-                                    sub_compartment = simapro_subs.get(
-                                        e["categories"][1], ""
-                                    )
-                                else:
-                                    sub_compartment = ""
-
-                                if e["name"].lower() == "water":
-                                    e["unit"] = "kilogram"
-                                    e["amount"] /= 1000
-
-                                writer.writerow(
-                                    [
-                                        dict_bio.get(e["name"], e["name"]),
-                                        sub_compartment,
-                                        simapro_units[e["unit"]],
-                                        "{:.3E}".format(e["amount"]),
-                                        "undefined",
-                                        0,
-                                        0,
-                                        0,
-                                    ]
-                                )
-                    if item == "Emissions to water":
-                        for e in ds["exchanges"]:
-                            if (
-                                e["type"] == "biosphere"
-                                and e["categories"][0] == "water"
-                            ):
-                                if e["name"].lower() == "water":
-                                    e["unit"] = "kilogram"
-                                    e["amount"] /= 1000
-
-                                if len(e["categories"]) > 1:
-                                    sub_compartment = simapro_subs.get(
-                                        e["categories"][1], ""
-                                    )
-                                else:
-                                    sub_compartment = ""
-
-                                writer.writerow(
-                                    [
-                                        dict_bio.get(e["name"], e["name"]),
-                                        sub_compartment,
-                                        simapro_units[e["unit"]],
-                                        "{:.3E}".format(e["amount"]),
-                                        "undefined",
-                                        0,
-                                        0,
-                                        0,
-                                    ]
-                                )
-                    if item == "Emissions to soil":
-                        for e in ds["exchanges"]:
-                            if (
-                                e["type"] == "biosphere"
-                                and e["categories"][0] == "soil"
-                            ):
-                                if len(e["categories"]) > 1:
-                                    sub_compartment = simapro_subs.get(
-                                        e["categories"][1], ""
-                                    )
-                                else:
-                                    sub_compartment = ""
-
-                                writer.writerow(
-                                    [
-                                        dict_bio.get(e["name"], e["name"]),
-                                        sub_compartment,
-                                        simapro_units[e["unit"]],
-                                        "{:.3E}".format(e["amount"]),
-                                        "undefined",
-                                        0,
-                                        0,
-                                        0,
-                                    ]
-                                )
-                    if item == "Waste to treatment":
-                        for e in ds["exchanges"]:
-                            if e["type"] == "technosphere":
-
-                                if e["name"] in dict_cat_simapro:
-                                    exc_cat = dict_cat_simapro[e["name"]][
-                                        "main category"
-                                    ].lower()
-                                else:
-                                    exc_cat = dict_cat[e["name"], e["product"]][
-                                        "main category"
-                                    ].lower()
-
-                                if exc_cat == "waste treatment":
-
-                                    name = (
-                                        e["product"]
-                                        + " {"
-                                        + e.get("location", "GLO")
-                                        + "}"
-                                        + "| "
-                                        + e["name"]
-                                        + " "
-                                        + "| Cut-off, U"
-                                    )
-
-                                    writer.writerow(
-                                        [
-                                            name,
-                                            simapro_units[e["unit"]],
-                                            "{:.3E}".format(e["amount"] * -1),
-                                            "undefined",
-                                            0,
-                                            0,
-                                            0,
-                                        ]
-                                    )
-
-                    writer.writerow([])
+                        csvFile.write(text)
+            else:
+                for ds in datasets:
+                    write_simapro_process(writer, ds, context)
 
             # System description
             writer.writerow(["System description"])
@@ -1,19 +1,332 @@
+import copy
+import json
+from functools import lru_cache, reduce
+
+import constructive_geometries
+import numpy as np
+import wurst
 from wurst.geo import geomatcher
 
 from premise import DATA_DIR
 
 REGION_MAPPING_FILEPATH = DATA_DIR / "regionmappingH12.csv"
+LOCATION_FACES_FILEPATH = DATA_DIR / "location_faces.npz"
+
+
+def count_faces(faces):
+    """
+    Return the number of topological faces in a bitset.
+
+    :param faces: faces, as an integer bitset
+    :type faces: int
+    :rtype: int
+    """
+    return bin(faces).count("1")
+
+
+class Topology:
+    """
+    Topological faces of all the locations known to the geomatcher (countries, ecoinvent
+    regions and IAM regions), stored as integer bitsets: bit `i` is set if face `i`
+    is part of the location. Whether a location contains, or intersects, another one
+    is then answered with bit operations instead of set operations.
+
+    :meth:`contained`, :meth:`intersects` and :meth:`within` return the same results
+    as the methods of the same name of `constructive_geometries.Geomatcher`.
+    `RoW` is not defined, unless the topology is returned by :meth:`resolved_row`.
+
+    The faces are shipped with the package data, see :func:`get_topology`,
+    and are regenerated with :func:`build_location_faces`.
+
+    :ivar topology: bitset of faces for each location, in the order of the geomatcher
+    :vartype topology: dict
+    :ivar faces: bitset of all the faces
+    :vartype faces: int
+
+    """
+
+    def __init__(self, topology, row=None):
+        self.topology = topology
+        self.faces = reduce(lambda x, y: x | y, topology.values(), 0)
+        self.row = row
+
+    @classmethod
+    def from_geomatcher(cls, geo=geomatcher):
+        """
+        Build the topology from a geomatcher.
+
+        :param geo: a geomatcher
+        :type geo: constructive_geometries.Geomatcher
+        :rtype: Topology
+        """
+        keys = list(geo.topology)
+        matrix = np.zeros((len(keys), max(geo.faces) + 1), dtype=bool)
+        for i, key in enumerate(keys):
+            matrix[i, list(geo.topology[key])] = True
+
+        faces = cls.unpack(np.packbits(matrix, axis=1, bitorder="little"))
+
+        return cls(dict(zip(keys, faces)))
+
+    @staticmethod
+    def unpack(matrix):
+        return [int.from_bytes(row.tobytes(), "little") for row in matrix]
+
+    @staticmethod
+    def get_versions():
+        """
+        Return the versions of the libraries the topology is built from.
+
+        :rtype: list
+        """
+        return [
+            str(wurst.__version__),
+            str(getattr(constructive_geometries, "__version__", "")),
+        ]
+
+    @classmethod
+    def load(cls, filepath=LOCATION_FACES_FILEPATH):
+        """
+        Load the topology from a file written by :meth:`save`.
+        Return None if the file is missing or was written with other versions
+        of `wurst` and `constructive_geometries`.
+
+        :param filepath: path to the file
+        :type filepath: str or pathlib.Path
+        :rtype: Topology
+        """
+        try:
+            with np.load(filepath) as data:
+                if json.loads(str(data["versions"])) != cls.get_versions():
+                    return None
+                keys = [
+                    tuple(k) if isinstance(k, list) else k
+                    for k in json.loads(str(data["locations"]))
+                ]
+                faces = cls.unpack(data["faces"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+        return cls(dict(zip(keys, faces)))
+
+    def save(self, filepath=LOCATION_FACES_FILEPATH):
+        """
+        Write the topology to a compressed numpy file.
+
+        :param filepath: path to the file
+        :type filepath: str or pathlib.Path
+        """
+        n_bytes = (self.faces.bit_length() + 7) // 8
+        np.savez_compressed(
+            filepath,
+            versions=json.dumps(self.get_versions()),
+            locations=json.dumps(list(self.topology)),
+            faces=np.array(
+                [
+                    np.frombuffer(v.to_bytes(n_bytes, "little"), dtype=np.uint8)
+                    for v in self.topology.values()
+                ]
+            ),
+        )
+
+    def resolved_row(self, locations):
+        """
+        Return a copy of the topology where `RoW` is defined as the faces not covered
+        by `locations`. Same as the `resolved_row` context manager of
+        `constructive_geometries`, without modifying the geomatcher.
+
+        :param locations: locations
+        :type locations: iterable
+        :rtype: Topology
+        """
+        new = copy.copy(self)
+        new.row = self.faces & ~reduce(
+            lambda x, y: x | y, (self[loc] for loc in locations)
+        )
+        return new
+
+    def actual_key(self, key):
+        if key in self.topology or key in ("RoW", "RoE", "GLO"):
+            return key
+        if ("ecoinvent", key) in self.topology:
+            return "ecoinvent", key
+        # the geomatcher falls back on country names
+        return geomatcher._actual_key(key)
+
+    def __contains__(self, key):
+        return key in self.topology or (key == "RoW" and self.row is not None)
+
+    def __getitem__(self, key):
+        if key == "RoW":
+            return self.row or 0
+        if key == "RoE":
+            return 0
+        return self.topology[self.actual_key(key)]
+
+    def _possibles(self, only):
+        if only is not None:
+            return {k: self[k] for k in only}
+        if self.row is None:
+            return self.topology
+        return {**self.topology, "RoW": self.row}
+
+    def _finish_filter(self, lst, key, include_self, exclusive, biggest_first):
+        key = self.actual_key(key)
+        locations = [x[0] for x in lst]
+
+        if not include_self and key in locations:
+            lst.pop(locations.index(key))
+
+        lst.sort(key=lambda x: x[1], reverse=biggest_first)
+        lst = [x for x, y in lst]
+
+        if key in ("RoW", "RoE") and key not in self and exclusive:
+            return [key] if key in lst else []
+        elif exclusive:
+            removed, remaining = 0, []
+            for current in lst:
+                faces = self[current]
+                if not faces & removed:
+                    removed |= faces
+                    remaining.append(current)
+            lst = remaining
+
+        # If RoW not resolved, make it the smallest
+        for undefined in ("RoW", "RoE"):
+            if undefined not in self and undefined in lst:
+                lst[-1 if biggest_first else 0] = lst.pop(lst.index(undefined))
+
+        return lst
+
+    def contained(
+        self, key, include_self=True, exclusive=False, biggest_first=True, only=None
+    ):
+        """
+        Return the locations that are completely within location `key`.
+
+        :rtype: list
+        """
+        for undefined in ("RoW", "RoE"):
+            if undefined not in self:
+                if key == undefined:
+                    return [undefined] if undefined in (only or []) else []
+                elif only and undefined in only:
+                    only = [o for o in only if o != undefined]
+
+        faces = self[key]
+        lst = [
+            (k, count_faces(v))
+            for k, v in self._possibles(only).items()
+            if v and not v & ~faces
+        ]
+        return self._finish_filter(lst, key, include_self, exclusive, biggest_first)
+
+    def intersects(
+        self, key, include_self=False, exclusive=False, biggest_first=True, only=None
+    ):
+        """
+        Return the locations that intersect location `key`.
+
+        :rtype: list
+        """
+        possibles = self._possibles(only)
+
+        for undefined in ("RoW", "RoE"):
+            if key == undefined and undefined not in self:
+                return [undefined] if undefined in possibles else []
+
+        faces = self[key]
+        lst = [
+            (k, (count_faces(v & faces), count_faces(v)))
+            for k, v in possibles.items()
+            if v & faces
+        ]
+        return self._finish_filter(lst, key, include_self, exclusive, biggest_first)
+
+    def within(
+        self, key, include_self=True, exclusive=False, biggest_first=True, only=None
+    ):
+        """
+        Return the locations that completely contain location `key`.
+
+        :rtype: list
+        """
+        possibles = self._possibles(only)
+
+        for undefined in ("RoW", "RoE"):
+            if key == undefined and undefined not in self:
+                answer = [x for x in (undefined, "GLO") if x in possibles]
+                return list(reversed(answer)) if biggest_first else answer
+
+        faces = self[key]
+        lst = [(k, count_faces(v)) for k, v in possibles.items() if not faces & ~v]
+        return self._finish_filter(lst, key, include_self, exclusive, biggest_first)
+
+
+@lru_cache(maxsize=None)
+def get_topology():
+    """
+    Return the topology of the geomatcher, loaded from the package data.
+    If the package data was built with other versions of `wurst` or
+    `constructive_geometries`, the topology is built from the geomatcher instead.
+
+    :rtype: Topology
+    """
+    return Topology.load() or Topology.from_geomatcher()
+
+
+def build_location_faces(filepath=LOCATION_FACES_FILEPATH):
+    """
+    Build the topology from the geomatcher and write it to `filepath`,
+    by default the file shipped with the package data.
+    To be run whenever `wurst` or `constructive_geometries` is upgraded,
+    as :func:`get_topology` ignores a file written with other versions::
+
+        python -c "from premise.geomap import build_location_faces; build_location_faces()"
+
+    :param filepath: path to the file
+    :type filepath: str or pathlib.Path
+    :return: the topology written to the file
+    :rtype: Topology
+    """
+    topology = Topology.from_geomatcher()
+    topology.save(filepath)
+    get_topology.cache_clear()
+
+    return topology
 
 
 class Geomap:
     """
     Map ecoinvent locations to REMIND regions and vice-versa.
+    Locations are compared using the topology of :func:`get_topology`.
+
+    There is a single instance per IAM model: `Geomap(model)` returns the
+    instance already created for `model`, if any.
+    Translations are computed once, when the instance is created, for all the IAM regions
+    and all the locations known to the geomatcher. Other locations are looked up
+    through the geomatcher and the result is memoized.
     """
 
+    _instances = {}
+
+    def __new__(cls, model):
+        if model not in cls._instances:
+            cls._instances[model] = super().__new__(cls)
+        return cls._instances[model]
+
+    def __reduce__(self):
+        # unpickling returns the instance of the receiving process
+        return Geomap, (self.model,)
+
     def __init__(self, model):
 
+        if getattr(self, "_initialized", False):
+            return
+
         self.model = model
         self.geo = geomatcher
+        self.topology = get_topology()
 
         self.iam_regions = [
             x[1]
@@ -21,6 +334,64 @@ class Geomap:
             if isinstance(x, tuple) and x[0] == self.model.upper()
         ]
 
+        self.ecoinvent_to_iam_mapping = self.get_ecoinvent_to_iam_mapping()
+
+        self.iam_to_ecoinvent_table = {
+            (region, contained): self.find_ecoinvent_locations(region, contained)
+            for region in self.iam_regions
+            for contained in (True, False)
+        }
+
+        self.ecoinvent_to_iam_table = {
+            location: self.find_iam_location(location, verbose=False)
+            for location in list(self.geo.keys()) + list(self.ecoinvent_to_iam_mapping)
+            if not isinstance(location, tuple)
+        }
+
+        self._initialized = True
+
+    def get_ecoinvent_to_iam_mapping(self):
+        """
+        Return the rules used to translate ecoinvent regions
+        which span over several IAM regions.
+
+        :return: dictionary with ecoinvent locations as keys and IAM regions as values
+        :rtype: dict
+        """
+
+        return {
+            "Europe without Austria": "EUR" if self.model == "remind" else "WEU",
+            "Europe without Switzerland and Austria": "EUR"
+            if self.model == "remind"
+            else "WEU",
+            "Europe without Switzerland": "EUR" if self.model == "remind" else "WEU",
+            "North America without Quebec": "USA",
+            "RER w/o RU": "EUR" if self.model == "remind" else "WEU",
+            "RER": "EUR" if self.model == "remind" else "WEU",
+            "RoW": "World",
+            "GLO": "World",
+            "RNA": "USA",
+            "SAS": "OAS" if self.model == "remind" else "SEAS",
+            "IAI Area, EU27 & EFTA": "EUR" if self.model == "remind" else "WEU",
+            "UN-OCEANIA": "CAZ" if self.model == "remind" else "OCE",
+            "UN-SEASIA": "OAS" if self.model == "remind" else "SEAS",
+            "RAF": "SSA" if self.model == "remind" else "RSAF",
+            "RAS": "CHA" if self.model == "remind" else "CHN",
+            "IAI Area, Africa": "SSA" if self.model == "remind" else "RSAF",
+            "RER w/o CH+DE": "EUR" if self.model == "remind" else "WEU",
+            "RER w/o DE+NL+RU": "EUR" if self.model == "remind" else "WEU",
+            "IAI Area, Asia, without China and GCC": "OAS"
+            if self.model == "remind"
+            else "SEAS",
+            "Europe, without Russia and Turkey": "EUR"
+            if self.model == "remind"
+            else "WEU",
+            "WECC": "USA",
+            "UCTE": "EUR" if self.model == "remind" else "WEU",
+            "UCTE without Germany": "EUR" if self.model == "remind" else "WEU",
+            "NORDEL": "NEU" if self.model == "remind" else "WEU",
+        }
+
     def iam_to_ecoinvent_location(self, location, contained=True):
         """
         Find the corresponding ecoinvent region given an IAM region.
@@ -34,11 +405,35 @@ class Geomap:
         :rtype: list
         """
 
+        if (location, contained) in self.iam_to_ecoinvent_table:
+            return list(self.iam_to_ecoinvent_table[(location, contained)])
+
+        return list(self.cached_find_ecoinvent_locations(location, contained))
+
+    @lru_cache(maxsize=1024)
+    def cached_find_ecoinvent_locations(self, location, contained):
+        return tuple(self.find_ecoinvent_locations(location, contained))
+
+    def find_ecoinvent_locations(self, location, contained=True):
+        """
+        Search the geomatcher for the ecoinvent regions corresponding to an IAM region.
+        See :meth:`iam_to_ecoinvent_location`, which uses precomputed results.
+
+        :param location: name of a IAM region
+        :type location: str
+        :param contained: whether only geographies that are contained within the IAM region should be returned.
+        :type contained: bool
+        :return: name(s) of an ecoinvent region
+        :rtype: list
+        """
+
         location = (self.model.upper(), location)
 
         ecoinvent_locations = []
         try:
-            searchfunc = self.geo.contained if contained else self.geo.intersects
+            searchfunc = (
+                self.topology.contained if contained else self.topology.intersects
+            )
             for r in searchfunc(location):
                 if not isinstance(r, tuple):
                     ecoinvent_locations.append(r)
@@ -66,53 +461,47 @@ class Geomap:
         :rtype: str
         """
 
-        mapping = {
-            "Europe without Austria": "EUR" if self.model == "remind" else "WEU",
-            "Europe without Switzerland and Austria": "EUR"
-            if self.model == "remind"
-            else "WEU",
-            "Europe without Switzerland": "EUR" if self.model == "remind" else "WEU",
-            "North America without Quebec": "USA",
-            "RER w/o RU": "EUR" if self.model == "remind" else "WEU",
-            "RER": "EUR" if self.model == "remind" else "WEU",
-            "RoW": "World",
-            "GLO": "World",
-            "RNA": "USA",
-            "SAS": "OAS" if self.model == "remind" else "SEAS",
-            "IAI Area, EU27 & EFTA": "EUR" if self.model == "remind" else "WEU",
-            "UN-OCEANIA": "CAZ" if self.model == "remind" else "OCE",
-            "UN-SEASIA": "OAS" if self.model == "remind" else "SEAS",
-            "RAF": "SSA" if self.model == "remind" else "RSAF",
-            "RAS": "CHA" if self.model == "remind" else "CHN",
-            "IAI Area, Africa": "SSA" if self.model == "remind" else "RSAF",
-            "RER w/o CH+DE": "EUR" if self.model == "remind" else "WEU",
-            "RER w/o DE+NL+RU": "EUR" if self.model == "remind" else "WEU",
-            "IAI Area, Asia, without China and GCC": "OAS"
-            if self.model == "remind"
-            else "SEAS",
-            "Europe, without Russia and Turkey": "EUR"
-            if self.model == "remind"
-            else "WEU",
-            "WECC": "USA",
-            "UCTE": "EUR" if self.model == "remind" else "WEU",
-            "UCTE without Germany": "EUR" if self.model == "remind" else "WEU",
-            "NORDEL": "NEU" if self.model == "remind" else "WEU",
-        }
-        if location in mapping:
-            return mapping[location]
+        if location in self.ecoinvent_to_iam_table:
+            iam_location = self.ecoinvent_to_iam_table[location]
+            if iam_location is None:
+                print("no location for {}".format(location))
+            return iam_location
+
+        return self.cached_find_iam_location(location)
+
+    @lru_cache(maxsize=1024)
+    def cached_find_iam_location(self, location):
+        return self.find_iam_location(location)
+
+    def find_iam_location(self, location, verbose=True):
+        """
+        Search the geomatcher for the IAM region corresponding to an ecoinvent location.
+        See :meth:`ecoinvent_to_iam_location`, which uses precomputed results.
+
+        :param location: 2-digit ISO country code
+        :type location: str
+        :param verbose: whether to print a message when the location is ambiguous or cannot be found
+        :type verbose: bool
+        :return: IAM region name
+        :rtype: str
+        """
+
+        if location in self.ecoinvent_to_iam_mapping:
+            return self.ecoinvent_to_iam_mapping[location]
 
         try:
             iam_location = [
                 r[1]
-                for r in self.geo.within(location)
+                for r in self.topology.within(location)
                 if r[0] == self.model.upper() and r[1] != "World"
             ]
         except KeyError:
-            print(
-                "Cannot find the IAM location for {} from IAM model {}.".format(
-                    location, self.model
+            if verbose:
+                print(
+                    "Cannot find the IAM location for {} from IAM model {}.".format(
+                        location, self.model
+                    )
                 )
-            )
             iam_location = ["World"]
 
         mapping = {
@@ -131,7 +520,10 @@ class Geomap:
 
         # If we have more than one REMIND region
         if len(iam_location) > 1:
-            print(f"more than one locations possible for {location}: {iam_location}")
+            if verbose:
+                print(
+                    f"more than one locations possible for {location}: {iam_location}"
+                )
             # TODO: find a more elegant way to do that
             for key, value in mapping.items():
                 # We need to find the most specific REMIND region
@@ -172,31 +564,26 @@ class Geomap:
 
             if location in d_ecoinvent_regions:
                 return d_ecoinvent_regions[location]
-            else:
+            elif verbose:
                 print("no location for {}".format(location))
 
             # It can also be that the location is already
             # an IAM location
 
-            list_IAM_regions = [
-                k[1]
-                for k in list(self.geo.keys())
-                if isinstance(k, tuple) and k[0].lower() == self.model.lower()
-            ]
-
-            if location in list_IAM_regions:
+            if location in self.iam_regions:
                 return location
 
             # Or it could be an ecoinvent region
             try:
-                iam_location = self.geo.intersects(("ecoinvent", location))
+                iam_location = self.topology.intersects(("ecoinvent", location))
                 iam_location = [
                     i[1] for i in iam_location if i[0].lower() == self.model
                 ]
                 return iam_location[0]
 
             except KeyError:
-                print("no location for {}".format(location))
+                if verbose:
+                    print("no location for {}".format(location))
         else:
             return iam_location[0]
 
@@ -1,7 +1,11 @@
+import copy
 import csv
 import pickle
 import sys
 import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import carculator
@@ -9,12 +13,20 @@ import carculator_truck
 import numpy as np
 import wurst
 import xarray as xr
-from bw2io import ExcelImporter, Migration
+from bw2io import ExcelImporter
 from bw2io.importers.base_lci import LCIImporter
 from prettytable import PrettyTable
 from wurst import searching as ws
 
 from . import DATA_DIR, INVENTORY_DIR
+from .cache import (
+    get_cache_filepath,
+    get_cache_key,
+    get_file_hash,
+    load_from_cache,
+    save_to_cache,
+)
+from .dataset_index import ConsumerIndex, KeyIndex
 from .geomap import Geomap
 from .utils import *
 
@@ -23,32 +35,232 @@ FILEPATH_BIOSPHERE_FLOWS = DATA_DIR / "dict_biosphere.txt"
 FILEPATH_MIGRATION_MAP = INVENTORY_DIR / "migration_map.csv"
 
 
-def generate_migration_maps(origin, destination):
-
-    response = {"fields": ["name", "reference product", "location"], "data": []}
+def iter_migration_map():
+    """
+    Iterate over the rows of the migration map file.
 
+    :return: generator of ((origin, destination), ((name, reference product, location), new values))
+    """
     with open(FILEPATH_MIGRATION_MAP, "r") as read_obj:
         csv_reader = csv.reader(read_obj, delimiter=";")
         next(csv_reader)
         for row in csv_reader:
-            if row[0] == origin and row[1] == destination:
-                data = {}
-                if row[5] != "":
-                    data["name"] = row[5]
-                if row[6] != "":
-                    data["reference product"] = row[6]
-                if row[7] != "":
-                    data["location"] = row[7]
-                response["data"].append(((row[2], row[3], row[4]), data))
+            data = {}
+            if row[5] != "":
+                data["name"] = row[5]
+            if row[6] != "":
+                data["reference product"] = row[6]
+            if row[7] != "":
+                data["location"] = row[7]
+            yield (row[0], row[1]), ((row[2], row[3], row[4]), data)
+
+
+def generate_migration_maps(origin, destination):
+
+    response = {"fields": ["name", "reference product", "location"], "data": []}
+
+    for versions, migration in iter_migration_map():
+        if versions == (origin, destination):
+            response["data"].append(migration)
     return response
 
 
-EI_37_35_MIGRATION_MAP = generate_migration_maps("37", "35")
-EI_37_36_MIGRATION_MAP = generate_migration_maps("37", "36")
-EI_35_37_MIGRATION_MAP = generate_migration_maps("35", "37")
-EI_35_36_MIGRATION_MAP = generate_migration_maps("35", "36")
-EI_36_37_MIGRATION_MAP = generate_migration_maps("36", "37")
-EI_36_35_MIGRATION_MAP = generate_migration_maps("36", "35")
+MIGRATION_FIELDS = ("name", "reference product", "location")
+
+
+def get_migration_key(data):
+    """
+    Return the key under which a dataset or an exchange is looked up in a migration map:
+    its name, reference product and location, in lower case, as done by `bw2io` migrations.
+
+    :param data: a dataset or an exchange
+    :type data: dict
+    :rtype: tuple
+    """
+    return tuple(str(data.get(field, "")).lower().strip() for field in MIGRATION_FIELDS)
+
+
+@lru_cache()
+def load_migration_maps():
+    """
+    Read the migration map file once, and compile it into one lookup dictionary
+    per pair of ecoinvent versions.
+
+    :return: dictionary with (origin, destination) versions as keys (e.g., ("37", "35")),
+        and dictionaries mapping :func:`get_migration_key` keys to the new field values as values
+    :rtype: dict
+    """
+    maps = defaultdict(dict)
+
+    for (origin, destination), (key, data) in iter_migration_map():
+        maps[(origin, destination)][
+            get_migration_key(dict(zip(MIGRATION_FIELDS, key)))
+        ] = data
+
+    return dict(maps)
+
+
+def load_inventory_file(inventory):
+    """
+    Load an inventory file, unless the linked inventory is cached.
+    Used by :func:`load_inventories` in worker processes, where the target database is not available.
+
+    :param inventory: importer class, path to the inventory file, target version and whether to use the cache
+    :type inventory: tuple
+    :return: the inventory, or None if the linked inventory is cached
+    """
+    importer, path, version, use_cache = inventory
+    inventory = importer([], version, path, use_cache)
+    return None if inventory.is_linked else inventory.import_db
+
+
+def load_inventories(inventories, version, use_cache=False, n_jobs=1):
+    """
+    Load several inventory files, in `n_jobs` processes.
+    Inventories are only loaded here, as linking them requires the target database:
+    the loaded inventories are to be passed to the importers, with the `import_db` argument.
+
+    :param inventories: list of (importer class, path to the inventory file) tuples
+    :type inventories: list
+    :param version: the version of the target database
+    :type version: str
+    :param use_cache: whether linked inventories are loaded from the cache
+    :type use_cache: bool
+    :param n_jobs: number of processes
+    :type n_jobs: int
+    :return: list of loaded inventories, in the order of `inventories`,
+        with None for the inventories which linked version is cached.
+        If `n_jobs` is 1, nothing is loaded and the importers load the inventories themselves.
+    :rtype: list
+    """
+    args = [(importer, path, version, use_cache) for importer, path in inventories]
+
+    if n_jobs > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            return list(executor.map(load_inventory_file, args))
+
+    return [None] * len(args)
+
+
+# inventories of vehicle fleets created during this session, by cache key
+VEHICLE_INVENTORIES = {}
+
+
+def get_fuel_blend_key(fuel_blend, region):
+    """
+    Return the shares of the fuel blend of a region, as a hashable key.
+
+    :param fuel_blend: fuel blend, from `get_liquid_fuel_blend` or `get_gas_fuel_blend`
+    :type fuel_blend: xarray.DataArray
+    :param region: IAM region
+    :type region: str
+    :rtype: tuple
+    """
+    blend = fuel_blend.sel(region=region)
+    return (
+        tuple(blend.coords["variables"].values.tolist()),
+        tuple(blend.coords["year"].values.tolist()),
+        blend.transpose("variables", "year").values.tolist(),
+    )
+
+
+def is_vehicle_inventory_cached(key):
+    """
+    Return True if the inventory of a vehicle fleet is in the memory or disk cache.
+
+    :param key: cache key of the inventory, or None
+    :type key: str
+    :rtype: bool
+    """
+    return key is not None and (
+        key in VEHICLE_INVENTORIES
+        or get_cache_filepath("vehicle_inventories", key).is_file()
+    )
+
+
+def load_vehicle_inventory(key, create):
+    """
+    Return the inventory of a vehicle fleet, from the memory or disk cache.
+    If it is not cached, it is created by `create` and then cached.
+
+    :param key: cache key of the inventory. If None, the cache is not used.
+    :type key: str
+    :param create: function returning the inventory, as a `bw2io` importer
+    :type create: callable
+    :return: the inventory, which can be modified without altering the cached one
+    :rtype: bw2io.importers.base_lci.LCIImporter
+    """
+    if key is None:
+        return create()
+
+    if key not in VEHICLE_INVENTORIES:
+        cached = load_from_cache("vehicle_inventories", key)
+        if cached is None:
+            inventory = create()
+            cached = (inventory.db_name, copy_database(inventory.data))
+            save_to_cache("vehicle_inventories", key, cached)
+        VEHICLE_INVENTORIES[key] = cached
+
+    db_name, data = VEHICLE_INVENTORIES[key]
+    import_db = LCIImporter(db_name)
+    import_db.data = copy_database(data)
+    return import_db
+
+
+# importer and inputs used by the worker processes of `create_region_inventories`
+_REGION_WORKER = None
+
+
+def _init_region_worker(importer, fleet_array, liquid_fuel_blend, gas_fuel_blend):
+    global _REGION_WORKER
+    importer.geomap = Geomap(model=importer.model)
+    _REGION_WORKER = (importer, fleet_array, liquid_fuel_blend, gas_fuel_blend)
+
+
+def _create_region_inventory(region):
+    importer, fleet_array, liquid_fuel_blend, gas_fuel_blend = _REGION_WORKER
+    inventory = importer.create_region_inventory(
+        fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+    )
+    import_db = LCIImporter(inventory.db_name)
+    import_db.data = inventory.data
+    return import_db
+
+
+def create_region_inventories(
+    importer, regions, fleet_array, liquid_fuel_blend, gas_fuel_blend, n_jobs
+):
+    """
+    Create the inventories of several regions with the `create_region_inventory` method
+    of a vehicle fleet importer, in `n_jobs` processes.
+    The vehicle model is built once in each process.
+
+    :param importer: a :class:`CarculatorInventory` or :class:`TruckInventory` instance
+    :param regions: IAM regions
+    :type regions: list
+    :param fleet_array: fleet composition
+    :param liquid_fuel_blend: liquid fuel blend
+    :type liquid_fuel_blend: xarray.DataArray
+    :param gas_fuel_blend: gas fuel blend
+    :type gas_fuel_blend: xarray.DataArray
+    :param n_jobs: number of processes
+    :type n_jobs: int
+    :return: the inventories, in the order of `regions`
+    :rtype: list
+    """
+    # the target database is not needed by the workers,
+    # and the geomap is rebuilt in each of them
+    worker = copy.copy(importer)
+    worker.db = None
+    worker.key_index = None
+    worker.geomap = None
+
+    with ProcessPoolExecutor(
+        max_workers=min(n_jobs, len(regions)),
+        initializer=_init_region_worker,
+        initargs=(worker, fleet_array, liquid_fuel_blend, gas_fuel_blend),
+    ) as executor:
+        return list(executor.map(_create_region_inventory, regions))
 
 
 class BaseInventoryImport:
@@ -60,9 +272,25 @@ class BaseInventoryImport:
     :vartype db: list
     :ivar version: the target Ecoinvent database version
     :vartype version: str
+    :cvar cacheable: if True, the inventory, once migrated and linked to the biosphere
+                     by :meth:`link_inventory`, is stored in a local cache and reloaded from it
+                     as long as the inventory file, the target version, the migration map and
+                     the biosphere flows do not change. Reference products, which depend on
+                     :attr:`db`, are resolved after loading the inventory from the cache.
+    :vartype cacheable: bool
     """
 
-    def __init__(self, database, version, path):
+    cacheable = False
+
+    def __init__(
+        self,
+        database,
+        version,
+        path,
+        use_cache=False,
+        import_db=None,
+        key_index=None,
+    ):
         """Create a :class:`BaseInventoryImport` instance.
 
         :param list database: the target database for the import (the Ecoinvent database),
@@ -71,13 +299,17 @@ class BaseInventoryImport:
         :type version: str
         :param path: Path to the imported inventory.
         :type path: str or Path
+        :param use_cache: whether to load the linked inventory from the cache, if :attr:`cacheable`
+        :type use_cache: bool
+        :param import_db: the inventory, if already loaded from `path` (see :func:`load_inventories`)
+        :param key_index: index of the codes and names of the datasets of `database`,
+                          shared by the importers merging inventories into it, in turn.
+                          Built from `database` if not given.
+        :type key_index: premise.dataset_index.KeyIndex
 
         """
         self.db = database
-        self.db_code = [x["code"] for x in self.db]
-        self.db_names = [
-            (x["name"], x["reference product"], x["location"]) for x in self.db
-        ]
+        self.key_index = key_index if key_index is not None else KeyIndex(database)
         self.version = version
         self.biosphere_dict = self.get_biosphere_code()
 
@@ -90,7 +322,50 @@ class BaseInventoryImport:
                 )
 
         self.path = path
-        self.import_db = self.load_inventory(path)
+        self.cache_key = self.get_cache_key() if use_cache and self.cacheable else None
+        self.import_db = self.load_linked_inventory()
+        self.is_linked = self.import_db is not None
+
+        if not self.is_linked:
+            self.import_db = (
+                import_db if import_db is not None else self.load_inventory(path)
+            )
+
+    def get_cache_key(self):
+        """
+        Return the key under which the linked inventory is cached.
+        It depends on the content of the inventory file, the target version,
+        the migration map and the dictionary of biosphere flows.
+
+        :return: cache key
+        :rtype: str
+        """
+        return get_cache_key(
+            self.__class__.__name__,
+            get_file_hash(self.path),
+            self.version,
+            get_file_hash(FILEPATH_MIGRATION_MAP),
+            get_file_hash(FILEPATH_BIOSPHERE_FLOWS),
+        )
+
+    def load_linked_inventory(self):
+        """
+        Load the linked inventory from the cache.
+
+        :return: the linked inventory, or None if it is not cached
+        :rtype: bw2io.importers.base_lci.LCIImporter
+        """
+        if self.cache_key is None:
+            return None
+
+        cached = load_from_cache("inventories", self.cache_key)
+        if cached is None:
+            return None
+
+        db_name, data = cached
+        import_db = LCIImporter(db_name)
+        import_db.data = data
+        return import_db
 
     def load_inventory(self, path):
         """Load an inventory from a specified path.
@@ -103,15 +378,62 @@ class BaseInventoryImport:
         """
         pass
 
+    def migrate_inventory(self, origin, destination):
+        """Rename the datasets and exchanges of :attr:`import_db` that differ
+        between two ecoinvent versions, according to the migration map.
+
+        Modifies :attr:`import_db` in-place.
+
+        :param origin: ecoinvent version the inventory links to (e.g., "37")
+        :type origin: str
+        :param destination: target ecoinvent version (e.g., "35")
+        :type destination: str
+        :returns: Nothing
+
+        """
+        migration_map = load_migration_maps().get((origin, destination), {})
+
+        for ds in self.import_db.data:
+            for data in [ds] + ds.get("exchanges", []):
+                new_data = migration_map.get(get_migration_key(data))
+                if new_data is not None:
+                    data.update(new_data)
+
+    def link_inventory(self):
+        """Apply migrations to the inventory and link its biosphere exchanges.
+        This step must not depend on :attr:`db`, as its result is cached.
+
+        Modifies :attr:`import_db` in-place.
+
+        :returns: Nothing
+
+        """
+        pass
+
     def prepare_inventory(self):
         """Prepare the inventory for the merger with Ecoinvent.
 
+        Calls :meth:`link_inventory`, unless the inventory was loaded linked from the cache,
+        adds the reference products of the exchanges, looked up in :attr:`db`,
+        and removes the datasets that already exist in :attr:`db`.
         Modifies :attr:`import_db` in-place.
 
         :returns: Nothing
 
         """
-        pass
+        if not self.is_linked:
+            self.link_inventory()
+            self.is_linked = True
+
+            if self.cache_key is not None:
+                save_to_cache(
+                    "inventories",
+                    self.cache_key,
+                    (self.import_db.db_name, self.import_db.data),
+                )
+
+        self.add_product_field_to_exchanges()
+        self.check_for_duplicates()
 
     def check_for_duplicates(self):
         """
@@ -123,15 +445,16 @@ class BaseInventoryImport:
         already_exist = [
             (x["name"].lower(), x["reference product"].lower(), x["location"])
             for x in self.import_db.data
-            if x["code"] in self.db_code
+            if self.key_index.has_code(x["code"])
         ]
 
         already_exist.extend(
             [
                 (x["name"].lower(), x["reference product"].lower(), x["location"])
                 for x in self.import_db.data
-                if (x["name"].lower(), x["reference product"].lower(), x["location"])
-                in self.db_names
+                if self.key_index.has_key(
+                    x["name"].lower(), x["reference product"].lower(), x["location"]
+                )
             ]
         )
 
@@ -145,19 +468,20 @@ class BaseInventoryImport:
 
             print(t)
 
-        self.import_db.data = [
-            x for x in self.import_db.data if x["code"] not in self.db_code
-        ]
         self.import_db.data = [
             x
             for x in self.import_db.data
-            if (x["name"], x["reference product"], x["location"]) not in self.db_names
+            if not self.key_index.has_code(x["code"])
+            and not self.key_index.has_key(
+                x["name"], x["reference product"], x["location"]
+            )
         ]
 
     def merge_inventory(self):
         """Prepare :attr:`import_db` and merge the inventory to the ecoinvent :attr:`db`.
 
-        Calls :meth:`prepare_inventory`. Changes the :attr:`db` attribute.
+        Calls :meth:`prepare_inventory`. Changes the :attr:`db` attribute,
+        and adds the merged datasets to :attr:`key_index`.
 
         :returns: Nothing
 
@@ -165,6 +489,9 @@ class BaseInventoryImport:
         self.prepare_inventory()
         self.db.extend(self.import_db)
 
+        for ds in self.import_db.data:
+            self.key_index.add(ds)
+
     def search_exchanges(self, srchdict):
         """Search :attr:`import_db` by field values.
 
@@ -221,9 +548,11 @@ class BaseInventoryImport:
         return results
 
     @staticmethod
+    @lru_cache()
     def get_biosphere_code():
         """
         Retrieve a dictionary with biosphere flow names and uuid codes.
+        The file is read once, and the dictionary is shared by all importers.
 
         :returns: dictionary with biosphere flow names as keys and uuid code as values
         :rtype: dict
@@ -407,82 +736,49 @@ class BaseInventoryImport:
 
 
 class CarmaCCSInventory(BaseInventoryImport):
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # Carma inventories are originally made with ei 3.5
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_35_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("35", "37")
 
         if self.version == "3.6":
             # apply some updates to comply with ei 3.6
-            new_technosphere_data = EI_35_36_MIGRATION_MAP
-
-            Migration("migration_36").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("migration_36")
+            self.migrate_inventory("35", "36")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class DACInventory(BaseInventoryImport):
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # Inventories initially made with ei 37
         if self.version == "3.6":
             # apply some updates to go from ei3.7 to ei3.6
-            new_technosphere_data = EI_37_36_MIGRATION_MAP
-
-            Migration("migration_36").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.7 to 3.5",
-            )
-            self.import_db.migrate("migration_36")
+            self.migrate_inventory("37", "36")
 
         if self.version == "3.5":
             # apply some updates to go from ei3.7 to ei3.5
-            new_technosphere_data = EI_37_35_MIGRATION_MAP
-
-            Migration("migration_35").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.7 to 3.5",
-            )
-            self.import_db.migrate("migration_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
+
+    def prepare_inventory(self):
+        super().prepare_inventory()
 
         # Add carbon storage for CCS technologies
         print("Add fossil carbon dioxide storage for CCS technologies.")
         self.add_negative_CO2_flows_for_biomass_CCS()
 
-        # Check for duplicates
-        self.check_for_duplicates()
-
     def add_negative_CO2_flows_for_biomass_CCS(self):
         """
         Rescale the amount of all exchanges of carbon dioxide, non-fossil by a factor -9 (.9/-.1),
@@ -512,41 +808,23 @@ class BiofuelInventory(BaseInventoryImport):
     Biofuel datasets from the master thesis of Francesco Cozzolino (2018).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
 
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_35_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("35", "37")
 
         # Migrations for 3.6
         if self.version == "3.6":
-            migrations = EI_35_36_MIGRATION_MAP
-
-            Migration("biofuels_ecoinvent_36").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("biofuels_ecoinvent_36")
+            self.migrate_inventory("35", "36")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class HydrogenInventory(BaseInventoryImport):
@@ -554,42 +832,24 @@ class HydrogenInventory(BaseInventoryImport):
     Hydrogen datasets from the ELEGANCY project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # inventories initially links to ei37
 
         # migration for ei 3.6
         if self.version == "3.6":
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_37_36_MIGRATION_MAP
-
-            Migration("migration_36").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.7 to 3.6",
-            )
-            self.import_db.migrate("migration_36")
+            self.migrate_inventory("37", "36")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("hydrogen_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.5",
-            )
-            self.import_db.migrate("hydrogen_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class HydrogenBiogasInventory(BaseInventoryImport):
@@ -597,40 +857,22 @@ class HydrogenBiogasInventory(BaseInventoryImport):
     Hydrogen datasets from the ELEGANCY project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("hydrogen_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("hydrogen_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class BiogasInventory(BaseInventoryImport):
@@ -638,40 +880,22 @@ class BiogasInventory(BaseInventoryImport):
     Biogas datasets from the SCCER project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("biogas_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.5",
-            )
-            self.import_db.migrate("biogas_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class SyngasInventory(BaseInventoryImport):
@@ -679,37 +903,22 @@ class SyngasInventory(BaseInventoryImport):
     Synthetic fuel datasets from the PSI project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
 
         # migration for ei 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("syngas_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.6 to 3.5",
-            )
-            self.import_db.migrate("syngas_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
 
 
 class SynfuelInventory(BaseInventoryImport):
@@ -717,38 +926,21 @@ class SynfuelInventory(BaseInventoryImport):
     Synthetic fuel datasets from the PSI project (2019).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
 
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("syngas_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.6 to 3.5",
-            )
-            self.import_db.migrate("syngas_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class GeothermalInventory(BaseInventoryImport):
@@ -757,28 +949,17 @@ class GeothermalInventory(BaseInventoryImport):
     .
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class LPGInventory(BaseInventoryImport):
@@ -786,39 +967,22 @@ class LPGInventory(BaseInventoryImport):
     Liquified Petroleum Gas (LPG) from methanol distillation, the PSI project (2020), with hydrogen from electrolysis.
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # migration for ei 3.7
         if self.version in ["3.7", "3.7.1"]:
             # apply some updates to comply with ei 3.7
-            new_technosphere_data = EI_36_37_MIGRATION_MAP
-
-            Migration("migration_37").write(
-                new_technosphere_data,
-                description="Change technosphere names due to change from 3.5/3.6 to 3.7",
-            )
-            self.import_db.migrate("migration_37")
+            self.migrate_inventory("36", "37")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("LPG_ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("LPG_ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class VariousVehicles(BaseInventoryImport):
@@ -826,39 +990,22 @@ class VariousVehicles(BaseInventoryImport):
     Imports various future vehicles' inventories (two-wheelers, buses, trams, etc.).
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
 
-    def prepare_inventory(self):
+    def link_inventory(self):
 
         # Migrations for 3.6
         if self.version == "3.6":
-            migrations = EI_37_36_MIGRATION_MAP
-
-            Migration("ecoinvent_36").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_36")
+            self.migrate_inventory("37", "36")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
-        self.add_product_field_to_exchanges()
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class PassengerCars(BaseInventoryImport):
@@ -896,23 +1043,11 @@ class PassengerCars(BaseInventoryImport):
 
         # Migrations for 3.6
         if self.version == "3.6":
-            migrations = EI_37_36_MIGRATION_MAP
-
-            Migration("ecoinvent_36").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_36")
+            self.migrate_inventory("37", "36")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
         self.add_product_field_to_exchanges()
@@ -946,7 +1081,26 @@ class PassengerCars(BaseInventoryImport):
             "market for transport, passenger car, large size, diesel, EURO 4",
             "market for transport, passenger car, large size, diesel, EURO 5",
         ]
-        for ds in self.db:
+        fleet_suppliers = [
+            x
+            for x in self.db
+            if "transport, passenger car, fleet average, all powertrains" in x["name"]
+            and "transport" in x["reference product"]
+        ]
+
+        def get_fleet_supplier(location):
+            suppliers = [x for x in fleet_suppliers if x["location"] == location]
+            if len(suppliers) == 0:
+                raise ws.NoResults(
+                    "No fleet average supplier found in {}".format(location)
+                )
+            if len(suppliers) > 1:
+                raise ws.MultipleResults(
+                    "Multiple fleet average suppliers found in {}".format(location)
+                )
+            return suppliers[0]
+
+        for ds in ConsumerIndex(self.db).consumers(exchanges_to_modify):
             excs = (
                 exc
                 for exc in ds["exchanges"]
@@ -957,19 +1111,8 @@ class PassengerCars(BaseInventoryImport):
 
                 try:
 
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains(
-                                "name",
-                                "transport, passenger car, fleet average, all powertrains",
-                            ),
-                            ws.equals(
-                                "location",
-                                self.geomap.ecoinvent_to_iam_location(ds["location"]),
-                            ),
-                            ws.contains("reference product", "transport"),
-                        ],
+                    new_supplier = get_fleet_supplier(
+                        self.geomap.ecoinvent_to_iam_location(ds["location"])
                     )
 
                     exc["name"] = new_supplier["name"]
@@ -979,17 +1122,7 @@ class PassengerCars(BaseInventoryImport):
 
                 except ws.NoResults:
 
-                    new_supplier = ws.get_one(
-                        self.db,
-                        *[
-                            ws.contains(
-                                "name",
-                                "transport, passenger car, fleet average, all powertrains",
-                            ),
-                            ws.equals("location", self.regions[0]),
-                            ws.contains("reference product", "transport"),
-                        ],
-                    )
+                    new_supplier = get_fleet_supplier(self.regions[0])
 
                     exc["name"] = new_supplier["name"]
                     exc["location"] = new_supplier["location"]
@@ -1036,23 +1169,11 @@ class Trucks(BaseInventoryImport):
 
         # Migrations for 3.6
         if self.version == "3.6":
-            migrations = EI_37_36_MIGRATION_MAP
-
-            Migration("ecoinvent_36").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_36")
+            self.migrate_inventory("37", "36")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("ecoinvent_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.5 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_35")
+            self.migrate_inventory("37", "35")
 
         self.add_biosphere_links()
         self.add_product_field_to_exchanges()
@@ -1199,9 +1320,7 @@ class AdditionalInventory(BaseInventoryImport):
     Import additional inventories, if any.
     """
 
-    def __init__(self, database, version, path):
-        super().__init__(database, version, path)
-        self.import_db = self.load_inventory(path)
+    cacheable = True
 
     def load_inventory(self, path):
         return ExcelImporter(path)
@@ -1213,28 +1332,16 @@ class AdditionalInventory(BaseInventoryImport):
                 if not v:
                     del x[k]
 
-    def prepare_inventory(self):
+    def link_inventory(self):
         # Initially links to ei37
 
         # Migrations for 3.6
         if self.version == "3.6":
-            migrations = EI_37_36_MIGRATION_MAP
-
-            Migration("ecoinvent_36").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.6",
-            )
-            self.import_db.migrate("ecoinvent_36")
+            self.migrate_inventory("37", "36")
 
         # Migrations for 3.5
         if self.version == "3.5":
-            migrations = EI_37_35_MIGRATION_MAP
-
-            Migration("migration_35").write(
-                migrations,
-                description="Change technosphere names due to change from 3.7 to 3.5",
-            )
-            self.import_db.migrate("migration_35")
+            self.migrate_inventory("37", "35")
 
         list_missing_prod = self.search_missing_exchanges(
             label="type", value="production"
@@ -1288,9 +1395,6 @@ class AdditionalInventory(BaseInventoryImport):
             sys.exit()
 
         self.remove_missing_fields()
-        self.add_product_field_to_exchanges()
-        # Check for duplicates
-        self.check_for_duplicates()
 
 
 class CarculatorInventory(BaseInventoryImport):
@@ -1308,6 +1412,8 @@ class CarculatorInventory(BaseInventoryImport):
         regions,
         iam_data,
         filters=None,
+        use_cache=False,
+        n_jobs=1,
     ):
         self.db_year = year
         self.model = model
@@ -1320,6 +1426,10 @@ class CarculatorInventory(BaseInventoryImport):
         if filters:
             self.filter.extend(filters)
 
+        self.use_cache = use_cache
+        self.n_jobs = n_jobs
+        self.vehicle_model = None
+
         super().__init__(database, version, Path("."))
 
     def get_liquid_fuel_blend(self, allocate_all_synfuels):
@@ -1331,19 +1441,18 @@ class CarculatorInventory(BaseInventoryImport):
                     variables=["SE|Liquids|Hydrogen"]
                 ) / self.data.sel(variables="FE|Transport|Pass|Road|LDV|Liquids")
 
-                share_liquids = (
-                    self.data.sel(
-                        variables=[
-                            "FE|Transport|Liquids|Oil",
-                            "FE|Transport|Liquids|Biomass",
-                        ]
-                    )
-                    / self.data.sel(
-                        variables=[
-                            "FE|Transport|Liquids|Oil",
-                            "FE|Transport|Liquids|Biomass",
-                        ]
-                    ).sum(dim="variables")
+                share_liquids = self.data.sel(
+                    variables=[
+                        "FE|Transport|Liquids|Oil",
+                        "FE|Transport|Liquids|Biomass",
+                    ]
+                ) / self.data.sel(
+                    variables=[
+                        "FE|Transport|Liquids|Oil",
+                        "FE|Transport|Liquids|Biomass",
+                    ]
+                ).sum(
+                    dim="variables"
                 )
                 share_liquids *= 1 - share_synfuel.values
 
@@ -1440,321 +1549,402 @@ class CarculatorInventory(BaseInventoryImport):
 
         return share_gas
 
-    def load_inventory(self, path):
-        """Create `carculator` fleet average inventories for a given range of years."""
+    def get_vehicle_model(self):
+        """Create the `carculator` car model, with parameters interpolated over the years of the fleet.
+        The model is only built once, and only if the inventory of a region is not cached.
 
-        cip = carculator.CarInputParameters()
-        cip.static()
-        _, array = carculator.fill_xarray_from_input_parameters(cip)
-
-        array = array.interp(
-            year=np.arange(1996, self.db_year + 1), kwargs={"fill_value": "extrapolate"}
-        )
-        cm = carculator.CarModel(array, cycle="WLTC 3.4")
-        cm.set_all()
+        :return: vehicle model
+        """
+        if self.vehicle_model is None:
+            cip = carculator.CarInputParameters()
+            cip.static()
+            _, array = carculator.fill_xarray_from_input_parameters(cip)
+
+            array = array.interp(
+                year=np.arange(1996, self.db_year + 1),
+                kwargs={"fill_value": "extrapolate"},
+            )
+            cm = carculator.CarModel(array, cycle="WLTC 3.4")
+            cm.set_all()
+            self.vehicle_model = cm
 
-        fleet_array = carculator.create_fleet_composition_from_IAM_file(self.fleet_file)
+        return self.vehicle_model
 
-        liquid_fuel_blend = self.get_liquid_fuel_blend(allocate_all_synfuels=True)
-        gas_fuel_blend = self.get_gas_fuel_blend()
-
-        import_db = None
+    def get_region_cache_key(self, region, liquid_fuel_blend, gas_fuel_blend):
+        """
+        Return the key under which the inventory of a region is cached.
+        It depends on the fleet file, the year, the region, the filters,
+        the fuel blends of the region and the version of `carculator`.
 
-        for r, region in enumerate(self.regions):
+        :param region: IAM region
+        :type region: str
+        :return: cache key
+        :rtype: str
+        """
+        return get_cache_key(
+            self.__class__.__name__,
+            get_file_hash(self.fleet_file),
+            str(self.version),
+            self.model,
+            self.db_year,
+            region,
+            list(self.regions),
+            self.filter,
+            get_fuel_blend_key(liquid_fuel_blend, region),
+            get_fuel_blend_key(gas_fuel_blend, region),
+            carculator.__version__,
+        )
 
-            # The fleet file has REMIND region
-            # Hence, if we use IMAGE, we need to convert
-            # the region names
-            # which is something `iam_to_GAINS_region()` does.
-            if self.model == "remind":
-                if region == "World":
-                    reg_fleet = [r for r in self.regions if r != "World"]
-                else:
-                    reg_fleet = region
-            if self.model == "image":
-                if region == "World":
-                    reg_fleet = [
-                        self.geomap.iam_to_GAINS_region(r)
-                        for r in self.regions
-                        if r != "World"
-                    ]
-                else:
-                    reg_fleet = self.geomap.iam_to_GAINS_region(region)
+    def create_region_inventory(
+        self, fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+    ):
+        """Create the fleet average inventory of a region.
 
-            fleet = fleet_array.sel(
-                IAM_region=reg_fleet, vintage_year=np.arange(1996, self.db_year + 1)
-            ).interp(variable=np.arange(1996, self.db_year + 1))
+        :param fleet_array: fleet composition
+        :param region: IAM region
+        :type region: str
+        :return: the inventory of the region
+        :rtype: bw2io.importers.base_lci.LCIImporter
+        """
+        cm = self.get_vehicle_model()
 
-            years = []
-            for y in np.arange(1996, self.db_year):
-                if y in fleet.vintage_year:
-                    if (
-                        fleet.sel(vintage_year=y, variable=self.db_year)
-                        .sum(dim=["size", "powertrain"])
-                        .sum()
-                        >= 0.01
-                    ):
-                        years.append(y)
-            years.append(self.db_year)
+        # The fleet file has REMIND region
+        # Hence, if we use IMAGE, we need to convert
+        # the region names
+        # which is something `iam_to_GAINS_region()` does.
+        if self.model == "remind":
+            if region == "World":
+                reg_fleet = [r for r in self.regions if r != "World"]
+            else:
+                reg_fleet = region
+        if self.model == "image":
+            if region == "World":
+                reg_fleet = [
+                    self.geomap.iam_to_GAINS_region(r)
+                    for r in self.regions
+                    if r != "World"
+                ]
+            else:
+                reg_fleet = self.geomap.iam_to_GAINS_region(region)
+
+        fleet = fleet_array.sel(
+            IAM_region=reg_fleet, vintage_year=np.arange(1996, self.db_year + 1)
+        ).interp(variable=np.arange(1996, self.db_year + 1))
+
+        years = []
+        for y in np.arange(1996, self.db_year):
+            if y in fleet.vintage_year:
+                if (
+                    fleet.sel(vintage_year=y, variable=self.db_year)
+                    .sum(dim=["size", "powertrain"])
+                    .sum()
+                    >= 0.01
+                ):
+                    years.append(y)
+        years.append(self.db_year)
 
-            scope = {
-                "powertrain": fleet.sel(vintage_year=years).powertrain.values,
-                "size": fleet.sel(vintage_year=years).coords["size"].values,
-                "year": years,
-                "fu": {"fleet": fleet.sel(vintage_year=years), "unit": "vkm"},
-            }
+        scope = {
+            "powertrain": fleet.sel(vintage_year=years).powertrain.values,
+            "size": fleet.sel(vintage_year=years).coords["size"].values,
+            "year": years,
+            "fu": {"fleet": fleet.sel(vintage_year=years), "unit": "vkm"},
+        }
 
-            bc = {
-                "country": region,
-                "fuel blend": {
-                    "petrol": {
-                        "primary fuel": {
-                            "type": "petrol",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values,
-                                0,
-                                1,
+        bc = {
+            "country": region,
+            "fuel blend": {
+                "petrol": {
+                    "primary fuel": {
+                        "type": "petrol",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - fossil", region=region
                             )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values,
+                            0,
+                            1,
+                        )
+                        if "liquid - fossil" in liquid_fuel_blend.variables.values
+                        else np.ones_like(years),
+                    },
+                    "secondary fuel": {
+                        "type": "bioethanol - wheat straw",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - biomass", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - biomass" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
+                    },
+                    "tertiary fuel": {
+                        "type": "synthetic gasoline",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - synfuel", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - synfuel" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
+                    },
+                },
+                "diesel": {
+                    "primary fuel": {
+                        "type": "diesel",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - fossil", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
                             if "liquid - fossil" in liquid_fuel_blend.variables.values
                             else np.ones_like(years),
-                        },
-                        "secondary fuel": {
-                            "type": "bioethanol - wheat straw",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - biomass"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "tertiary fuel": {
-                            "type": "synthetic gasoline",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - synfuel", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - synfuel"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
+                            0,
+                            1,
+                        ),
                     },
-                    "diesel": {
-                        "primary fuel": {
-                            "type": "diesel",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - fossil"
-                                in liquid_fuel_blend.variables.values
-                                else np.ones_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "secondary fuel": {
-                            "type": "biodiesel - cooking oil",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - biomass"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "tertiary fuel": {
-                            "type": "synthetic diesel",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - synfuel", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - synfuel"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
+                    "secondary fuel": {
+                        "type": "biodiesel - cooking oil",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - biomass", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - biomass" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
                     },
-                    "cng": {
-                        "primary fuel": {
-                            "type": "cng",
-                            "share": np.clip(
-                                gas_fuel_blend.sel(
-                                    variables="gas - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "gas - fossil" in gas_fuel_blend.variables.values
-                                else np.ones_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "secondary fuel": {
-                            "type": "biogas - biowaste",
-                            "share": np.clip(
-                                gas_fuel_blend.sel(
-                                    variables="gas - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "gas - biomass" in gas_fuel_blend.variables.values
-                                else 1
-                                - gas_fuel_blend.sel(
-                                    variables="gas - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values,
-                                0,
-                                1,
-                            ),
-                        },
+                    "tertiary fuel": {
+                        "type": "synthetic diesel",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - synfuel", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - synfuel" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
                     },
-                    "hydrogen": {
-                        "primary fuel": {
-                            "type": "electrolysis",
-                            "share": np.ones_like(years),
-                        }
+                },
+                "cng": {
+                    "primary fuel": {
+                        "type": "cng",
+                        "share": np.clip(
+                            gas_fuel_blend.sel(variables="gas - fossil", region=region)
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "gas - fossil" in gas_fuel_blend.variables.values
+                            else np.ones_like(years),
+                            0,
+                            1,
+                        ),
+                    },
+                    "secondary fuel": {
+                        "type": "biogas - biowaste",
+                        "share": np.clip(
+                            gas_fuel_blend.sel(variables="gas - biomass", region=region)
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "gas - biomass" in gas_fuel_blend.variables.values
+                            else 1
+                            - gas_fuel_blend.sel(
+                                variables="gas - fossil", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values,
+                            0,
+                            1,
+                        ),
                     },
                 },
-            }
+                "hydrogen": {
+                    "primary fuel": {
+                        "type": "electrolysis",
+                        "share": np.ones_like(years),
+                    }
+                },
+            },
+        }
+
+        ic = carculator.InventoryCalculation(
+            cm.array, scope=scope, background_configuration=bc
+        )
+
+        i = ic.export_lci_to_bw(
+            presamples=False,
+            ecoinvent_version=str(self.version),
+            create_vehicle_datasets=False,
+        )
 
-            ic = carculator.InventoryCalculation(
-                cm.array, scope=scope, background_configuration=bc
+        # filter out cars if anything given in `self.filter`
+        i.data = [
+            x
+            for x in i.data
+            if "transport, passenger car" not in x["name"]
+            or (
+                any(y.lower() in x["name"].lower() for y in self.filter)
+                and str(self.db_year) in x["name"]
             )
+        ]
 
-            i = ic.export_lci_to_bw(
-                presamples=False,
-                ecoinvent_version=str(self.version),
-                create_vehicle_datasets=False,
+        # we want to remove all fuel and electricity supply datatsets
+        # to only keep the one corresponding to the fleet year
+        i.data = [
+            x
+            for x in i.data
+            if not any(
+                y in x["name"]
+                for y in [
+                    "fuel supply for",
+                    "electricity supply for",
+                    "electricity market for fuel preparation",
+                ]
             )
+            or str(self.db_year) in x["name"]
+        ]
 
-            # filter out cars if anything given in `self.filter`
-            i.data = [
-                x
-                for x in i.data
-                if "transport, passenger car" not in x["name"]
-                or (
-                    any(y.lower() in x["name"].lower() for y in self.filter)
-                    and str(self.db_year) in x["name"]
-                )
-            ]
+        # we need to remove the electricity inputs in the fuel markets
+        # that are typically added when synfuels are part of the blend
+        for x in i.data:
+            if "fuel supply for " in x["name"]:
+                for e in x["exchanges"]:
+                    if "electricity market for " in e["name"]:
+                        x["exchanges"].remove(e)
+
+        # we want to rename the passenger car transport dataset
+        # by removing the year in the name
+        for x in i.data:
+            if any(
+                y in x["name"]
+                for y in [
+                    "transport, passenger car, fleet average",
+                    "fuel supply for ",
+                    "electricity supply for ",
+                    "electricity market for fuel preparation",
+                ]
+            ):
+                x["name"] = x["name"][:-6]
+                for e in x["exchanges"]:
+                    if e["type"] == "production":
+                        e["name"] = x["name"]
 
-            # we want to remove all fuel and electricity supply datatsets
-            # to only keep the one corresponding to the fleet year
-            i.data = [
-                x
-                for x in i.data
-                if not any(
-                    y in x["name"]
-                    for y in [
-                        "fuel supply for",
-                        "electricity supply for",
-                        "electricity market for fuel preparation",
-                    ]
-                )
-                or str(self.db_year) in x["name"]
+                    if (
+                        any(
+                            f in e["name"]
+                            for f in [
+                                "fuel supply for ",
+                                "electricity supply for ",
+                                "electricity market for fuel preparation",
+                            ]
+                        )
+                        and e["type"] == "technosphere"
+                    ):
+                        e["name"] = e["name"][:-6]
+
+        return i
+
+    def load_inventory(self, path):
+        """Create `carculator` fleet average inventories for a given range of years.
+        The inventory of each region is cached, see :meth:`get_region_cache_key`."""
+
+        fleet_array = carculator.create_fleet_composition_from_IAM_file(self.fleet_file)
+
+        liquid_fuel_blend = self.get_liquid_fuel_blend(allocate_all_synfuels=True)
+        gas_fuel_blend = self.get_gas_fuel_blend()
+
+        keys = [
+            self.get_region_cache_key(region, liquid_fuel_blend, gas_fuel_blend)
+            if self.use_cache
+            else None
+            for region in self.regions
+        ]
+
+        # regions which inventory is not cached are created in parallel
+        created = {}
+        if self.n_jobs > 1:
+            missing = [
+                region
+                for region, key in zip(self.regions, keys)
+                if not is_vehicle_inventory_cached(key)
             ]
+            if len(missing) > 1:
+                created = dict(
+                    zip(
+                        missing,
+                        create_region_inventories(
+                            self,
+                            missing,
+                            fleet_array,
+                            liquid_fuel_blend,
+                            gas_fuel_blend,
+                            self.n_jobs,
+                        ),
+                    )
+                )
 
-            # we need to remove the electricity inputs in the fuel markets
-            # that are typically added when synfuels are part of the blend
-            for x in i.data:
-                if "fuel supply for " in x["name"]:
-                    for e in x["exchanges"]:
-                        if "electricity market for " in e["name"]:
-                            x["exchanges"].remove(e)
-
-            # we want to rename the passenger car transport dataset
-            # by removing the year in the name
-            for x in i.data:
-                if any(
-                    y in x["name"]
-                    for y in [
-                        "transport, passenger car, fleet average",
-                        "fuel supply for ",
-                        "electricity supply for ",
-                        "electricity market for fuel preparation",
-                    ]
-                ):
-                    x["name"] = x["name"][:-6]
-                    for e in x["exchanges"]:
-                        if e["type"] == "production":
-                            e["name"] = x["name"]
-
-                        if (
-                            any(
-                                f in e["name"]
-                                for f in [
-                                    "fuel supply for ",
-                                    "electricity supply for ",
-                                    "electricity market for fuel preparation",
-                                ]
-                            )
-                            and e["type"] == "technosphere"
-                        ):
-                            e["name"] = e["name"][:-6]
+        import_db = None
+
+        for r, (region, key) in enumerate(zip(self.regions, keys)):
+            i = load_vehicle_inventory(
+                key,
+                lambda: created.pop(region)
+                if region in created
+                else self.create_region_inventory(
+                    fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+                ),
+            )
 
             if r == 0:
                 import_db = i
             else:
                 # remove duplicate items if iterating over several regions
+                existing = {(z["name"].lower(), z["location"]) for z in import_db.data}
                 i.data = [
                     x
                     for x in i.data
-                    if (x["name"].lower(), x["location"])
-                    not in [(z["name"].lower(), z["location"]) for z in import_db.data]
+                    if (x["name"].lower(), x["location"]) not in existing
                 ]
                 import_db.data.extend(i.data)
 
@@ -1857,6 +2047,8 @@ class TruckInventory(BaseInventoryImport):
         regions,
         iam_data,
         filters=None,
+        use_cache=False,
+        n_jobs=1,
     ):
 
         self.db_year = year
@@ -1870,6 +2062,10 @@ class TruckInventory(BaseInventoryImport):
         if filters:
             self.filter.extend(filters)
 
+        self.use_cache = use_cache
+        self.n_jobs = n_jobs
+        self.vehicle_model = None
+
         super().__init__(database, version, Path("."))
 
     def get_liquid_fuel_blend(self, allocate_all_synfuels):
@@ -1881,19 +2077,18 @@ class TruckInventory(BaseInventoryImport):
                     variables=["SE|Liquids|Hydrogen"]
                 ) / self.data.sel(variables="FE|Transport|Pass|Road|LDV|Liquids")
 
-                share_liquids = (
-                    self.data.sel(
-                        variables=[
-                            "FE|Transport|Liquids|Oil",
-                            "FE|Transport|Liquids|Biomass",
-                        ]
-                    )
-                    / self.data.sel(
-                        variables=[
-                            "FE|Transport|Liquids|Oil",
-                            "FE|Transport|Liquids|Biomass",
-                        ]
-                    ).sum(dim="variables")
+                share_liquids = self.data.sel(
+                    variables=[
+                        "FE|Transport|Liquids|Oil",
+                        "FE|Transport|Liquids|Biomass",
+                    ]
+                ) / self.data.sel(
+                    variables=[
+                        "FE|Transport|Liquids|Oil",
+                        "FE|Transport|Liquids|Biomass",
+                    ]
+                ).sum(
+                    dim="variables"
                 )
                 share_liquids *= 1 - share_synfuel.values
 
@@ -1990,297 +2185,385 @@ class TruckInventory(BaseInventoryImport):
 
         return share_gas
 
-    def load_inventory(self, path):
-        """Create `carculator_truck` fleet average inventories for a given range of years."""
+    def get_vehicle_model(self, fleet_array):
+        """Create the `carculator_truck` truck model, with parameters interpolated over the years of the fleet.
+        The model is only built once, and only if the inventory of a region is not cached.
 
-        fleet_array = carculator_truck.create_fleet_composition_from_IAM_file(
-            self.fleet_file
-        )
+        :param fleet_array: fleet composition
+        :return: vehicle model
+        """
+        if self.vehicle_model is None:
+            fleet = fleet_array.sel(IAM_region="EUR").interp(
+                variable=np.arange(1996, self.db_year + 1)
+            )
 
-        fleet = fleet_array.sel(IAM_region="EUR").interp(
-            variable=np.arange(1996, self.db_year + 1)
-        )
+            scope = {
+                "powertrain": fleet.powertrain.values,
+                "size": fleet.coords["size"].values,
+                "fu": {"fleet": fleet.vintage_year.values, "unit": "tkm"},
+            }
 
-        scope = {
-            "powertrain": fleet.powertrain.values,
-            "size": fleet.coords["size"].values,
-            "fu": {"fleet": fleet.vintage_year.values, "unit": "tkm"},
-        }
+            tip = carculator_truck.TruckInputParameters()
+            tip.static()
+            _, array = carculator_truck.fill_xarray_from_input_parameters(
+                tip, scope=scope
+            )
 
-        tip = carculator_truck.TruckInputParameters()
-        tip.static()
-        _, array = carculator_truck.fill_xarray_from_input_parameters(tip, scope=scope)
+            array = array.interp(
+                year=np.arange(2010, self.db_year + 1),
+                kwargs={"fill_value": "extrapolate"},
+            )
+            tm = carculator_truck.TruckModel(
+                array, cycle="Regional delivery", country="CH"
+            )
+            tm.set_all()
+            self.vehicle_model = tm
+
+        return self.vehicle_model
+
+    def get_region_cache_key(self, region, liquid_fuel_blend, gas_fuel_blend):
+        """
+        Return the key under which the inventory of a region is cached.
+        It depends on the fleet file, the year, the region, the filters,
+        the fuel blends of the region and the version of `carculator_truck`.
 
-        array = array.interp(
-            year=np.arange(2010, self.db_year + 1), kwargs={"fill_value": "extrapolate"}
+        :param region: IAM region
+        :type region: str
+        :return: cache key
+        :rtype: str
+        """
+        return get_cache_key(
+            self.__class__.__name__,
+            get_file_hash(self.fleet_file),
+            str(self.version),
+            self.model,
+            self.db_year,
+            region,
+            list(self.regions),
+            self.filter,
+            get_fuel_blend_key(liquid_fuel_blend, region),
+            get_fuel_blend_key(gas_fuel_blend, region),
+            carculator_truck.__version__,
         )
-        tm = carculator_truck.TruckModel(array, cycle="Regional delivery", country="CH")
-        tm.set_all()
 
-        liquid_fuel_blend = self.get_liquid_fuel_blend(allocate_all_synfuels=True)
-        gas_fuel_blend = self.get_gas_fuel_blend()
+    def create_region_inventory(
+        self, fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+    ):
+        """Create the fleet average inventory of a region.
 
-        import_db = None
+        :param fleet_array: fleet composition
+        :param region: IAM region
+        :type region: str
+        :return: the inventory of the region
+        :rtype: bw2io.importers.base_lci.LCIImporter
+        """
+        tm = self.get_vehicle_model(fleet_array)
 
-        for r, region in enumerate(self.regions):
+        if region == "World":
+            fleet = fleet_array.sum(dim="IAM_region").interp(
+                variable=np.arange(1996, self.db_year + 1)
+            )
 
-            if region == "World":
-                fleet = fleet_array.sum(dim="IAM_region").interp(
-                    variable=np.arange(1996, self.db_year + 1)
-                )
+        else:
 
-            else:
+            # The fleet file has REMIND region
+            # Hence, if we use IMAGE, we need to convert
+            # the region names
+            # which is something `iam_to_GAINS_region()` does.
+            if self.model == "remind":
+                reg_fleet = region
+            if self.model == "image":
+                reg_fleet = self.geomap.iam_to_GAINS_region(region)
 
-                # The fleet file has REMIND region
-                # Hence, if we use IMAGE, we need to convert
-                # the region names
-                # which is something `iam_to_GAINS_region()` does.
-                if self.model == "remind":
-                    reg_fleet = region
-                if self.model == "image":
-                    reg_fleet = self.geomap.iam_to_GAINS_region(region)
-
-                fleet = fleet_array.sel(IAM_region=reg_fleet).interp(
-                    variable=np.arange(1996, self.db_year + 1)
-                )
+            fleet = fleet_array.sel(IAM_region=reg_fleet).interp(
+                variable=np.arange(1996, self.db_year + 1)
+            )
 
-            years = []
-            for y in np.arange(2010, self.db_year):
-                if y in fleet.vintage_year:
-                    if (
-                        fleet.sel(vintage_year=y, variable=self.db_year).sum(
-                            dim=["size", "powertrain"]
-                        )
-                        >= 0.01
-                    ):
-                        years.append(y)
-            years.append(self.db_year)
+        years = []
+        for y in np.arange(2010, self.db_year):
+            if y in fleet.vintage_year:
+                if (
+                    fleet.sel(vintage_year=y, variable=self.db_year).sum(
+                        dim=["size", "powertrain"]
+                    )
+                    >= 0.01
+                ):
+                    years.append(y)
+        years.append(self.db_year)
 
-            scope = {
-                "powertrain": fleet.sel(vintage_year=years).powertrain.values,
-                "size": fleet.sel(vintage_year=years).coords["size"].values,
-                "year": years,
-                "fu": {"fleet": fleet.sel(vintage_year=years), "unit": "tkm"},
-            }
+        scope = {
+            "powertrain": fleet.sel(vintage_year=years).powertrain.values,
+            "size": fleet.sel(vintage_year=years).coords["size"].values,
+            "year": years,
+            "fu": {"fleet": fleet.sel(vintage_year=years), "unit": "tkm"},
+        }
 
-            bc = {
-                "country": region,
-                "fuel blend": {
-                    "petrol": {
-                        "primary fuel": {
-                            "type": "petrol",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values,
-                                0,
-                                1,
+        bc = {
+            "country": region,
+            "fuel blend": {
+                "petrol": {
+                    "primary fuel": {
+                        "type": "petrol",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - fossil", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values,
+                            0,
+                            1,
+                        )
+                        if "liquid - fossil" in liquid_fuel_blend.variables.values
+                        else np.ones_like(years),
+                    },
+                    "secondary fuel": {
+                        "type": "bioethanol - wheat straw",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - biomass", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - biomass" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
+                    },
+                },
+                "diesel": {
+                    "primary fuel": {
+                        "type": "diesel",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - fossil", region=region
                             )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
                             if "liquid - fossil" in liquid_fuel_blend.variables.values
                             else np.ones_like(years),
-                        },
-                        "secondary fuel": {
-                            "type": "bioethanol - wheat straw",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - biomass"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
+                            0,
+                            1,
+                        ),
                     },
-                    "diesel": {
-                        "primary fuel": {
-                            "type": "diesel",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - fossil"
-                                in liquid_fuel_blend.variables.values
-                                else np.ones_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "secondary fuel": {
-                            "type": "biodiesel - cooking oil",
-                            "share": np.clip(
-                                liquid_fuel_blend.sel(
-                                    variables="liquid - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "liquid - biomass"
-                                in liquid_fuel_blend.variables.values
-                                else np.zeros_like(years),
-                                0,
-                                1,
-                            ),
-                        },
+                    "secondary fuel": {
+                        "type": "biodiesel - cooking oil",
+                        "share": np.clip(
+                            liquid_fuel_blend.sel(
+                                variables="liquid - biomass", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "liquid - biomass" in liquid_fuel_blend.variables.values
+                            else np.zeros_like(years),
+                            0,
+                            1,
+                        ),
                     },
-                    "cng": {
-                        "primary fuel": {
-                            "type": "cng",
-                            "share": np.clip(
-                                gas_fuel_blend.sel(
-                                    variables="gas - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "gas - fossil" in gas_fuel_blend.variables.values
-                                else np.ones_like(years),
-                                0,
-                                1,
-                            ),
-                        },
-                        "secondary fuel": {
-                            "type": "biogas - biowaste",
-                            "share": np.clip(
-                                gas_fuel_blend.sel(
-                                    variables="gas - biomass", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values
-                                if "gas - biomass" in gas_fuel_blend.variables.values
-                                else 1
-                                - gas_fuel_blend.sel(
-                                    variables="gas - fossil", region=region
-                                )
-                                .interp(
-                                    year=scope["year"],
-                                    kwargs={"fill_value": "extrapolate"},
-                                )
-                                .values,
-                                0,
-                                1,
-                            ),
-                        },
+                },
+                "cng": {
+                    "primary fuel": {
+                        "type": "cng",
+                        "share": np.clip(
+                            gas_fuel_blend.sel(variables="gas - fossil", region=region)
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "gas - fossil" in gas_fuel_blend.variables.values
+                            else np.ones_like(years),
+                            0,
+                            1,
+                        ),
                     },
-                    "hydrogen": {
-                        "primary fuel": {
-                            "type": "electrolysis",
-                            "share": np.ones_like(years),
-                        }
+                    "secondary fuel": {
+                        "type": "biogas - biowaste",
+                        "share": np.clip(
+                            gas_fuel_blend.sel(variables="gas - biomass", region=region)
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values
+                            if "gas - biomass" in gas_fuel_blend.variables.values
+                            else 1
+                            - gas_fuel_blend.sel(
+                                variables="gas - fossil", region=region
+                            )
+                            .interp(
+                                year=scope["year"],
+                                kwargs={"fill_value": "extrapolate"},
+                            )
+                            .values,
+                            0,
+                            1,
+                        ),
                     },
                 },
-            }
+                "hydrogen": {
+                    "primary fuel": {
+                        "type": "electrolysis",
+                        "share": np.ones_like(years),
+                    }
+                },
+            },
+        }
+
+        ic = carculator_truck.InventoryCalculation(
+            tm,
+            scope=scope,
+            background_configuration=bc,
+        )
+
+        i = ic.export_lci_to_bw(
+            presamples=False,
+            ecoinvent_version=str(self.version),
+            create_vehicle_datasets=False,
+        )
 
-            ic = carculator_truck.InventoryCalculation(
-                tm,
-                scope=scope,
-                background_configuration=bc,
+        # filter out trucks if anything given in `self.filter`
+        i.data = [
+            x
+            for x in i.data
+            if "transport, " not in x["name"]
+            or (
+                any(y.lower() in x["name"].lower() for y in self.filter)
+                and str(self.db_year) in x["name"]
             )
+        ]
 
-            i = ic.export_lci_to_bw(
-                presamples=False,
-                ecoinvent_version=str(self.version),
-                create_vehicle_datasets=False,
+        # we want to remove all fuel and electricity supply datatsets
+        # to only keep the one corresponding to the fleet year
+        i.data = [
+            x
+            for x in i.data
+            if not any(
+                y in x["name"]
+                for y in [
+                    "fuel supply for",
+                    "electricity supply for",
+                    "electricity market for fuel preparation",
+                ]
             )
+            or str(self.db_year) in x["name"]
+        ]
 
-            # filter out trucks if anything given in `self.filter`
-            i.data = [
-                x
-                for x in i.data
-                if "transport, " not in x["name"]
-                or (
-                    any(y.lower() in x["name"].lower() for y in self.filter)
-                    and str(self.db_year) in x["name"]
-                )
-            ]
+        # we need to remove the electricity inputs in the fuel markets
+        # that are typically added when synfuels are part of the blend
+        for x in i.data:
+            if "fuel supply for " in x["name"]:
+                for e in x["exchanges"]:
+                    if "electricity market for " in e["name"]:
+                        x["exchanges"].remove(e)
+
+        # we want to rename the fuel supply and lorry transport dataset
+        # by removing the year in the name
+        for x in i.data:
+            if any(
+                y in x["name"]
+                for y in [
+                    "transport, freight, lorry, ",
+                    "fuel supply for ",
+                    "electricity supply for ",
+                    "electricity market for fuel preparation",
+                ]
+            ):
+                x["name"] = x["name"][:-6]
+                for e in x["exchanges"]:
 
-            # we want to remove all fuel and electricity supply datatsets
-            # to only keep the one corresponding to the fleet year
-            i.data = [
-                x
-                for x in i.data
-                if not any(
-                    y in x["name"]
-                    for y in [
-                        "fuel supply for",
-                        "electricity supply for",
-                        "electricity market for fuel preparation",
-                    ]
-                )
-                or str(self.db_year) in x["name"]
+                    if e["type"] == "production":
+                        e["name"] = x["name"]
+
+                    if (
+                        any(
+                            f in e["name"]
+                            for f in [
+                                "fuel supply for ",
+                                "electricity supply for ",
+                                "electricity market for fuel preparation",
+                            ]
+                        )
+                        and e["type"] == "technosphere"
+                    ):
+                        e["name"] = e["name"][:-6]
+
+        return i
+
+    def load_inventory(self, path):
+        """Create `carculator_truck` fleet average inventories for a given range of years.
+        The inventory of each region is cached, see :meth:`get_region_cache_key`."""
+
+        fleet_array = carculator_truck.create_fleet_composition_from_IAM_file(
+            self.fleet_file
+        )
+
+        liquid_fuel_blend = self.get_liquid_fuel_blend(allocate_all_synfuels=True)
+        gas_fuel_blend = self.get_gas_fuel_blend()
+
+        keys = [
+            self.get_region_cache_key(region, liquid_fuel_blend, gas_fuel_blend)
+            if self.use_cache
+            else None
+            for region in self.regions
+        ]
+
+        # regions which inventory is not cached are created in parallel
+        created = {}
+        if self.n_jobs > 1:
+            missing = [
+                region
+                for region, key in zip(self.regions, keys)
+                if not is_vehicle_inventory_cached(key)
             ]
+            if len(missing) > 1:
+                created = dict(
+                    zip(
+                        missing,
+                        create_region_inventories(
+                            self,
+                            missing,
+                            fleet_array,
+                            liquid_fuel_blend,
+                            gas_fuel_blend,
+                            self.n_jobs,
+                        ),
+                    )
+                )
 
-            # we need to remove the electricity inputs in the fuel markets
-            # that are typically added when synfuels are part of the blend
-            for x in i.data:
-                if "fuel supply for " in x["name"]:
-                    for e in x["exchanges"]:
-                        if "electricity market for " in e["name"]:
-                            x["exchanges"].remove(e)
-
-            # we want to rename the fuel supply and lorry transport dataset
-            # by removing the year in the name
-            for x in i.data:
-                if any(
-                    y in x["name"]
-                    for y in [
-                        "transport, freight, lorry, ",
-                        "fuel supply for ",
-                        "electricity supply for ",
-                        "electricity market for fuel preparation",
-                    ]
-                ):
-                    x["name"] = x["name"][:-6]
-                    for e in x["exchanges"]:
-
-                        if e["type"] == "production":
-                            e["name"] = x["name"]
-
-                        if (
-                            any(
-                                f in e["name"]
-                                for f in [
-                                    "fuel supply for ",
-                                    "electricity supply for ",
-                                    "electricity market for fuel preparation",
-                                ]
-                            )
-                            and e["type"] == "technosphere"
-                        ):
-                            e["name"] = e["name"][:-6]
+        import_db = None
+
+        for r, (region, key) in enumerate(zip(self.regions, keys)):
+            i = load_vehicle_inventory(
+                key,
+                lambda: created.pop(region)
+                if region in created
+                else self.create_region_inventory(
+                    fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+                ),
+            )
 
             if r == 0:
                 import_db = i
             else:
                 # remove duplicate items if iterating over several regions
+                existing = {(z["name"].lower(), z["location"]) for z in import_db.data}
                 i.data = [
                     x
                     for x in i.data
-                    if (x["name"].lower(), x["location"])
-                    not in [(z["name"].lower(), z["location"]) for z in import_db.data]
+                    if (x["name"].lower(), x["location"]) not in existing
                 ]
                 import_db.data.extend(i.data)
 
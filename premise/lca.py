@@ -0,0 +1,311 @@
+import csv
+import inspect
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, gmres, splu
+
+from .export import Export, create_index_of_B_matrix
+
+# `tol` was renamed `rtol` in scipy 1.12
+GMRES_TOLERANCE = "rtol" if "rtol" in inspect.signature(gmres).parameters else "tol"
+
+
+def load_characterization_factors(filepath):
+    """
+    Read characterization factors from a csv file, separated by semicolons,
+    with a header line and one biosphere flow per line:
+    name;compartment;subcompartment;unit;factor
+
+    Flows are identified as in `flows_biosphere_37.csv`,
+    so that no Brightway2 project is needed to characterize emissions.
+
+    :param filepath: path to the csv file
+    :type filepath: str or pathlib.Path
+    :return: a dictionary with (name, compartment, subcompartment, unit) as key and the factor as value
+    :rtype: dict
+    """
+    filepath = Path(filepath)
+    if not filepath.is_file():
+        raise FileNotFoundError(
+            f"The file of characterization factors {filepath} could not be found."
+        )
+
+    with open(filepath, encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader, None)
+        cfs = {}
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            if len(row) != 5:
+                raise ValueError(
+                    f"Line {line} of {filepath} should have 5 fields "
+                    f"(name;compartment;subcompartment;unit;factor), not {len(row)}."
+                )
+            cfs[tuple(row[:4])] = float(row[4])
+
+    return cfs
+
+
+class LCA:
+    """
+    Class that calculates life cycle impacts of a wurst inventory database in memory,
+    from the A and B matrices built by :class:`.export.Export`.
+
+    The technosphere matrix is factorized once, and the factorization is used
+    for every demand vector passed to :meth:`solve`.
+    Alternatively, the factorization of another, similar, database (e.g., the source database
+    of a scenario) can be used to solve the system iteratively, without factorizing it.
+
+    :ivar db: wurst inventory database
+    :vartype db: list
+    :ivar technosphere: technosphere matrix, with supplied products as rows and activities as columns
+    :vartype technosphere: scipy.sparse.csc_matrix
+    :ivar biosphere: matrix of biosphere flows, with activities as rows and flows as columns
+    :vartype biosphere: scipy.sparse.csr_matrix
+    :ivar fingerprint: fingerprint of the database the matrices were built from
+    :vartype fingerprint: int
+
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.fingerprint = self.get_fingerprint(db)
+        export = Export(db)
+        self.index_A = export.get_index_of_A_matrix()
+        self.index_B = create_index_of_B_matrix()
+
+        n_activities = len(db)
+        n_flows = max(self.index_B.values()) + 1
+
+        # rows of the A matrix are the consuming activities
+        rows, cols, values = export.create_A_matrix_arrays()
+        self.technosphere = sparse.csc_matrix(
+            (values, (cols, rows)), shape=(n_activities, n_activities)
+        )
+
+        # biosphere flows are stored with a negative sign in the B matrix
+        rows, cols, values = export.create_B_matrix_arrays()
+        self.biosphere = sparse.csr_matrix(
+            (-values, (rows, cols)), shape=(n_activities, n_flows)
+        )
+
+        self.solver = None
+
+    @staticmethod
+    def get_fingerprint(db):
+        """
+        Return a fingerprint of the content of a database that enters the matrices:
+        the datasets and their exchanges, with amounts.
+        It changes when the database is modified in place.
+
+        :param db: wurst inventory database
+        :type db: list
+        :rtype: int
+        """
+        return hash(
+            tuple(
+                (
+                    ds["name"],
+                    ds["reference product"],
+                    ds["unit"],
+                    ds["location"],
+                    tuple(
+                        (
+                            exc["type"],
+                            exc["name"],
+                            exc.get("product"),
+                            exc.get("unit"),
+                            exc.get("location"),
+                            tuple(exc.get("categories", ())),
+                            exc["amount"],
+                        )
+                        for exc in ds["exchanges"]
+                    ),
+                )
+                for ds in db
+            )
+        )
+
+    def is_built_from(self, db):
+        """
+        Return True if the matrices were built from a database with the same content as `db`.
+
+        :param db: wurst inventory database
+        :type db: list
+        :rtype: bool
+        """
+        return self.get_fingerprint(db) == self.fingerprint
+
+    def factorize(self):
+        """
+        Factorize the technosphere matrix, if not done already.
+        """
+        if self.solver is None:
+            self.solver = splu(self.technosphere)
+
+    def build_demand(self, functional_units):
+        """
+        Build the matrix of final demand vectors, one column per functional unit.
+
+        :param functional_units: list of dictionaries, with (name, reference product, unit, location)
+            of activities as keys and the demanded amounts as values
+        :type functional_units: list
+        :return: demand matrix
+        :rtype: numpy.ndarray
+        """
+        demand = np.zeros((len(self.db), len(functional_units)))
+
+        for col, fu in enumerate(functional_units):
+            for key, amount in fu.items():
+                try:
+                    demand[self.index_A[tuple(key)], col] += amount
+                except KeyError:
+                    raise ValueError(
+                        f"The activity {key} of the functional unit could not be found."
+                    ) from None
+
+        return demand
+
+    def get_preconditioner(self, base):
+        """
+        Return an approximate inverse of :attr:`technosphere`, based on the factorization
+        of the technosphere matrix of `base`.
+        Activities are matched by (name, reference product, unit, location).
+        Activities missing from `base` are approximated by their production exchange.
+
+        :param base: LCA of a similar database
+        :type base: LCA
+        :rtype: scipy.sparse.linalg.LinearOperator
+        """
+        base.factorize()
+
+        shared = np.array(
+            [
+                (i, base.index_A[key])
+                for key, i in self.index_A.items()
+                if key in base.index_A
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        rows, base_rows = shared[:, 0], shared[:, 1]
+        new_rows = np.setdiff1d(np.arange(len(self.db)), rows)
+        production = self.technosphere.diagonal()[new_rows]
+        production[production == 0] = 1
+
+        def matvec(x):
+            x = np.ravel(x)
+            demand = np.zeros(len(base.db))
+            demand[base_rows] = x[rows]
+            supply = base.solver.solve(demand)
+
+            y = np.empty(len(self.db))
+            y[rows] = supply[base_rows]
+            y[new_rows] = x[new_rows] / production
+            return y
+
+        return LinearOperator(self.technosphere.shape, matvec=matvec)
+
+    def solve_iteratively(self, demand, base, tol=1e-10, restart=30, maxiter=10):
+        """
+        Solve the system with GMRES, preconditioned and warm-started
+        with the factorization of the technosphere matrix of `base`.
+        The fewer exchanges differ from `base`, the fewer iterations are needed.
+
+        :param demand: demand matrix, from :meth:`build_demand`
+        :type demand: numpy.ndarray
+        :param base: LCA of a similar database
+        :type base: LCA
+        :param tol: relative tolerance of the residual
+        :type tol: float
+        :param restart: number of iterations between restarts
+        :type restart: int
+        :param maxiter: maximum number of restarts
+        :type maxiter: int
+        :return: supply matrix, or None if GMRES did not converge for one of the demand vectors
+        :rtype: numpy.ndarray
+        """
+        preconditioner = self.get_preconditioner(base)
+        supply = np.zeros(demand.shape)
+
+        for col in range(demand.shape[1]):
+            if not demand[:, col].any():
+                continue
+            supply[:, col], info = gmres(
+                self.technosphere,
+                demand[:, col],
+                x0=preconditioner.matvec(demand[:, col]),
+                M=preconditioner,
+                restart=restart,
+                maxiter=maxiter,
+                atol=0.0,
+                **{GMRES_TOLERANCE: tol},
+            )
+            if info != 0:
+                return None
+
+        return supply
+
+    def solve(self, functional_units, base=None):
+        """
+        Calculate the supply of each activity needed to fulfil the functional units.
+        If `base` is given and the technosphere matrix is not factorized yet,
+        the system is first solved with :meth:`solve_iteratively`.
+        If that does not converge, the technosphere matrix is factorized.
+
+        :param functional_units: see :meth:`build_demand`
+        :type functional_units: list
+        :param base: LCA of a similar database
+        :type base: LCA
+        :return: supply matrix, with activities as rows and functional units as columns
+        :rtype: numpy.ndarray
+        """
+        demand = self.build_demand(functional_units)
+
+        if base is not None and self.solver is None:
+            supply = self.solve_iteratively(demand, base)
+            if supply is not None:
+                return supply
+            print(
+                "The iterative solver did not converge. Factorizing the technosphere matrix."
+            )
+
+        self.factorize()
+        return self.solver.solve(demand)
+
+    def get_characterization_vector(self, cfs):
+        """
+        Return the characterization factors as a vector aligned with the columns of :attr:`biosphere`.
+
+        :param cfs: characterization factors, from :func:`load_characterization_factors`
+        :type cfs: dict
+        :rtype: numpy.ndarray
+        """
+        vector = np.zeros(self.biosphere.shape[1])
+        for flow, cf in cfs.items():
+            if flow in self.index_B:
+                vector[self.index_B[flow]] = cf
+        return vector
+
+    def calculate(self, functional_units, methods, base=None):
+        """
+        Calculate the impacts of several functional units for several impact methods.
+
+        :param functional_units: see :meth:`build_demand`
+        :type functional_units: list
+        :param methods: list of characterization factors, from :func:`load_characterization_factors`
+        :type methods: list
+        :param base: LCA of a similar database, see :meth:`solve`
+        :type base: LCA
+        :return: scores, with functional units as rows and methods as columns
+        :rtype: numpy.ndarray
+        """
+        cf_matrix = np.column_stack(
+            [self.get_characterization_vector(cfs) for cfs in methods]
+        )
+        # characterized impacts per unit of activity
+        impacts = self.biosphere @ cf_matrix
+
+        return self.solve(functional_units, base).T @ impacts
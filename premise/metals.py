@@ -9,6 +9,7 @@ from wurst import searching as ws
 from wurst.searching import NoResults
 
 from .activity_maps import InventorySet
+from .dataset_index import ConsumerIndex, DatasetIndex
 from .geomap import Geomap
 from .utils import *
 
@@ -30,6 +31,8 @@ class Metals:
 
     def __init__(self, db, model, iam_data, year):
         self.db = db
+        self.index = DatasetIndex(self.db)
+        self.consumers = ConsumerIndex(self.db)
         self.iam_data = iam_data
         self.year = year
         self.steel_data = self.iam_data.data.interp(year=self.year)
@@ -55,7 +58,7 @@ class Metals:
         """
         d_map = {
             self.geo.ecoinvent_to_iam_location(d["location"]): d["location"]
-            for d in ws.get_many(self.db, ws.equals("name", name))
+            for d in self.index.get_many(name)
         }
 
         list_remind_regions = [
@@ -70,35 +73,28 @@ class Metals:
         d_act = {}
 
         for d in d_remind_to_eco:
-            try:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_remind_to_eco[d]),
-                )
+            candidates = [
+                x
+                for x in self.index.get_many(name, location=d_remind_to_eco[d])
+                if "steel" in x["reference product"]
+            ]
 
-            except ws.NoResults:
+            if len(candidates) == 0:
                 print("No dataset {} found for the REMIND region {}".format(name, d))
                 continue
-            except ws.MultipleResults:
+            if len(candidates) > 1:
                 print(
                     "Multiple results for {} found for the REMIND region {}".format(
                         name, d
                     )
                 )
 
-                ds = ws.get_many(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_remind_to_eco[d]),
-                )
-
-                for x in ds:
+                for x in candidates:
                     print(x["name"], x["location"], x["reference product"])
 
-                raise
+                raise ws.MultipleResults
+
+            ds = candidates[0]
 
             d_act[d] = copy.deepcopy(ds)
             d_act[d]["location"] = d
@@ -115,8 +111,7 @@ class Metals:
 
         deleted_markets = [
             (act["name"], act["reference product"], act["location"])
-            for act in self.db
-            if act["name"] == name
+            for act in self.index.get_many(name)
         ]
 
         with open(DATA_DIR / "logs/log deleted steel datasets.csv", "a") as csv_file:
@@ -125,7 +120,11 @@ class Metals:
                 writer.writerow(line)
 
         # Remove old datasets
+        for act in self.index.get_many(name):
+            self.consumers.remove(act)
+
         self.db = [act for act in self.db if act["name"] != name]
+        self.index.refresh(self.db)
 
         return d_act
 
@@ -217,7 +216,7 @@ class Metals:
             c[1] for c in self.geo.geo.keys() if type(c) == tuple and c[0] == "REMIND"
         ]
 
-        for act in self.db:
+        for act in self.consumers.consumers(name, ref_product):
             for exc in act["exchanges"]:
                 try:
                     exc["name"]
@@ -384,6 +383,8 @@ class Metals:
                 act_steel = self.fetch_proxies(i[0])
                 act_steel = self.adjust_recycled_steel_share(act_steel)
                 self.db.extend([v for v in act_steel.values()])
+                for dataset in act_steel.values():
+                    self.consumers.add(dataset)
 
                 created_datasets.extend(
                     [
@@ -407,6 +408,8 @@ class Metals:
             ):
                 act_steel = self.fetch_proxies(i[0])
                 self.db.extend([v for v in act_steel.values()])
+                for dataset in act_steel.values():
+                    self.consumers.add(dataset)
 
                 created_datasets.extend(
                     [
@@ -723,6 +726,8 @@ class Metals:
                 }
 
                 self.db.extend([v for v in d_act_steel[d].values()])
+                for dataset in d_act_steel[d].values():
+                    self.consumers.add(dataset)
 
                 # Relink new steel activities to steel-consuming activities
                 self.relink_datasets(name, ref_prod)
@@ -867,7 +872,7 @@ class Metals:
                                         ws.either(
                                             *[
                                                 ws.equals("location", l)
-                                                for l in self.geo.geo.contained(d)
+                                                for l in self.geo.topology.contained(d)
                                             ]
                                         ),
                                         ws.contains("reference product", "steel"),
@@ -970,9 +975,15 @@ class Metals:
                     }
                 )
 
+            for act in self.index.get_many(steel_market):
+                self.consumers.remove(act)
+
             self.db = [act for act in self.db if act["name"] != steel_market]
+            self.index.refresh(self.db)
 
             self.db.extend([v for v in d_act.values()])
+            for dataset in d_act.values():
+                self.consumers.add(dataset)
 
     def relink_to_new_steel_markets(self):
 
@@ -1043,7 +1054,7 @@ class Metals:
                             try:
                                 possible_locs = [
                                     l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.contained(ds["location"])
+                                    for l in self.geo.topology.contained(ds["location"])
                                 ]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1071,7 +1082,7 @@ class Metals:
                                 # is a part of the location of the dataset
                                 possible_locs = [
                                     l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.within(ds["location"])
+                                    for l in self.geo.topology.within(ds["location"])
                                 ]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
                                 new_supplier = ws.get_one(
@@ -1098,7 +1109,7 @@ class Metals:
 
                                 possible_locs = [
                                     l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.contained(ds["location"])
+                                    for l in self.geo.topology.contained(ds["location"])
                                 ]
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1172,7 +1183,7 @@ class Metals:
 
                             possible_locs = [
                                 l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.within(ds["location"])
+                                for l in self.geo.topology.within(ds["location"])
                             ]
                             possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1210,7 +1221,7 @@ class Metals:
 
                             possible_locs = [
                                 l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.contained(ds["location"])
+                                for l in self.geo.topology.contained(ds["location"])
                             ]
                             possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1292,7 +1303,7 @@ class Metals:
 
                             possible_locs = [
                                 l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.contained(ds["location"])
+                                for l in self.geo.topology.contained(ds["location"])
                             ]
                             possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1372,7 +1383,7 @@ class Metals:
 
                         possible_locs = [
                             l[1] if isinstance(l, tuple) else l
-                            for l in self.geo.geo.contained(ds["location"])
+                            for l in self.geo.topology.contained(ds["location"])
                         ]
                         possible_locs = [l for l in possible_locs if l != "GLO"]
 
@@ -1413,3 +1424,5 @@ class Metals:
                                 "location": supplier[1],
                             }
                         )
+
+            self.consumers.update(ds)
@@ -1,10 +1,12 @@
 import copy
+from datetime import date
 
 import numpy as np
 import wurst
 from wurst import transformations as wt
 
 from .activity_maps import InventorySet
+from .dataset_index import ConsumerIndex, DatasetIndex
 from .geomap import Geomap
 from .utils import *
 
@@ -17,6 +19,8 @@ class Steel:
     :vartype db: dict
     :ivar model: can be 'remind' or 'image'. str from :attr:`.NewDatabase.model`
     :vartype model: str
+    :ivar scenario: name of the IAM pathway
+    :vartype scenario: str
     :ivar iam_data: xarray that contains IAM data, from :attr:`.NewDatabase.rdc`
     :vartype iam_data: xarray.DataArray
     :ivar year: year, from :attr:`.NewDatabase.year`
@@ -24,13 +28,17 @@ class Steel:
 
     """
 
-    def __init__(self, db, model, iam_data, year):
+    def __init__(self, db, model, scenario, iam_data, year):
         self.db = db
+        self.index = DatasetIndex(self.db)
+        self.consumers = ConsumerIndex(self.db)
         self.iam_data = iam_data
         self.year = year
         self.steel_data = self.iam_data.data.interp(year=self.year)
         self.geo = Geomap(model=model)
         self.model = model
+        self.scenario = scenario
+        self.relinker = Relinker(self.db, self.model, index=self.index)
         mapping = InventorySet(self.db)
         self.emissions_map = mapping.get_remind_to_ecoinvent_emissions()
         self.fuel_map = mapping.generate_fuel_map()
@@ -50,11 +58,8 @@ class Steel:
 
         d_map = {
             self.geo.ecoinvent_to_iam_location(d["location"]): d["location"]
-            for d in ws.get_many(
-                self.db,
-                ws.equals("name", name),
-                ws.contains("reference product", ref_prod),
-            )
+            for d in self.index.get_many(name)
+            if ref_prod in d["reference product"]
         }
 
         list_iam_regions = [
@@ -71,41 +76,34 @@ class Steel:
         d_act = {}
 
         for d in list_iam_regions:
-            try:
-                ds = ws.get_one(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_iam_to_eco[d]),
-                )
+            candidates = [
+                x
+                for x in self.index.get_many(name, location=d_iam_to_eco[d])
+                if "steel" in x["reference product"]
+            ]
 
-            except ws.NoResults:
+            if len(candidates) == 0:
                 print("No dataset {} found for the IAM region {}".format(name, d))
                 continue
-            except ws.MultipleResults:
+            if len(candidates) > 1:
                 print(
                     "Multiple results for {} found for the IAM region {}".format(
                         name, d
                     )
                 )
 
-                ds = ws.get_many(
-                    self.db,
-                    ws.equals("name", name),
-                    ws.contains("reference product", "steel"),
-                    ws.equals("location", d_iam_to_eco[d]),
-                )
-
-                for x in ds:
+                for x in candidates:
                     print(x["name"], x["location"], x["reference product"])
 
-                raise
+                raise ws.MultipleResults
+
+            ds = candidates[0]
 
             d_act[d] = wt.copy_to_new_location(ds, d)
             d_act[d]["code"] = str(uuid.uuid4().hex)
 
             if relink:
-                relink_technosphere_exchanges(d_act[d], self.db, self.model)
+                self.relinker.relink(d_act[d])
 
             # Add `production volume` field
             if self.model == "remind":
@@ -208,22 +206,33 @@ class Steel:
 
         deleted_markets = [
             (act["name"], act["reference product"], act["location"])
-            for act in self.db
-            if act["name"] == name and ref_prod in act["reference product"]
+            for act in self.index.get_many(name)
+            if ref_prod in act["reference product"]
         ]
 
-        with open(DATA_DIR / "logs/log deleted steel datasets.csv", "a") as csv_file:
+        with open(
+            DATA_DIR
+            / "logs/log deleted steel datasets {} {} {}-{}.csv".format(
+                self.model, self.scenario, self.year, date.today()
+            ),
+            "a",
+        ) as csv_file:
             writer = csv.writer(csv_file, delimiter=";", lineterminator="\n")
             for line in deleted_markets:
                 writer.writerow(line)
 
         # Remove old datasets
+        for act in self.index.get_many(name):
+            if ref_prod in act["reference product"]:
+                self.consumers.remove(act)
+
         self.db = [
             act
             for act in self.db
             if (act["name"], act["reference product"], act["location"])
             not in deleted_markets
         ]
+        self.index.refresh(self.db)
 
         return d_act
 
@@ -315,7 +324,7 @@ class Steel:
             c[1] for c in self.geo.geo.keys() if type(c) == tuple and c[0] == "REMIND"
         ]
 
-        for act in self.db:
+        for act in self.consumers.consumers(name, ref_product):
             for exc in act["exchanges"]:
                 try:
                     exc["name"]
@@ -780,11 +789,23 @@ class Steel:
         if not os.path.exists(DATA_DIR / "logs"):
             os.makedirs(DATA_DIR / "logs")
 
-        with open(DATA_DIR / "logs/log deleted steel datasets.csv", "w") as csv_file:
+        with open(
+            DATA_DIR
+            / "logs/log deleted steel datasets {} {} {}-{}.csv".format(
+                self.model, self.scenario, self.year, date.today()
+            ),
+            "w",
+        ) as csv_file:
             writer = csv.writer(csv_file, delimiter=";", lineterminator="\n")
             writer.writerow(["dataset name", "reference product", "location"])
 
-        with open(DATA_DIR / "logs/log created steel datasets.csv", "w") as csv_file:
+        with open(
+            DATA_DIR
+            / "logs/log created steel datasets {} {} {}-{}.csv".format(
+                self.model, self.scenario, self.year, date.today()
+            ),
+            "w",
+        ) as csv_file:
             writer = csv.writer(csv_file, delimiter=";", lineterminator="\n")
             writer.writerow(["dataset name", "reference product", "location"])
 
@@ -799,6 +820,8 @@ class Steel:
             act_steel = self.fetch_proxies(i[0], i[1])
 
             self.db.extend([v for v in act_steel.values()])
+            for dataset in act_steel.values():
+                self.consumers.add(dataset)
 
             created_datasets.extend(
                 [
@@ -857,6 +880,7 @@ class Steel:
                 )
 
             self.db.append(d)
+            self.consumers.add(d)
 
             print("Relink new steel markets to steel-consuming activities")
             self.relink_to_new_steel_markets(i[0], i[1])
@@ -957,6 +981,8 @@ class Steel:
                 self.update_pollutant_emissions(d_act_steel[steel][ds])
 
             self.db.extend([v for v in d_act_steel[steel].values()])
+            for dataset in d_act_steel[steel].values():
+                self.consumers.add(dataset)
 
             print("Relink new steel production datasets to steel-consuming activities")
             self.relink_to_new_steel_markets(
@@ -1061,7 +1087,7 @@ class Steel:
                                         ws.either(
                                             *[
                                                 ws.equals("location", l)
-                                                for l in self.geo.geo.contained(d)
+                                                for l in self.geo.topology.contained(d)
                                             ]
                                         ),
                                         ws.contains("reference product", "steel"),
@@ -1164,9 +1190,15 @@ class Steel:
                     }
                 )
 
+            for act in self.index.get_many(steel_market):
+                self.consumers.remove(act)
+
             self.db = [act for act in self.db if act["name"] != steel_market]
+            self.index.refresh(self.db)
 
             self.db.extend([v for v in d_act.values()])
+            for dataset in d_act.values():
+                self.consumers.add(dataset)
 
     def relink_to_new_steel_markets(self, name, ref_prod):
 
@@ -1181,82 +1213,54 @@ class Steel:
                 if exc["name"] == name and exc["product"] == ref_prod
             ]
 
-            amount = 0
-            for exc in excs:
-                amount += exc["amount"]
-                ds["exchanges"].remove(exc)
-
-            if amount > 0:
-                new_exc = {
-                    "name": name,
-                    "product": ref_prod,
-                    "amount": amount,
-                    "type": "technosphere",
-                    "unit": "kilogram",
-                }
-
-                # First, try to find a steel market that has the same location as the dataset
-                try:
-                    new_supplier = ws.get_one(
-                        self.db,
-                        ws.equals("name", name),
-                        ws.equals("location", ds["location"]),
-                        ws.contains("reference product", ref_prod),
-                    )
+            if not excs:
+                continue
 
-                    new_exc["location"] = new_supplier["location"]
+            with self.consumers.editing(ds):
+                amount = 0
+                for exc in excs:
+                    amount += exc["amount"]
+                    ds["exchanges"].remove(exc)
+
+                if amount > 0:
+                    new_exc = {
+                        "name": name,
+                        "product": ref_prod,
+                        "amount": amount,
+                        "type": "technosphere",
+                        "unit": "kilogram",
+                    }
 
-                # If it fails
-                except ws.NoResults:
+                    # First, try to find a steel market that has the same location as the dataset
                     try:
-                        # If the dataset location is a region of the IAM model
-                        # Let's try to find a steel market dataset which location
-                        # is included in that IAM region
-                        if ds["location"] in self.iam_data.regions:
-                            new_supplier = ws.get_one(
-                                self.db,
-                                *[
-                                    ws.contains("name", name),
-                                    ws.either(
-                                        *[
-                                            ws.equals("location", l[1])
-                                            if isinstance(l, tuple)
-                                            else ws.equals("location", l)
-                                            for l in self.geo.iam_to_ecoinvent_location(
-                                                ds["location"]
-                                            )
-                                        ]
-                                    ),
-                                    ws.contains("reference product", ref_prod),
-                                ],
-                            )
-                            new_exc["location"] = new_supplier["location"]
-
-                        else:
-                            # If the dataset location is an ecoinvent location
-                            # Let's try to find a steel market which location
-                            # encompasses the location of the dataset
-                            try:
-                                possible_locs = [
-                                    l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.contained(ds["location"])
-                                ]
-                                if ds["location"] not in ("World", "GLO"):
-                                    possible_locs = [
-                                        l for l in possible_locs if l != "GLO"
-                                    ]
+                        new_supplier = ws.get_one(
+                            self.db,
+                            ws.equals("name", name),
+                            ws.equals("location", ds["location"]),
+                            ws.contains("reference product", ref_prod),
+                        )
 
-                                if ds["location"] == "RoW":
-                                    possible_locs = ["CHA", "CHN"]
+                        new_exc["location"] = new_supplier["location"]
 
+                    # If it fails
+                    except ws.NoResults:
+                        try:
+                            # If the dataset location is a region of the IAM model
+                            # Let's try to find a steel market dataset which location
+                            # is included in that IAM region
+                            if ds["location"] in self.iam_data.regions:
                                 new_supplier = ws.get_one(
                                     self.db,
                                     *[
-                                        ws.equals("name", name),
+                                        ws.contains("name", name),
                                         ws.either(
                                             *[
-                                                ws.equals("location", l)
-                                                for l in possible_locs
+                                                ws.equals("location", l[1])
+                                                if isinstance(l, tuple)
+                                                else ws.equals("location", l)
+                                                for l in self.geo.iam_to_ecoinvent_location(
+                                                    ds["location"]
+                                                )
                                             ]
                                         ),
                                         ws.contains("reference product", ref_prod),
@@ -1264,21 +1268,25 @@ class Steel:
                                 )
                                 new_exc["location"] = new_supplier["location"]
 
-                            except ws.NoResults:
-
+                            else:
                                 # If the dataset location is an ecoinvent location
                                 # Let's try to find a steel market which location
-                                # is a part of the location of the dataset
-                                possible_locs = [
-                                    l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.within(ds["location"])
-                                ]
-                                if ds["location"] not in ("World", "GLO"):
+                                # encompasses the location of the dataset
+                                try:
                                     possible_locs = [
-                                        l for l in possible_locs if l != "GLO"
+                                        l[1] if isinstance(l, tuple) else l
+                                        for l in self.geo.topology.contained(
+                                            ds["location"]
+                                        )
                                     ]
+                                    if ds["location"] not in ("World", "GLO"):
+                                        possible_locs = [
+                                            l for l in possible_locs if l != "GLO"
+                                        ]
+
+                                    if ds["location"] == "RoW":
+                                        possible_locs = ["CHA", "CHN"]
 
-                                try:
                                     new_supplier = ws.get_one(
                                         self.db,
                                         *[
@@ -1292,22 +1300,175 @@ class Steel:
                                             ws.contains("reference product", ref_prod),
                                         ],
                                     )
+                                    new_exc["location"] = new_supplier["location"]
+
                                 except ws.NoResults:
-                                    # then maybe, the supplier has an IAM region
-                                    new_supplier = ws.get_one(
+
+                                    # If the dataset location is an ecoinvent location
+                                    # Let's try to find a steel market which location
+                                    # is a part of the location of the dataset
+                                    possible_locs = [
+                                        l[1] if isinstance(l, tuple) else l
+                                        for l in self.geo.topology.within(
+                                            ds["location"]
+                                        )
+                                    ]
+                                    if ds["location"] not in ("World", "GLO"):
+                                        possible_locs = [
+                                            l for l in possible_locs if l != "GLO"
+                                        ]
+
+                                    try:
+                                        new_supplier = ws.get_one(
+                                            self.db,
+                                            *[
+                                                ws.equals("name", name),
+                                                ws.either(
+                                                    *[
+                                                        ws.equals("location", l)
+                                                        for l in possible_locs
+                                                    ]
+                                                ),
+                                                ws.contains(
+                                                    "reference product", ref_prod
+                                                ),
+                                            ],
+                                        )
+                                    except ws.NoResults:
+                                        # then maybe, the supplier has an IAM region
+                                        new_supplier = ws.get_one(
+                                            self.db,
+                                            *[
+                                                ws.equals("name", name),
+                                                ws.equals(
+                                                    "location",
+                                                    self.geo.ecoinvent_to_iam_location(
+                                                        ds["location"]
+                                                    ),
+                                                ),
+                                                ws.contains(
+                                                    "reference product", ref_prod
+                                                ),
+                                            ],
+                                        )
+
+                                    new_exc["location"] = new_supplier["location"]
+
+                                except ws.MultipleResults:
+                                    # We have several potential steel suppliers
+                                    # We will look up their respective production volumes
+                                    # And include them proportionally to it
+
+                                    possible_locs = [
+                                        l[1] if isinstance(l, tuple) else l
+                                        for l in self.geo.topology.contained(
+                                            ds["location"]
+                                        )
+                                    ]
+                                    possible_locs = [
+                                        l for l in possible_locs if l != "GLO"
+                                    ]
+
+                                    possible_suppliers = ws.get_many(
                                         self.db,
                                         *[
                                             ws.equals("name", name),
-                                            ws.equals(
-                                                "location",
-                                                self.geo.ecoinvent_to_iam_location(
-                                                    ds["location"]
-                                                ),
+                                            ws.either(
+                                                *[
+                                                    ws.equals("location", l)
+                                                    for l in possible_locs
+                                                ]
                                             ),
                                             ws.contains("reference product", ref_prod),
                                         ],
                                     )
+                                    possible_suppliers = (
+                                        self.get_shares_from_production_volume(
+                                            possible_suppliers
+                                        )
+                                    )
+
+                                    new_exc = []
+                                    for supplier in possible_suppliers:
+                                        new_exc.append(
+                                            {
+                                                "name": name,
+                                                "product": ref_prod,
+                                                "amount": amount
+                                                * possible_suppliers[supplier],
+                                                "type": "technosphere",
+                                                "unit": "kilogram",
+                                                "location": supplier[1],
+                                            }
+                                        )
+
+                        # Europe without Austria is a new location in ei 3.7
+                        # which is not yet defined in wurst
+                        except KeyError:
+
+                            if ds["location"] == "Europe without Austria":
+
+                                try:
+                                    new_supplier = ws.get_one(
+                                        self.db,
+                                        ws.equals("name", name),
+                                        ws.equals("location", "RER"),
+                                        ws.contains("reference product", ref_prod),
+                                    )
+                                except ws.NoResults:
+
+                                    new_supplier = ws.get_one(
+                                        self.db,
+                                        ws.equals("name", name),
+                                        ws.equals(
+                                            "location",
+                                            "EUR" if self.model == "remind" else "WEU",
+                                        ),
+                                        ws.contains("reference product", ref_prod),
+                                    )
+
+                                new_exc["location"] = new_supplier["location"]
+
+                        # If this also fails
+                        except ws.NoResults:
+                            try:
+                                # If the dataset location is an ecoinvent location
+                                # Let's try to find a steel market which location
+                                # is a part of the location of the dataset
+
+                                possible_locs = [
+                                    l[1] if isinstance(l, tuple) else l
+                                    for l in self.geo.topology.within(ds["location"])
+                                ]
+
+                                if ds["location"] not in ("World", "GLO"):
+                                    possible_locs = [
+                                        l for l in possible_locs if l != "GLO"
+                                    ]
+
+                                new_supplier = ws.get_one(
+                                    self.db,
+                                    *[
+                                        ws.equals("name", name),
+                                        ws.either(
+                                            *[
+                                                ws.equals("location", l)
+                                                for l in possible_locs
+                                            ]
+                                        ),
+                                        ws.contains("reference product", ref_prod),
+                                    ],
+                                )
+                                new_exc["location"] = new_supplier["location"]
 
+                            # If this fails, then we use the GLO steel market
+                            except (ws.NoResults, KeyError):
+                                new_supplier = ws.get_one(
+                                    self.db,
+                                    ws.equals("name", name),
+                                    ws.equals("location", "World"),
+                                    ws.contains("reference product", ref_prod),
+                                )
                                 new_exc["location"] = new_supplier["location"]
 
                             except ws.MultipleResults:
@@ -1317,9 +1478,12 @@ class Steel:
 
                                 possible_locs = [
                                     l[1] if isinstance(l, tuple) else l
-                                    for l in self.geo.geo.contained(ds["location"])
+                                    for l in self.geo.topology.contained(ds["location"])
                                 ]
-                                possible_locs = [l for l in possible_locs if l != "GLO"]
+                                if ds["location"] not in ("World", "GLO"):
+                                    possible_locs = [
+                                        l for l in possible_locs if l != "GLO"
+                                    ]
 
                                 possible_suppliers = ws.get_many(
                                     self.db,
@@ -1354,101 +1518,66 @@ class Steel:
                                         }
                                     )
 
-                    # Europe without Austria is a new location in ei 3.7
-                    # which is not yet defined in wurst
-                    except KeyError:
+                        except ws.MultipleResults:
+                            # We have several potential steel suppliers
+                            # We will look up their respective production volumes
+                            # And include them proportionally to it
 
-                        if ds["location"] == "Europe without Austria":
+                            if ds["location"] in self.iam_data.regions:
 
-                            try:
-                                new_supplier = ws.get_one(
+                                possible_suppliers = ws.get_many(
                                     self.db,
-                                    ws.equals("name", name),
-                                    ws.equals("location", "RER"),
-                                    ws.contains("reference product", ref_prod),
+                                    *[
+                                        ws.equals("name", name),
+                                        ws.either(
+                                            *[
+                                                ws.equals("location", l[1])
+                                                if isinstance(l, tuple)
+                                                else ws.equals("location", l)
+                                                for l in self.geo.iam_to_ecoinvent_location(
+                                                    ds["location"]
+                                                )
+                                            ]
+                                        ),
+                                        ws.contains("reference product", ref_prod),
+                                    ],
                                 )
-                            except ws.NoResults:
 
-                                new_supplier = ws.get_one(
-                                    self.db,
-                                    ws.equals("name", name),
-                                    ws.equals(
-                                        "location",
-                                        "EUR" if self.model == "remind" else "WEU",
-                                    ),
-                                    ws.contains("reference product", ref_prod),
+                                possible_suppliers = (
+                                    self.get_shares_from_production_volume(
+                                        possible_suppliers
+                                    )
                                 )
 
-                            new_exc["location"] = new_supplier["location"]
-
-                    # If this also fails
-                    except ws.NoResults:
-                        try:
-                            # If the dataset location is an ecoinvent location
-                            # Let's try to find a steel market which location
-                            # is a part of the location of the dataset
-
-                            possible_locs = [
-                                l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.within(ds["location"])
-                            ]
-
-                            if ds["location"] not in ("World", "GLO"):
-                                possible_locs = [l for l in possible_locs if l != "GLO"]
-
-                            new_supplier = ws.get_one(
-                                self.db,
-                                *[
-                                    ws.equals("name", name),
-                                    ws.either(
-                                        *[
-                                            ws.equals("location", l)
-                                            for l in possible_locs
-                                        ]
-                                    ),
-                                    ws.contains("reference product", ref_prod),
-                                ],
-                            )
-                            new_exc["location"] = new_supplier["location"]
-
-                        # If this fails, then we use the GLO steel market
-                        except (ws.NoResults, KeyError):
-                            new_supplier = ws.get_one(
-                                self.db,
-                                ws.equals("name", name),
-                                ws.equals("location", "World"),
-                                ws.contains("reference product", ref_prod),
-                            )
-                            new_exc["location"] = new_supplier["location"]
-
-                        except ws.MultipleResults:
-                            # We have several potential steel suppliers
-                            # We will look up their respective production volumes
-                            # And include them proportionally to it
+                            else:
 
-                            possible_locs = [
-                                l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.contained(ds["location"])
-                            ]
-                            if ds["location"] not in ("World", "GLO"):
-                                possible_locs = [l for l in possible_locs if l != "GLO"]
+                                possible_locs = [
+                                    l[1] if isinstance(l, tuple) else l
+                                    for l in self.geo.topology.contained(ds["location"])
+                                ]
+                                if ds["location"] not in ("World", "GLO"):
+                                    possible_locs = [
+                                        l for l in possible_locs if l != "GLO"
+                                    ]
 
-                            possible_suppliers = ws.get_many(
-                                self.db,
-                                *[
-                                    ws.equals("name", name),
-                                    ws.either(
-                                        *[
-                                            ws.equals("location", l)
-                                            for l in possible_locs
-                                        ]
-                                    ),
-                                    ws.contains("reference product", ref_prod),
-                                ],
-                            )
-                            possible_suppliers = self.get_shares_from_production_volume(
-                                possible_suppliers
-                            )
+                                possible_suppliers = ws.get_many(
+                                    self.db,
+                                    *[
+                                        ws.equals("name", name),
+                                        ws.either(
+                                            *[
+                                                ws.equals("location", l)
+                                                for l in possible_locs
+                                            ]
+                                        ),
+                                        ws.contains("reference product", ref_prod),
+                                    ],
+                                )
+                                possible_suppliers = (
+                                    self.get_shares_from_production_volume(
+                                        possible_suppliers
+                                    )
+                                )
 
                             new_exc = []
                             for supplier in possible_suppliers:
@@ -1496,7 +1625,7 @@ class Steel:
 
                             possible_locs = [
                                 l[1] if isinstance(l, tuple) else l
-                                for l in self.geo.geo.contained(ds["location"])
+                                for l in self.geo.topology.contained(ds["location"])
                             ]
                             if ds["location"] not in ("World", "GLO"):
                                 possible_locs = [l for l in possible_locs if l != "GLO"]
@@ -1531,73 +1660,8 @@ class Steel:
                                 }
                             )
 
-                except ws.MultipleResults:
-                    # We have several potential steel suppliers
-                    # We will look up their respective production volumes
-                    # And include them proportionally to it
-
-                    if ds["location"] in self.iam_data.regions:
-
-                        possible_suppliers = ws.get_many(
-                            self.db,
-                            *[
-                                ws.equals("name", name),
-                                ws.either(
-                                    *[
-                                        ws.equals("location", l[1])
-                                        if isinstance(l, tuple)
-                                        else ws.equals("location", l)
-                                        for l in self.geo.iam_to_ecoinvent_location(
-                                            ds["location"]
-                                        )
-                                    ]
-                                ),
-                                ws.contains("reference product", ref_prod),
-                            ],
-                        )
-
-                        possible_suppliers = self.get_shares_from_production_volume(
-                            possible_suppliers
-                        )
+                    if isinstance(new_exc, dict):
+                        ds["exchanges"].append(new_exc)
 
                     else:
-
-                        possible_locs = [
-                            l[1] if isinstance(l, tuple) else l
-                            for l in self.geo.geo.contained(ds["location"])
-                        ]
-                        if ds["location"] not in ("World", "GLO"):
-                            possible_locs = [l for l in possible_locs if l != "GLO"]
-
-                        possible_suppliers = ws.get_many(
-                            self.db,
-                            *[
-                                ws.equals("name", name),
-                                ws.either(
-                                    *[ws.equals("location", l) for l in possible_locs]
-                                ),
-                                ws.contains("reference product", ref_prod),
-                            ],
-                        )
-                        possible_suppliers = self.get_shares_from_production_volume(
-                            possible_suppliers
-                        )
-
-                    new_exc = []
-                    for supplier in possible_suppliers:
-                        new_exc.append(
-                            {
-                                "name": name,
-                                "product": ref_prod,
-                                "amount": amount * possible_suppliers[supplier],
-                                "type": "technosphere",
-                                "unit": "kilogram",
-                                "location": supplier[1],
-                            }
-                        )
-
-                if isinstance(new_exc, dict):
-                    ds["exchanges"].append(new_exc)
-
-                else:
-                    ds["exchanges"].extend(new_exc)
+                        ds["exchanges"].extend(new_exc)
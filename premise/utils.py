@@ -1,9 +1,8 @@
+import csv
 import uuid
 from copy import deepcopy
 from datetime import date
-from itertools import chain
 
-from constructive_geometries import resolved_row
 from wurst import log
 from wurst import searching as ws
 from wurst.errors import InvalidLink
@@ -11,6 +10,7 @@ from wurst.searching import equals, get_many, get_one, reference_product
 from wurst.transformations.uncertainty import rescale_exchange
 
 from . import geomap
+from .dataset_index import DatasetIndex
 from .export import *
 
 CO2_FUELS = DATA_DIR / "fuel_co2_emission_factor.txt"
@@ -144,6 +144,32 @@ def get_metals_recycling_rates(year):
     )
 
 
+def copy_database(db):
+    """
+    Return a full copy of a wurst database.
+    Datasets, exchanges and any other nested dictionaries and lists are copied,
+    so that the copy can be modified without altering the original database.
+    Strings, numbers and tuples are immutable and are therefore shared with the original.
+    Several times faster than `copy.deepcopy`, which inspects every object
+    and keeps track of the objects it has already copied, but it takes as much memory:
+    this is not a copy-on-write view, and every dataset is copied upfront.
+
+    :param db: database in list-of-dict format
+    :type db: list
+    :return: copy of the database
+    :rtype: list
+    """
+
+    def copy_object(obj):
+        if isinstance(obj, dict):
+            return {k: copy_object(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [copy_object(v) for v in obj]
+        return obj
+
+    return [copy_object(ds) for ds in db]
+
+
 def rev_index(inds):
     return {v: k for k, v in inds.items()}
 
@@ -166,128 +192,475 @@ def create_codes_and_names_of_A_matrix(db):
     }
 
 
+def get_exchange_key(exc):
+    """
+    Return a key identifying an exchange within a dataset:
+    the code of the biosphere flow for biosphere exchanges,
+    and the name, product, unit and location of the provider otherwise.
+
+    :param exc: an exchange
+    :type exc: dict
+    :rtype: tuple
+    """
+    if exc["type"] == "biosphere":
+        return exc["type"], exc["input"][1]
+    return (
+        exc["type"],
+        exc.get("name"),
+        exc.get("product"),
+        exc.get("unit"),
+        exc.get("location"),
+    )
+
+
+def get_exchange_values(ds):
+    """
+    Return the amounts of the exchanges of a dataset, by exchange key.
+    If several exchanges have the same key, the last one is kept.
+
+    :param ds: a dataset
+    :type ds: dict
+    :return: dictionary {exchange key: amount}
+    :rtype: dict
+    """
+    return {get_exchange_key(exc): exc["amount"] for exc in ds["exchanges"]}
+
+
+def find_changes(original_db, db, original_values=None):
+    """
+    Compare a database with the original database, in one pass over each database.
+    Datasets are matched by code, and their exchanges by :func:`get_exchange_key`.
+
+    :param original_db: original database
+    :type original_db: list
+    :param db: database to compare
+    :type db: list
+    :param original_values: exchange values of the original database, by dataset code,
+    as returned by :func:`get_exchange_values`. Pass it to compare several databases
+    with the same original database.
+    :type original_values: dict
+    :return: dictionary with:
+
+        * "new activities": codes of the datasets not in the original database
+        * "modified activities": for each dataset found in both databases with added,
+          modified or removed exchanges, the keys of the added or modified exchanges
+        * "removed activities": codes of the datasets only in the original database
+        * "removed exchanges": number of exchanges only in the original database
+
+    :rtype: dict
+    """
+    if original_values is None:
+        original_values = {ds["code"]: get_exchange_values(ds) for ds in original_db}
+
+    new_activities, modified_activities = set(), {}
+    removed_exchanges = 0
+    codes = set()
+
+    for ds in db:
+        codes.add(ds["code"])
+
+        if ds["code"] not in original_values:
+            new_activities.add(ds["code"])
+            continue
+
+        original = original_values[ds["code"]]
+        new = get_exchange_values(ds)
+
+        if new == original:
+            continue
+
+        modified_activities[ds["code"]] = {
+            k for k, v in new.items() if k not in original or original[k] != v
+        }
+        removed_exchanges += len(original.keys() - new.keys())
+
+    return {
+        "new activities": new_activities,
+        "modified activities": modified_activities,
+        "removed activities": original_values.keys() - codes,
+        "removed exchanges": removed_exchanges,
+    }
+
+
 def add_modified_tags(original_db, scenarios):
     """
     Add a `modified` label to any activity that is new
     Also add a `modified` label to any exchange that has been added
     or that has a different value than the source database.
-    :return:
+    Statistics about the changes are stored under `changes` in each scenario:
+    numbers of new, modified and removed activities,
+    and of new, modified and removed exchanges.
+    :return: scenarios
     """
 
-    # Class `Export` to which the original database is passed
-    exp = Export(original_db)
-    # Collect a dictionary of activities {row/col index in A matrix: code}
-    rev_ind_A = rev_index(create_codes_index_of_A_matrix(original_db))
-    # Retrieve list of coordinates [activity, activity, value]
-    coords_A = exp.create_A_matrix_coordinates()
-    # Turn it into a dictionary {(code of receiving activity, code of supplying activity): value}
-    original = {(rev_ind_A[x[0]], rev_ind_A[x[1]]): x[2] for x in coords_A}
-    # Collect a dictionary with activities' names and correponding codes
-    codes_names = create_codes_and_names_of_A_matrix(original_db)
-    # Collect list of substances
-    rev_ind_B = rev_index(create_codes_index_of_B_matrix())
-    # Retrieve list of coordinates of the B matrix [activity index, substance index, value]
-    coords_B = exp.create_B_matrix_coordinates()
-    # Turn it into a dictionary {(activity code, substance code): value}
-    original.update({(rev_ind_A[x[0]], rev_ind_B[x[1]]): x[2] for x in coords_B})
+    original_values = {ds["code"]: get_exchange_values(ds) for ds in original_db}
 
     for s, scenario in enumerate(scenarios):
         print(f"Looking for differences in database {s + 1} ...")
-        rev_ind_A = rev_index(create_codes_index_of_A_matrix(scenario["database"]))
-        exp = Export(
-            scenario["database"],
-            scenario["model"],
-            scenario["pathway"],
-            scenario["year"],
-            "",
-        )
-        coords_A = exp.create_A_matrix_coordinates()
-        new = {(rev_ind_A[x[0]], rev_ind_A[x[1]]): x[2] for x in coords_A}
-
-        rev_ind_B = rev_index(create_codes_index_of_B_matrix())
-        coords_B = exp.create_B_matrix_coordinates()
-        new.update({(rev_ind_A[x[0]], rev_ind_B[x[1]]): x[2] for x in coords_B})
-
-        list_new = set(i[0] for i in original.keys()) ^ set(i[0] for i in new.keys())
-
-        ds = (d for d in scenario["database"] if d["code"] in list_new)
-
-        # Tag new activities
-        for d in ds:
-            d["modified"] = True
-
-        # List codes that belong to activities that contain modified exchanges
-        list_modified = (i[0] for i in new if i in original and new[i] != original[i])
-        #
-        # Filter for activities that have modified exchanges
-        for ds in ws.get_many(
-            scenario["database"],
-            ws.either(*[ws.equals("code", c) for c in set(list_modified)]),
-        ):
-            # Loop through biosphere exchanges and check if
-            # the exchange also exists in the original database
-            # and if it has the same value
-            # if any of these two conditions is False, we tag the exchange
-            excs = (exc for exc in ds["exchanges"] if exc["type"] == "biosphere")
-            for exc in excs:
-                if (ds["code"], exc["input"][0]) not in original or new[
-                    (ds["code"], exc["input"][0])
-                ] != original[(ds["code"], exc["input"][0])]:
-                    exc["modified"] = True
-            # Same thing for technosphere exchanges,
-            # except that we first need to look up the provider's code first
-            excs = (exc for exc in ds["exchanges"] if exc["type"] == "technosphere")
-            for exc in excs:
-                if (
-                    exc["name"],
-                    exc["product"],
-                    exc["unit"],
-                    exc["location"],
-                ) in codes_names:
-                    exc_code = codes_names[
-                        (exc["name"], exc["product"], exc["unit"], exc["location"])
-                    ]
-                    if new[(ds["code"], exc_code)] != original[(ds["code"], exc_code)]:
+
+        changes = find_changes(original_db, scenario["database"], original_values)
+        modified = changes["modified activities"]
+        new_exchanges = 0
+
+        for ds in scenario["database"]:
+            # Tag new activities
+            if ds["code"] in changes["new activities"]:
+                ds["modified"] = True
+
+            # Tag new or modified exchanges of the other activities
+            elif ds["code"] in modified:
+                for exc in ds["exchanges"]:
+                    if get_exchange_key(exc) in modified[ds["code"]]:
                         exc["modified"] = True
-                else:
-                    exc["modified"] = True
+
+        for code, keys in modified.items():
+            new_exchanges += len(keys - original_values[code].keys())
+
+        n_modified_exchanges = sum(len(v) for v in modified.values())
+
+        scenario["changes"] = {
+            "new activities": len(changes["new activities"]),
+            "modified activities": len(modified),
+            "removed activities": len(changes["removed activities"]),
+            "new exchanges": new_exchanges,
+            "modified exchanges": n_modified_exchanges - new_exchanges,
+            "removed exchanges": changes["removed exchanges"],
+        }
 
     return scenarios
 
 
-def build_superstructure_db(origin_db, scenarios, db_name, fp):
-    # Class `Export` to which the original database is passed
-    exp = Export(db=origin_db, filepath=fp)
+def find_changed_datasets(original_db, dbs):
+    """
+    Return, for each database, the codes of the datasets that are new
+    or that differ from the original database, as found by :func:`find_changes`.
+
+    :param original_db: original database
+    :type original_db: list
+    :param dbs: databases to compare with the original database
+    :type dbs: list
+    :return: a set of dataset codes for each database
+    :rtype: list
+    """
+    original_values = {ds["code"]: get_exchange_values(ds) for ds in original_db}
 
-    # Collect a dictionary of activities
-    # {(name, ref_prod, loc, db, unit):row/col index in A matrix}
-    rev_ind_A = exp.rev_index(exp.create_names_and_indices_of_A_matrix())
+    changed = []
+    for db in dbs:
+        changes = find_changes(original_db, db, original_values)
+        changed.append(
+            changes["new activities"] | changes["modified activities"].keys()
+        )
+
+    return changed
 
-    # Retrieve list of coordinates [activity, activity, value]
-    coords_A = exp.create_A_matrix_coordinates()
 
-    # Turn it into a dictionary {(code of receiving activity, code of supplying activity): value}
-    original = dict()
-    for x in coords_A:
-        if (rev_ind_A[x[0]], rev_ind_A[x[1]]) in original:
-            original[(rev_ind_A[x[0]], rev_ind_A[x[1]])] += x[2] * -1
+def get_delta_database(db, codes, name, base_name):
+    """
+    Return a copy of the datasets of `db` whose code is in `codes`, to be written as database `name`
+    on top of a base database `base_name` that contains all the other datasets of `db`, with the same codes.
+    Technosphere and production exchanges are linked to `name` if the supplying dataset is
+    in the delta database, and to `base_name` otherwise.
+    As the datasets of the base database only link to the base database, the links of the unchanged
+    datasets that consume a changed dataset are returned as well, as (consumer code, supplier code) pairs.
+    They are to be resolved when building the technosphere matrix, see :func:`get_delta_lca`.
+
+    :param db: database in list-of-dict format
+    :type db: list
+    :param codes: codes of the datasets that are new or differ from the base database
+    :type codes: set
+    :param name: name of the delta database
+    :type name: str
+    :param base_name: name of the base database
+    :type base_name: str
+    :return: the datasets of the delta database, and the links of the base database to relink to it
+    :rtype: tuple
+    :raises InvalidLink: if an exchange links to a dataset that is not in `db`
+    """
+    db_names = {ds["database"] for ds in db}
+    db_codes = {ds["code"] for ds in db}
+    products = {
+        (exc["name"], exc["product"], exc["location"], exc["unit"]): ds["code"]
+        for ds in db
+        for exc in [reference_product(ds)]
+    }
+
+    def get_supplier(exc):
+        if exc.get("input"):
+            if exc["input"][0] not in db_names:
+                # linked to another database
+                return None
+            code = exc["input"][1]
         else:
-            original[(rev_ind_A[x[0]], rev_ind_A[x[1]])] = x[2] * -1
+            code = products.get(
+                (exc["name"], exc["product"], exc["location"], exc["unit"])
+            )
+
+        if code not in db_codes:
+            raise InvalidLink(f"Can't find linking activity for exchange:\n{exc}")
+
+        return code
+
+    links = set()
+    for ds in db:
+        if ds["code"] in codes:
+            continue
+        for exc in ds["exchanges"]:
+            if exc["type"] in ("technosphere", "substitution"):
+                supplier = get_supplier(exc)
+                if supplier in codes:
+                    links.add((ds["code"], supplier))
+
+    delta = copy_database([ds for ds in db if ds["code"] in codes])
+
+    for ds in delta:
+        ds["database"] = name
+        for exc in ds["exchanges"]:
+            if exc["type"] not in ("production", "technosphere", "substitution"):
+                continue
+
+            code = get_supplier(exc)
+            if code is not None:
+                exc["input"] = (name if code in codes else base_name, code)
+
+    print(
+        f"{name}: {len(delta)} of {len(db)} datasets written, "
+        f"{len(links)} links of {base_name} relinked."
+    )
+
+    return delta, sorted(links)
+
+
+# rows allowed in an Excel sheet, besides the empty header row
+EXCEL_MAX_ROWS = 1048575
+
+
+def write_scenario_difference_file(
+    rows, filepath, file_format="excel", chunk_size=50000
+):
+    """
+    Write a scenario difference file, row by row.
+    The first row contains the column names. The first 13 columns contain text,
+    the others the values of the exchanges.
+
+    With `file_format="csv"`, rows are written to a csv file (";"-separated).
+    With `file_format="parquet"`, rows are written to a parquet file by chunks of `chunk_size`
+    rows (requires `pyarrow`).
+    With `file_format="excel"`, rows are first written to a csv file, which is then converted into
+    an Excel file with :func:`convert_scenario_difference_file_to_excel`.
+
+    :param rows: rows of the file
+    :type rows: iterable
+    :param filepath: path of the file, without extension
+    :type filepath: pathlib.Path
+    :param file_format: "excel", "csv" or "parquet"
+    :type file_format: str
+    :param chunk_size: number of rows written at once to a parquet file
+    :type chunk_size: int
+    :return: path of the file written
+    :rtype: pathlib.Path
+    """
+
+    rows = iter(rows)
+    columns = next(rows)
+
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if len(set(columns)) < len(columns):
+            raise ValueError(
+                "Column names must be unique to write a parquet file, "
+                "but some scenarios have the same model, pathway and year."
+            )
+
+        filepath = filepath.with_suffix(".parquet")
+        schema = pa.schema(
+            [(c, pa.string()) for c in columns[:13]]
+            + [(c, pa.float64()) for c in columns[13:]]
+        )
+
+        def to_table(chunk):
+            return pa.Table.from_arrays(
+                [
+                    pa.array(
+                        [str(row[i]) for row in chunk]
+                        if i < 13
+                        else [float(row[i]) for row in chunk],
+                        type=schema.field(i).type,
+                    )
+                    for i in range(len(columns))
+                ],
+                schema=schema,
+            )
+
+        with pq.ParquetWriter(filepath, schema) as writer:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    writer.write_table(to_table(chunk))
+                    chunk = []
+            if chunk:
+                writer.write_table(to_table(chunk))
+
+        return filepath
+
+    csv_filepath = filepath.with_suffix(".csv")
+
+    with open(csv_filepath, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";", lineterminator="\n")
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+    if file_format == "excel":
+        return convert_scenario_difference_file_to_excel(csv_filepath)
+
+    return csv_filepath
+
+
+def convert_scenario_difference_file_to_excel(filepath):
+    """
+    Convert a scenario difference file written in csv by :func:`write_scenario_difference_file`
+    into an Excel file. The csv file is deleted, unless it has too many rows for Excel,
+    in which case it is kept and no Excel file is written.
+
+    :param filepath: path of the csv file
+    :type filepath: pathlib.Path
+    :return: path of the Excel file, or of the csv file if it could not be converted
+    :rtype: pathlib.Path
+    """
+
+    with open(filepath, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=";")
+        data = [next(reader)]
+        for row in reader:
+            data.append(row[:13] + [float(v) for v in row[13:]])
+            if len(data) > EXCEL_MAX_ROWS:
+                print(
+                    "The scenario difference file has too many rows for Excel, "
+                    "it is kept as a csv file."
+                )
+                return filepath
+
+    excel_filepath = filepath.with_suffix(".xlsx")
+    pd.DataFrame(data, columns=[""] * len(data[0])).to_excel(
+        excel_filepath, index=False
+    )
+    os.remove(filepath)
+
+    return excel_filepath
+
+
+def get_activity_key(ds):
+    return (
+        ds["name"],
+        ds["reference product"],
+        ds["database"],
+        ds["location"],
+        ds["unit"],
+    )
+
+
+def get_matrix_entries(exp, act_ids, n_act, n_cols):
+    """
+    Return the exchanges of the database of `exp` as codes `row * n_cols + col`,
+    where `row` is the index of the consuming activity in `act_ids` and `col`
+    the index of the supplying activity in `act_ids`, or `n_act` + the index of
+    the biosphere flow. Values are those of the A and B matrices, multiplied by -1.
+    Values of identical technosphere exchanges are summed; for identical
+    biosphere exchanges, the last one is kept.
+
+    :param exp: instance of `Export`
+    :param act_ids: dictionary mapping activity keys to union indices
+    :type act_ids: dict
+    :param n_act: number of activities in `act_ids`
+    :type n_act: int
+    :param n_cols: number of columns, activities and biosphere flows
+    :type n_cols: int
+    :return: exchange codes, in order of first appearance, and values
+    :rtype: tuple
+    """
+    local_to_union = np.array(
+        [act_ids[get_activity_key(ds)] for ds in exp.db], dtype=np.int64
+    )
+
+    rows, cols, values = exp.create_A_matrix_arrays()
+    codes = local_to_union[rows] * n_cols + local_to_union[cols]
+    unique, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    sums = np.zeros(len(unique))
+    np.add.at(sums, inverse, values * -1)
+    order = np.argsort(first, kind="stable")
+    codes_A, values_A = unique[order], sums[order]
+
+    rows, cols, values = exp.create_B_matrix_arrays()
+    codes = local_to_union[rows] * n_cols + n_act + cols
+    unique, first = np.unique(codes, return_index=True)
+    _, last = np.unique(codes[::-1], return_index=True)
+    order = np.argsort(first, kind="stable")
+    codes_B = unique[order]
+    values_B = (values * -1)[len(codes) - 1 - last][order]
+
+    return np.concatenate([codes_A, codes_B]), np.concatenate([values_A, values_B])
+
+
+def build_superstructure_db(origin_db, scenarios, db_name, fp, file_format="excel"):
+    """
+    Add to the original database the exchanges and activities found in the scenarios
+    and write a scenario difference file, to be used with
+    https://github.com/dgdekoning/brightway-superstructure.
+
+    :param origin_db: original database
+    :type origin_db: list
+    :param scenarios: scenarios, as in :attr:`.NewDatabase.scenarios`
+    :type scenarios: list
+    :param db_name: name of the superstructure database
+    :type db_name: str
+    :param fp: directory where the scenario difference file is written
+    :type fp: str
+    :param file_format: format of the scenario difference file, see :func:`write_scenario_difference_file`
+    :type file_format: str
+    :return: the superstructure database
+    :rtype: list
+    """
+
+    if file_format not in ("excel", "csv", "parquet"):
+        raise ValueError(
+            f"Unknown format {file_format} for the scenario difference file. "
+            "Must be one of 'excel', 'csv' or 'parquet'."
+        )
+    if file_format == "parquet":
+        check_parquet_engine(engines=("pyarrow",))
+
+    # Class `Export` to which the original database is passed
+    exp = Export(db=origin_db, filepath=fp)
+
+    # Index of all activities found in the original database and the scenarios
+    # {(name, ref_prod, db, loc, unit): index}
+    act_ids = {}
+    for db in [origin_db] + [s["database"] for s in scenarios]:
+        for ds in db:
+            act_ids.setdefault(get_activity_key(ds), len(act_ids))
+    act_keys = list(act_ids)
+    n_act = len(act_keys)
 
     # Collect list of substances
     rev_ind_B = exp.rev_index(exp.create_names_and_indices_of_B_matrix())
-    # Retrieve list of coordinates of the B matrix [activity index, substance index, value]
-    coords_B = exp.create_B_matrix_coordinates()
+    n_cols = n_act + max(rev_ind_B) + 1
 
-    # Turn it into a dictionary {(activity name, ref prod, location, database, unit): value}
-    original.update({(rev_ind_A[x[0]], rev_ind_B[x[1]]): x[2] * -1 for x in coords_B})
+    def get_key(code):
+        row, col = divmod(int(code), n_cols)
+        return (
+            act_keys[row],
+            act_keys[col] if col < n_act else rev_ind_B[col - n_act],
+        )
 
-    modified = {}
+    # Exchanges of each database, as codes identifying
+    # (receiving activity, supplying activity or substance), and values
+    entries = [get_matrix_entries(exp, act_ids, n_act, n_cols)]
 
     print("Looping through scenarios to detect changes...")
 
     for scenario in scenarios:
-
         exp = Export(
             db=scenario["database"],
             model=scenario["model"],
@@ -295,69 +668,77 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
             year=scenario["year"],
             filepath=fp,
         )
+        entries.append(get_matrix_entries(exp, act_ids, n_act, n_cols))
+
+    # Stack the values of all databases in a (exchanges x databases) array,
+    # the first column being the original database
+    all_codes = np.unique(np.concatenate([codes for codes, _ in entries]))
+    values = np.zeros((len(all_codes), len(entries)))
+    present = np.zeros((len(all_codes), len(entries)), dtype=bool)
+    positions = []
+
+    for d, (codes, vals) in enumerate(entries):
+        idx = np.searchsorted(all_codes, codes)
+        values[idx, d] = vals
+        present[idx, d] = True
+        position = np.full(len(all_codes), -1, dtype=np.int64)
+        position[idx] = np.arange(len(codes))
+        positions.append(position)
+
+    # Exchanges that are in the new database but not in the original one,
+    # exchanges that are present in both databases but with a different value,
+    # and exchanges of the original database that are not present in the new one
+    changed = (
+        present[:, 1:] & (~present[:, [0]] | (values[:, 1:] != values[:, [0]]))
+    ) | (present[:, [0]] & ~present[:, 1:])
+
+    # Order exchanges as they are found, scenario after scenario:
+    # first those of the new database, then those only in the original one
+    first_scenario = np.full(len(all_codes), len(scenarios), dtype=np.int64)
+    rank = np.zeros(len(all_codes), dtype=np.int64)
+    for s in range(len(scenarios)):
+        found = changed[:, s] & (first_scenario == len(scenarios))
+        first_scenario[found] = s
+        rank[found] = np.where(
+            present[found, s + 1],
+            positions[s + 1][found],
+            len(entries[s + 1][0]) + positions[0][found],
+        )
 
-        new_rev_ind_A = exp.rev_index(exp.create_names_and_indices_of_A_matrix())
-        new_coords_A = exp.create_A_matrix_coordinates()
-
-        new = dict()
-        for x in new_coords_A:
-            if (new_rev_ind_A[x[0]], new_rev_ind_A[x[1]]) in new:
-                new[(new_rev_ind_A[x[0]], new_rev_ind_A[x[1]])] += x[2] * -1
-            else:
-                new[(new_rev_ind_A[x[0]], new_rev_ind_A[x[1]])] = x[2] * -1
+    selected = np.flatnonzero(changed.any(axis=1))
+    selected = selected[np.lexsort((rank[selected], first_scenario[selected]))]
 
-        new_coords_B = exp.create_B_matrix_coordinates()
-        new.update(
-            {(new_rev_ind_A[x[0]], rev_ind_B[x[1]]): x[2] * -1 for x in new_coords_B}
-        )
-        # List activities that are in the new database but not in the original one
-        # As well as exchanges that are present in both databases but with a different value
-        list_modified = (i for i in new if i not in original or new[i] != original[i])
-        # Also add activities from the original database that are not present in
-        # the new one
-        list_new = (i for i in original if i not in new)
-
-        list_modified = chain(list_modified, list_new)
-
-        for i in list_modified:
-            if i not in modified:
-                modified[i] = {"original": original.get(i, 0)}
-                modified[i][
-                    scenario["model"]
-                    + " - "
-                    + scenario["pathway"]
-                    + " - "
-                    + str(scenario["year"])
-                ] = new.get(i, 0)
-            else:
-                modified[i][
-                    scenario["model"]
-                    + " - "
-                    + scenario["pathway"]
-                    + " - "
-                    + str(scenario["year"])
-                ] = new.get(i, 0)
+    modified = [get_key(code) for code in all_codes[selected]]
+    changed = changed[selected]
+    values = values[selected]
+    diagonal = (all_codes[selected] // n_cols) == (all_codes[selected] % n_cols)
 
     # some scenarios may have not been modified
     # and that means that exchanges might be absent
     # from `modified`
     # so we need to manually add them
     # and set the exchange value similar to that
-    # of the original database
+    # of the original database.
+    # If it is a production exchange
+    # the value should be -1
 
     list_scenarios = ["original"] + [
         s["model"] + " - " + s["pathway"] + " - " + str(s["year"]) for s in scenarios
     ]
 
-    for m in modified:
-        for s in list_scenarios:
-            if s not in modified[m].keys():
-                # if it is a production exchange
-                # the value should be -1
-                if m[1] == m[0]:
-                    modified[m][s] = -1
-                else:
-                    modified[m][s] = modified[m]["original"]
+    modified_values = {"original": values[:, 0]}
+    for s, name in enumerate(list_scenarios[1:]):
+        if name not in modified_values:
+            modified_values[name] = np.where(diagonal, -1, values[:, 0])
+        modified_values[name] = np.where(
+            changed[:, s], values[:, s + 1], modified_values[name]
+        )
+
+    original_values = modified_values["original"]
+    has_negative_value = np.any(
+        np.column_stack(list(modified_values.values())) < 0, axis=1
+    )
+    modified_values = {k: v.tolist() for k, v in modified_values.items()}
 
     columns = [
         "from activity name",
@@ -379,71 +760,71 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
         [a["model"] + " - " + a["pathway"] + " - " + str(a["year"]) for a in scenarios]
     )
 
-    print("Export a scenario difference file.")
-
-    l_modified = [columns]
-
-    for m in modified:
-
-        if m[1][2] == "biosphere3":
-            d = [
-                m[1][0],
-                "",
-                "",
-                m[1][1],
-                m[1][2],
-                "",
-                m[0][0],
-                m[0][1],
-                m[0][3],
-                "",
-                db_name,
-                "",
-                "biosphere",
-            ]
-        elif m[1] == m[0] and any(v < 0 for v in modified[m].values()):
-            d = [
-                m[1][0],
-                m[1][1],
-                m[1][3],
-                "",
-                db_name,
-                "",
-                m[0][0],
-                m[0][1],
-                m[0][3],
-                "",
-                db_name,
-                "",
-                "production",
-            ]
-        else:
-            d = [
-                m[1][0],
-                m[1][1],
-                m[1][3],
-                "",
-                db_name,
-                "",
-                m[0][0],
-                m[0][1],
-                m[0][3],
-                "",
-                db_name,
-                "",
-                "technosphere",
-            ]
-
-        for s in list_scenarios:
-            # we do not want a zero here,
-            # as it would render the matrix undetermined
-            if m[1] == m[0] and modified[m][s] == 0:
-                d.append(1)
-            elif m[1] == m[0] and modified[m][s] < 0:
-                d.append(modified[m][s] * -1)
+    def iter_rows():
+        yield columns
+
+        for i, m in enumerate(modified):
+
+            if m[1][2] == "biosphere3":
+                d = [
+                    m[1][0],
+                    "",
+                    "",
+                    m[1][1],
+                    m[1][2],
+                    "",
+                    m[0][0],
+                    m[0][1],
+                    m[0][3],
+                    "",
+                    db_name,
+                    "",
+                    "biosphere",
+                ]
+            elif m[1] == m[0] and has_negative_value[i]:
+                d = [
+                    m[1][0],
+                    m[1][1],
+                    m[1][3],
+                    "",
+                    db_name,
+                    "",
+                    m[0][0],
+                    m[0][1],
+                    m[0][3],
+                    "",
+                    db_name,
+                    "",
+                    "production",
+                ]
             else:
-                d.append(modified[m][s])
-        l_modified.append(d)
+                d = [
+                    m[1][0],
+                    m[1][1],
+                    m[1][3],
+                    "",
+                    db_name,
+                    "",
+                    m[0][0],
+                    m[0][1],
+                    m[0][3],
+                    "",
+                    db_name,
+                    "",
+                    "technosphere",
+                ]
+
+            for s in list_scenarios:
+                value = modified_values[s][i]
+                # we do not want a zero here,
+                # as it would render the matrix undetermined
+                if m[1] == m[0] and value == 0:
+                    d.append(1)
+                elif m[1] == m[0] and value < 0:
+                    d.append(value * -1)
+                else:
+                    d.append(value)
+            yield d
 
     if fp is not None:
         filepath = Path(fp)
@@ -453,10 +834,10 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
     if not os.path.exists(filepath):
         os.makedirs(filepath)
 
-    filepath = filepath / f"scenario_diff_{date.today()}.xlsx"
+    print("Export a scenario difference file.")
 
-    pd.DataFrame(l_modified, columns=[""] * len(columns)).to_excel(
-        filepath, index=False
+    filepath = write_scenario_difference_file(
+        iter_rows(), filepath / f"scenario_diff_{date.today()}", file_format
     )
 
     print(f"Scenario difference file exported to {filepath}!")
@@ -465,20 +846,17 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
 
     dict_bio = exp.create_names_and_indices_of_B_matrix()
 
+    # exchanges in `modified`, grouped by receiving activity
+    modified_by_act = {}
+    for i, m in enumerate(modified):
+        modified_by_act.setdefault(m[0], []).append(i)
+
     for ds in origin_db:
         exc_to_add = []
         for exc in [
-            e
-            for e in modified
-            if e[0]
-            == (
-                ds["name"],
-                ds["reference product"],
-                ds["database"],
-                ds["location"],
-                ds["unit"],
-            )
-            and modified[e]["original"] == 0
+            modified[i]
+            for i in modified_by_act.get(get_activity_key(ds), [])
+            if original_values[i] == 0
         ]:
             if isinstance(exc[1][1], tuple):
                 exc_to_add.append(
@@ -514,14 +892,13 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
 
     print("Adding extra activities to the original database...")
 
-    list_act = [
-        (a["name"], a["reference product"], a["database"], a["location"], a["unit"])
-        for a in origin_db
-    ]
+    list_act = {get_activity_key(a) for a in origin_db}
     list_to_add = [
-        m[0] for m in modified if modified[m]["original"] == 0 and m[0] not in list_act
+        m[0]
+        for i, m in enumerate(modified)
+        if original_values[i] == 0 and m[0] not in list_act
     ]
-    list_to_add = list(set(list_to_add))
+    list_to_add = list(dict.fromkeys(list_to_add))
 
     data = []
     for add in list_to_add:
@@ -535,7 +912,7 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
             "exchanges": [],
         }
 
-        acts = (act for act in modified if act[0] == add)
+        acts = (modified[i] for i in modified_by_act[add])
 
         for act in acts:
             if isinstance(act[1][1], tuple):
@@ -596,140 +973,263 @@ def build_superstructure_db(origin_db, scenarios, db_name, fp):
     return origin_db
 
 
-def relink_technosphere_exchanges(
-    ds,
-    data,
-    model,
-    exclusive=True,
-    drop_invalid=False,
-    biggest_first=False,
-    contained=True,
-):
-    """Find new technosphere providers based on the location of the dataset.
-    Designed to be used when the dataset's location changes, or when new datasets are added.
-    Uses the name, reference product, and unit of the exchange to filter possible inputs. These must match exactly. Searches in the list of datasets ``data``.
-    Will only search for providers contained within the location of ``ds``, unless ``contained`` is set to ``False``, all providers whose location intersects the location of ``ds`` will be used.
-    A ``RoW`` provider will be added if there is a single topological face in the location of ``ds`` which isn't covered by the location of any providing activity.
-    If no providers can be found, `relink_technosphere_exchanes` will try to add a `RoW` or `GLO` providers, in that order, if available. If there are still no valid providers, a ``InvalidLink`` exception is raised, unless ``drop_invalid`` is ``True``, in which case the exchange will be deleted.
-    Allocation between providers is done using ``allocate_inputs``; results seem strange if ``contained=False``, as production volumes for large regions would be used as allocation factors.
-    Input arguments:
-        * ``ds``: The dataset whose technosphere exchanges will be modified.
-        * ``data``: The list of datasets to search for technosphere product providers.
-        * ``model``: The IAM model
-        * ``exclusive``: Bool, default is ``True``. Don't allow overlapping locations in input providers.
-        * ``drop_invalid``: Bool, default is ``False``. Delete exchanges for which no valid provider is available.
-        * ``biggest_first``: Bool, default is ``False``. Determines search order when selecting provider locations. Only relevant is ``exclusive`` is ``True``.
-        * ``contained``: Bool, default is ``True``. If true, only use providers whose location is completely within the ``ds`` location; otherwise use all intersecting locations.
-    Modifies the dataset in place; returns the modified dataset."""
-    MESSAGE = "Relinked technosphere exchange of {}/{}/{} from {}/{} to {}/{}."
-    DROPPED = "Dropped technosphere exchange of {}/{}/{}; no valid providers."
-    new_exchanges = []
-    technosphere = lambda x: x["type"] == "technosphere"
+class Relinker:
+    """
+    Find new technosphere providers for datasets, based on their location.
+    See :func:`relink_technosphere_exchanges` for the rules applied.
+
+    A `Relinker` is meant to be created once per database, and used to relink
+    many datasets: providers are looked up by (name, reference product, unit) in an index
+    of the database, instead of going through the whole database for every exchange,
+    and the providers' locations selected for a given location of the dataset and
+    set of possible locations of providers are kept, instead of being searched again
+    in the geomatcher.
+
+    :ivar index: index of the database to search for technosphere product providers
+    :vartype index: premise.dataset_index.DatasetIndex
+    :ivar model: the IAM model
+    :vartype model: str
+    :ivar matches: locations selected for each (location, possible locations,
+                   contained, exclusive, biggest_first)
+    :vartype matches: dict
 
-    geomatcher = geomap.Geomap(model=model)
+    """
 
-    list_loc = [k if isinstance(k, str) else k[1] for k in geomatcher.geo.keys()]
+    MESSAGE = "Relinked technosphere exchange of {}/{}/{} from {}/{} to {}/{}."
+    DROPPED = "Dropped technosphere exchange of {}/{}/{}; no valid providers."
 
-    for exc in filter(technosphere, ds["exchanges"]):
+    def __init__(self, data, model, index=None):
+        self.index = index if index is not None else DatasetIndex(data)
+        self.model = model
+        self.geomatcher = geomap.Geomap(model=model)
+        self.matches = {}
+        self.known_locations = {
+            k if isinstance(k, str) else k[1] for k in self.geomatcher.geo.keys()
+        }
 
-        possible_datasets = [
-            x for x in get_possibles(exc, data) if x["location"] in list_loc
+    def get_providers(self, exc):
+        """
+        Return the datasets with the same name, reference product and unit as `exc`,
+        and which location is known to the geomatcher.
+
+        :param exc: a technosphere exchange
+        :type exc: dict
+        :return: list of wurst datasets, in database order
+        :rtype: list
+        """
+        return [
+            ds
+            for ds in self.index.get_many(
+                exc["name"], reference_product=exc["product"], unit=exc["unit"]
+            )
+            if ds["location"] in self.known_locations
         ]
-        possible_locations = [obj["location"] for obj in possible_datasets]
 
-        if ds["location"] in possible_locations:
-            exc["location"] = ds["location"]
-            new_exchanges.append(exc)
-            continue
+    def match_locations(
+        self, location, possible_locations, contained, exclusive, biggest_first
+    ):
+        """
+        Return the locations, among `possible_locations`, to relink a dataset located in
+        `location` to, as well as whether parts of `location` are not covered
+        by the locations selected.
+
+        :return: locations selected, and whether parts of `location` are left uncovered
+        :rtype: tuple
+        """
+        key = (location, possible_locations, contained, exclusive, biggest_first)
+
+        if key not in self.matches:
+            topology = self.geomatcher.topology
+            g = topology.resolved_row(possible_locations)
+            func = g.contained if contained else g.intersects
+
+            gis_match = func(
+                location,
+                include_self=True,
+                exclusive=exclusive,
+                biggest_first=biggest_first,
+                only=possible_locations,
+            )
 
-        possible_locations = [
-            (model.upper(), p) if p in geomatcher.iam_regions else p
-            for p in possible_locations
-        ]
+            # providers are only selected for locations that are not IAM regions
+            matched = [loc for loc in gis_match if isinstance(loc, str)]
+
+            missing_faces = False
+            if matched:
+                covered = 0
+                for loc in matched:
+                    covered |= topology[loc]
+                missing_faces = bool(topology[location] & ~covered)
+
+            self.matches[key] = (tuple(gis_match), missing_faces)
+
+        return self.matches[key]
+
+    def relink(
+        self,
+        ds,
+        exclusive=True,
+        drop_invalid=False,
+        biggest_first=False,
+        contained=True,
+    ):
+        """
+        Relink the technosphere exchanges of a dataset.
+        See :func:`relink_technosphere_exchanges` for a description of the arguments.
+
+        :param ds: the dataset whose technosphere exchanges will be modified
+        :type ds: dict
+        :return: the modified dataset
+        :rtype: dict
+        """
+        new_exchanges = []
+        iam_regions = self.geomatcher.iam_regions
+
+        if ds["location"] in iam_regions:
+            location = (self.model.upper(), ds["location"])
+        else:
+            location = ds["location"]
 
-        if len(possible_datasets) > 0:
+        for exc in ds["exchanges"]:
+            if exc["type"] != "technosphere":
+                continue
 
-            with resolved_row(possible_locations, geomatcher.geo) as g:
-                func = g.contained if contained else g.intersects
+            possible_datasets = self.get_providers(exc)
+            possible_locations = [obj["location"] for obj in possible_datasets]
 
-                if ds["location"] in geomatcher.iam_regions:
-                    location = (model.upper(), ds["location"])
-                else:
-                    location = ds["location"]
-
-                gis_match = func(
-                    location,
-                    include_self=True,
-                    exclusive=exclusive,
-                    biggest_first=biggest_first,
-                    only=possible_locations,
-                )
+            if ds["location"] in possible_locations:
+                exc["location"] = ds["location"]
+                new_exchanges.append(exc)
+                continue
 
-            kept = [
-                ds
-                for loc in gis_match
-                for ds in possible_datasets
-                if ds["location"] == loc
-            ]
+            possible_locations = tuple(
+                (self.model.upper(), p) if p in iam_regions else p
+                for p in possible_locations
+            )
+
+            if len(possible_datasets) > 0:
 
-            if kept:
-                missing_faces = geomatcher.geo[location].difference(
-                    set.union(*[geomatcher.geo[obj["location"]] for obj in kept])
+                gis_match, missing_faces = self.match_locations(
+                    location, possible_locations, contained, exclusive, biggest_first
                 )
-                if missing_faces and "RoW" in possible_locations:
-                    kept.extend(
-                        [obj for obj in possible_datasets if obj["location"] == "RoW"]
-                    )
-            elif "RoW" in possible_locations:
-                kept = [obj for obj in possible_datasets if obj["location"] == "RoW"]
 
-            if not kept and "GLO" in possible_locations:
-                kept = [obj for obj in possible_datasets if obj["location"] == "GLO"]
+                kept = [
+                    obj
+                    for loc in gis_match
+                    for obj in possible_datasets
+                    if obj["location"] == loc
+                ]
+
+                if kept:
+                    if missing_faces and "RoW" in possible_locations:
+                        kept.extend(
+                            [
+                                obj
+                                for obj in possible_datasets
+                                if obj["location"] == "RoW"
+                            ]
+                        )
+                elif "RoW" in possible_locations:
+                    kept = [
+                        obj for obj in possible_datasets if obj["location"] == "RoW"
+                    ]
 
-            if not kept:
-                if drop_invalid:
+                if not kept and "GLO" in possible_locations:
+                    kept = [
+                        obj for obj in possible_datasets if obj["location"] == "GLO"
+                    ]
+
+                if not kept:
+                    if drop_invalid:
+                        log(
+                            {
+                                "function": "relink_technosphere_exchanges",
+                                "message": self.DROPPED.format(
+                                    exc["name"], exc["product"], exc["unit"]
+                                ),
+                            },
+                            ds,
+                        )
+                        continue
+                    else:
+                        new_exchanges.append(exc)
+                        continue
+
+                allocated = allocate_inputs(exc, kept)
+
+                for obj in allocated:
                     log(
                         {
                             "function": "relink_technosphere_exchanges",
-                            "message": DROPPED.format(
-                                exc["name"], exc["product"], exc["unit"]
+                            "message": self.MESSAGE.format(
+                                exc["name"],
+                                exc["product"],
+                                exc["unit"],
+                                exc["amount"],
+                                ds["location"],
+                                obj["amount"],
+                                obj["location"],
                             ),
                         },
                         ds,
                     )
-                    continue
-                else:
-                    new_exchanges.append(exc)
-                    continue
 
-            allocated = allocate_inputs(exc, kept)
+                new_exchanges.extend(allocated)
 
-            for obj in allocated:
-                log(
-                    {
-                        "function": "relink_technosphere_exchanges",
-                        "message": MESSAGE.format(
-                            exc["name"],
-                            exc["product"],
-                            exc["unit"],
-                            exc["amount"],
-                            ds["location"],
-                            obj["amount"],
-                            obj["location"],
-                        ),
-                    },
-                    ds,
-                )
+            else:
+                new_exchanges.append(exc)
 
-            new_exchanges.extend(allocated)
+        ds["exchanges"] = [
+            exc for exc in ds["exchanges"] if exc["type"] != "technosphere"
+        ] + new_exchanges
+        return ds
 
-        else:
-            new_exchanges.append(exc)
+    def relink_many(self, datasets, **kwargs):
+        """
+        Relink the technosphere exchanges of several datasets.
+        Keyword arguments are passed to :meth:`relink`.
+
+        :param datasets: the datasets whose technosphere exchanges will be modified
+        :type datasets: iterable
+        :return: the modified datasets
+        :rtype: list
+        """
+        return [self.relink(ds, **kwargs) for ds in datasets]
 
-    ds["exchanges"] = [
-        exc for exc in ds["exchanges"] if exc["type"] != "technosphere"
-    ] + new_exchanges
-    return ds
+
+def relink_technosphere_exchanges(
+    ds,
+    data,
+    model,
+    exclusive=True,
+    drop_invalid=False,
+    biggest_first=False,
+    contained=True,
+):
+    """Find new technosphere providers based on the location of the dataset.
+    Designed to be used when the dataset's location changes, or when new datasets are added.
+    Uses the name, reference product, and unit of the exchange to filter possible inputs. These must match exactly. Searches in the list of datasets ``data``.
+    Will only search for providers contained within the location of ``ds``, unless ``contained`` is set to ``False``, all providers whose location intersects the location of ``ds`` will be used.
+    A ``RoW`` provider will be added if there is a single topological face in the location of ``ds`` which isn't covered by the location of any providing activity.
+    If no providers can be found, `relink_technosphere_exchanes` will try to add a `RoW` or `GLO` providers, in that order, if available. If there are still no valid providers, a ``InvalidLink`` exception is raised, unless ``drop_invalid`` is ``True``, in which case the exchange will be deleted.
+    Allocation between providers is done using ``allocate_inputs``; results seem strange if ``contained=False``, as production volumes for large regions would be used as allocation factors.
+    To relink several datasets of the same database, use a :class:`Relinker` instead.
+    Input arguments:
+        * ``ds``: The dataset whose technosphere exchanges will be modified.
+        * ``data``: The list of datasets to search for technosphere product providers.
+        * ``model``: The IAM model
+        * ``exclusive``: Bool, default is ``True``. Don't allow overlapping locations in input providers.
+        * ``drop_invalid``: Bool, default is ``False``. Delete exchanges for which no valid provider is available.
+        * ``biggest_first``: Bool, default is ``False``. Determines search order when selecting provider locations. Only relevant is ``exclusive`` is ``True``.
+        * ``contained``: Bool, default is ``True``. If true, only use providers whose location is completely within the ``ds`` location; otherwise use all intersecting locations.
+    Modifies the dataset in place; returns the modified dataset."""
+    return Relinker(data, model).relink(
+        ds,
+        exclusive=exclusive,
+        drop_invalid=drop_invalid,
+        biggest_first=biggest_first,
+        contained=contained,
+    )
 
 
 def allocate_inputs(exc, lst):
@@ -35,6 +35,7 @@ setup(
     include_package_data=True,
     install_requires=[
         "numpy",
+        "scipy",
         "wurst==0.3",
         "bw2io",
         "pandas",
@@ -47,6 +48,8 @@ setup(
         "pycountry",
         "cryptography",
     ],
+    # to write matrices and scenario difference files as parquet files
+    extras_require={"parquet": ["pyarrow"]},
     url="https://github.com/romainsacchi/premise",
     description="Coupling IAM output to ecoinvent LCA database ecoinvent for prospective LCA",
     classifiers=[
@@ -0,0 +1,25 @@
+from premise import cache
+
+
+def test_cache_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+
+    key = cache.get_cache_key("ecoinvent", "3.7.1", True)
+    assert key == cache.get_cache_key("ecoinvent", "3.7.1", True)
+    assert key != cache.get_cache_key("ecoinvent", "3.6", True)
+    assert cache.load_from_cache("databases", key) is None
+
+    db = [{"name": "clinker production", "exchanges": [{"amount": 1.0}]}]
+    cache.save_to_cache("databases", key, db)
+    assert cache.load_from_cache("databases", key) == db
+
+    cache.clear_cache("databases")
+    assert cache.load_from_cache("databases", key) is None
+
+
+def test_file_hash(tmp_path):
+    filepath = tmp_path / "inventory.csv"
+    filepath.write_text("name;amount\n")
+    hash_a = cache.get_file_hash(filepath)
+    filepath.write_text("name;amount;unit\n")
+    assert cache.get_file_hash(filepath) != hash_a
@@ -0,0 +1,101 @@
+from io import StringIO
+
+import numpy as np
+import xarray as xr
+from cryptography.fernet import Fernet
+
+from premise import cache
+from premise.data_collection import IAMDataCollection
+
+MIF_CONTENT = (
+    "Model;Scenario;Region;Variable;Unit;2005;2010;2015;\n"
+    "REMIND;SSP2-Base;EUR;SE|Electricity;EJ/yr;1.5;2.0;2.5;\n"
+    "REMIND;SSP2-Base;EUR;SE|Electricity|Coal;EJ/yr;0.5;N/A;0.25;\n"
+    "REMIND;SSP2-Base;CHA;SE|Electricity;EJ/yr;3;4;5;\n"
+    "REMIND;SSP2-Base;CHA;SE|Electricity;TWh/yr;5;6;7;\n"
+    "REMIND;SSP2-Base;CHA;GDP|PPP;billion US$2005/yr;10;11;12;\n"
+)
+
+
+def get_data_collection(tmp_path, key=None, use_cache=False, iam_data_cache=None):
+    iam_data = IAMDataCollection.__new__(IAMDataCollection)
+    iam_data.model = "remind"
+    iam_data.pathway = "SSP2-Base"
+    iam_data.filepath_iam_files = tmp_path
+    iam_data.key = key
+    iam_data.use_cache = use_cache
+    iam_data.iam_data_cache = {} if iam_data_cache is None else iam_data_cache
+    return iam_data
+
+
+def test_iam_data_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+
+    key = Fernet.generate_key()
+    (tmp_path / "remind_SSP2-Base.csv").write_bytes(
+        Fernet(key).encrypt(MIF_CONTENT.encode("latin-1"))
+    )
+
+    parsed = []
+
+    def parse_iam_data(self, data):
+        parsed.append(data.getvalue())
+        return xr.DataArray(
+            np.array([[[1.5, 2.0]], [[3.0, np.nan]]]),
+            coords=[
+                ("region", np.array(["CHA", "EUR"], dtype=object)),
+                ("variables", np.array(["SE|Electricity"], dtype=object)),
+                ("year", [2005, 2010]),
+            ],
+            name="value",
+        )
+
+    monkeypatch.setattr(IAMDataCollection, "parse_iam_data", parse_iam_data)
+
+    # nothing is written to disk unless the cache is used
+    iam_data_cache = {}
+    array = get_data_collection(tmp_path, key, False, iam_data_cache).get_iam_data()
+    assert parsed == [MIF_CONTENT]
+    assert not (tmp_path / "cache").exists()
+
+    # parsed data is shared by the scenarios of a database...
+    iam_data = get_data_collection(tmp_path, key, False, iam_data_cache)
+    assert iam_data.get_iam_data().equals(array)
+    assert len(parsed) == 1
+
+    # ... and reused across sessions, from an encrypted file on disk
+    get_data_collection(tmp_path, key, use_cache=True).get_iam_data()
+    assert len(parsed) == 2
+    (cached_file,) = (tmp_path / "cache" / "iam_data").iterdir()
+    assert b"SE|Electricity" not in cached_file.read_bytes()
+
+    cached = get_data_collection(tmp_path, key, use_cache=True).get_iam_data()
+    assert len(parsed) == 2
+    assert cached.equals(array)
+    assert cached.region.values.dtype == object
+
+
+def test_parse_iam_data():
+    iam_data = get_data_collection(None)
+    array = iam_data.parse_iam_data(StringIO(MIF_CONTENT))
+
+    assert list(array.region.values) == ["CHA", "EUR"]
+    assert list(array.variables.values) == ["SE|Electricity", "SE|Electricity|Coal"]
+    assert list(array.year.values) == [2005, 2010, 2015]
+
+    # values reported in two units are averaged
+    assert array.sel(region="CHA", variables="SE|Electricity", year=2010) == 5
+    assert array.sel(region="EUR", variables="SE|Electricity|Coal", year=2015) == 0.25
+    assert np.isnan(array.sel(region="EUR", variables="SE|Electricity|Coal", year=2010))
+    assert np.isnan(array.sel(region="CHA", variables="SE|Electricity|Coal")).all()
+
+
+def test_unencrypted_iam_data_is_read_from_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+    (tmp_path / "remind_SSP2-Base.mif").write_bytes(MIF_CONTENT.encode("latin-1"))
+
+    iam_data = get_data_collection(tmp_path)
+
+    assert iam_data.get_iam_data().equals(
+        iam_data.parse_iam_data(StringIO(MIF_CONTENT))
+    )
@@ -0,0 +1,167 @@
+import pytest
+from wurst import searching as ws
+
+from premise.dataset_index import ConsumerIndex, DatasetIndex, KeyIndex
+
+
+def make_dataset(name, ref, location, unit="kilogram"):
+    return {
+        "name": name,
+        "reference product": ref,
+        "location": location,
+        "unit": unit,
+        "exchanges": [],
+    }
+
+
+db = [
+    make_dataset("steel production, converter", "steel, low-alloyed", "RER"),
+    make_dataset("steel production, converter", "steel, low-alloyed", "RoW"),
+    make_dataset("clinker production", "clinker", "CH"),
+    make_dataset("steel production, electric", "steel, low-alloyed", "RER"),
+    make_dataset(
+        "electricity production, hydro",
+        "electricity, high voltage",
+        "CH",
+        "kilowatt hour",
+    ),
+]
+
+
+def test_lookups_match_wurst_searches():
+    index = DatasetIndex(db)
+
+    assert index.get_many(
+        ["steel production, electric", "steel production, converter"], location="RER"
+    ) == list(
+        ws.get_many(
+            db,
+            ws.either(
+                ws.equals("name", "steel production, electric"),
+                ws.equals("name", "steel production, converter"),
+            ),
+            ws.equals("location", "RER"),
+        )
+    )
+    assert index.get_one("clinker production", reference_product="clinker") == db[2]
+    assert index.get(
+        "steel production, converter", "steel, low-alloyed", "RoW", "kilogram"
+    ) == [db[1]]
+    assert [ds["name"] for ds in index.starting_with("steel production")] == [
+        "steel production, converter",
+        "steel production, converter",
+        "steel production, electric",
+    ]
+
+    with pytest.raises(ws.NoResults):
+        index.get_one("clinker production", location="RER")
+    with pytest.raises(ws.MultipleResults):
+        index.get_one("steel production, converter")
+
+
+def test_index_follows_database_changes():
+    data = list(db)
+    index = DatasetIndex(data)
+
+    data.append(make_dataset("clinker production", "clinker", "RoW"))
+    assert len(index.get_many("clinker production")) == 2
+
+    # as many datasets removed as appended
+    data.remove(db[2])
+    data.append(make_dataset("clinker production", "clinker", "CN"))
+    assert [ds["location"] for ds in index.get_many("clinker production")] == [
+        "RoW",
+        "CN",
+    ]
+
+    data[-1]["location"] = "IN"
+    index.rebuild()
+    assert index.get("clinker production", "clinker", "IN", "kilogram") == [data[-1]]
+
+    data = [ds for ds in data if ds["name"] != "clinker production"]
+    index.refresh(data)
+    assert index.get_many("clinker production") == []
+    assert index.starting_with("clinker") == []
+
+
+def test_consumer_index_is_updated_by_the_caller():
+    clinker = make_dataset("market for clinker", "clinker", "GLO")
+    cement = make_dataset("cement production", "cement", "CH")
+    cement["exchanges"] = [
+        {
+            "name": "market for clinker",
+            "product": "clinker",
+            "unit": "kilogram",
+            "amount": 0.8,
+            "type": "technosphere",
+        }
+    ]
+    data = [clinker, cement]
+    index = ConsumerIndex(data)
+
+    assert index.consumers("market for clinker", "clinker") == [cement]
+    assert index.consumers("market for clinker", "cement") == []
+    assert index.find(lambda key: key[2] == "kilogram") == [cement]
+
+    cement["exchanges"].pop()
+    clinker["exchanges"].append(
+        {
+            "name": "cement production",
+            "product": "cement",
+            "unit": "kilogram",
+            "amount": 0.1,
+            "type": "technosphere",
+        }
+    )
+    index.update(cement)
+    index.update(clinker)
+    assert index.consumers("market for clinker") == []
+    assert index.consumers("cement production") == [clinker]
+
+    concrete = make_dataset("concrete production", "concrete", "CH")
+    concrete["exchanges"] = list(clinker["exchanges"])
+    data.append(concrete)
+    index.add(concrete)
+    assert index.consumers("cement production") == [clinker, concrete]
+
+    data.remove(clinker)
+    index.remove(clinker)
+    assert index.consumers("cement production") == [concrete]
+
+
+def test_consumer_index_editing_reindexes_the_dataset():
+    cement = make_dataset("cement production", "cement", "CH")
+    cement["exchanges"] = [
+        {
+            "name": "market for clinker",
+            "product": "clinker",
+            "unit": "kilogram",
+            "amount": 0.8,
+            "type": "technosphere",
+        }
+    ]
+    index = ConsumerIndex([cement])
+
+    # the exchange is dropped, without being replaced
+    with index.editing(cement):
+        exc = cement["exchanges"].pop()
+    assert index.consumers("market for clinker") == []
+
+    with index.editing(cement):
+        cement["exchanges"].append(dict(exc, name="market for clinker, CH"))
+    assert index.consumers("market for clinker, CH") == [cement]
+
+
+def test_key_index_is_updated_by_the_caller():
+    data = [dict(ds, code=str(i)) for i, ds in enumerate(db)]
+    index = KeyIndex(data)
+
+    assert index.has_code("2")
+    assert index.has_key("clinker production", "clinker", "CH")
+    assert not index.has_key("clinker production", "clinker", "RER")
+
+    ds = dict(make_dataset("clinker production", "clinker", "RER"), code="5")
+    data.append(ds)
+    index.add(ds)
+    assert index.has_key("clinker production", "clinker", "RER")
+    assert index.has_code("5")
@@ -0,0 +1,172 @@
+import csv
+
+import bw2calc
+import bw2data
+import numpy as np
+from bw2data.tests import bw2test
+from scipy import sparse
+
+from premise.export import (
+    FILEPATH_BIOSPHERE_FLOWS,
+    Export,
+    get_delta_lca,
+    write_brightway_databases,
+)
+from premise.utils import copy_database, find_changed_datasets, get_delta_database
+
+
+def make_database():
+    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
+        flow = next(csv.reader(f, delimiter=";"))
+
+    def exchange(type, name, amount):
+        return {
+            "type": type,
+            "name": name,
+            "product": name,
+            "unit": "kilogram",
+            "location": "GLO",
+            "amount": amount,
+        }
+
+    db = [
+        {
+            "name": name,
+            "reference product": name,
+            "unit": "kilogram",
+            "location": "GLO",
+            "exchanges": [exchange("production", name, 1)],
+        }
+        for name in ("steel", "car")
+    ]
+    db[1]["exchanges"].append(exchange("technosphere", "steel", 0.5))
+    db[1]["exchanges"].append(
+        {
+            "type": "biosphere",
+            "name": flow[0],
+            "categories": (flow[1],),
+            "input": ("biosphere3", flow[-1]),
+            "unit": flow[3],
+            "amount": 2,
+        }
+    )
+    return db
+
+
+def test_export_matrices_to_npz(tmp_path):
+    Export(make_database(), filepath=tmp_path).export_db_to_matrices(format="npz")
+
+    A = sparse.load_npz(tmp_path / "A_matrix.npz")
+    B = sparse.load_npz(tmp_path / "B_matrix.npz")
+
+    assert np.array_equal(A.toarray(), [[1, 0], [-0.5, 1]])
+    assert B.shape[0] == 2
+    assert B[1, 0] == -2 and B.nnz == 1
+    assert (tmp_path / "A_matrix_index.csv").is_file()
+
+
+@bw2test
+def test_write_brightway_databases():
+    databases = []
+    for amount in (0.5, 0.25):
+        db = make_database()
+        db[1]["exchanges"] = db[1]["exchanges"][:2]
+        db[1]["exchanges"][1]["amount"] = amount
+        for ds in db:
+            ds["database"], ds["code"] = "ei", ds["name"]
+        databases.append(db)
+
+    write_brightway_databases(databases, ["db_2030", "db_2050"])
+
+    for name, amount in (("db_2030", 0.5), ("db_2050", 0.25)):
+        car = bw2data.get_activity((name, "car"))
+        assert [(exc.input.key, exc["amount"]) for exc in car.technosphere()] == [
+            ((name, "steel"), amount)
+        ]
+        assert len(bw2data.Database(name)) == 2
+        assert bw2data.Database(name).search("steel")[0].key == (name, "steel")
+
+
+@bw2test
+def test_write_brightway_databases_cleans_up_on_failure():
+    databases = []
+    for location in ("GLO", "XYZ"):
+        db = make_database()
+        db[1]["exchanges"] = db[1]["exchanges"][:2]
+        for ds in db:
+            ds["database"], ds["code"], ds["location"] = "ei", ds["name"], location
+        databases.append(db)
+    # linked to a database that does not exist: fails when processing
+    databases[1][1]["exchanges"][1]["input"] = ("missing", "steel")
+
+    try:
+        write_brightway_databases(databases, ["db_2030", "db_2050"])
+    except Exception:
+        pass
+    else:
+        raise AssertionError("writing should fail")
+
+    assert "db_2030" not in bw2data.databases and "db_2050" not in bw2data.databases
+    assert not any(key[0] in ("db_2030", "db_2050") for key in bw2data.mapping)
+    assert "XYZ" not in bw2data.geomapping
+    assert len(bw2data.Database("db_2030")) == 0
+    # the input data is not modified
+    assert databases[0][0]["database"] == "ei"
+    assert "input" not in databases[0][1]["exchanges"][1]
+
+
+@bw2test
+def test_delta_lca_matches_full_database():
+    db = make_database()
+    db[1]["exchanges"] = db[1]["exchanges"][:2]
+    db.append(
+        {
+            "name": "coal",
+            "reference product": "coal",
+            "unit": "kilogram",
+            "location": "GLO",
+            "exchanges": [dict(db[0]["exchanges"][0], name="coal", product="coal")],
+        }
+    )
+    for ds in db:
+        ds["database"], ds["code"] = "ei", ds["name"]
+
+    scenario_db = copy_database(db)
+    scenario_db[0]["exchanges"].append(
+        dict(db[1]["exchanges"][1], name="coal", product="coal", amount=3)
+    )
+    (codes,) = find_changed_datasets(db, [scenario_db])
+    delta, links = get_delta_database(scenario_db, codes, "delta", "base")
+
+    write_brightway_databases([db, delta, scenario_db], ["base", "delta", "full"])
+    bw2data.databases["delta"]["premise delta"] = {"base": "base", "links": links}
+    bw2data.databases.flush()
+
+    assert [ds["code"] for ds in delta] == ["steel"]
+    full = bw2calc.LCA({("full", "car"): 1})
+    full.lci()
+    lca = get_delta_lca("delta", {("base", "car"): 1})
+    # the car of the base database uses the steel, and therefore the coal, of the scenario
+    for code in ("steel", "car", "coal"):
+        assert np.isclose(
+            lca.supply_array[
+                lca.product_dict[("delta" if code in codes else "base", code)]
+            ],
+            full.supply_array[full.product_dict[("full", code)]],
+        )
+
+
+def test_export_to_simapro_in_parallel(tmp_path):
+    db = make_database()
+    for i, ds in enumerate(db):
+        ds["code"] = str(i)
+
+    Export(db, "remind", "SSP2", 2030, tmp_path / "serial").export_db_to_simapro()
+    Export(db, "remind", "SSP2", 2030, tmp_path / "parallel").export_db_to_simapro(
+        n_jobs=2
+    )
+
+    filename = "simapro_export_remind_SSP2_2030.csv"
+    serial = (tmp_path / "serial" / filename).read_text(encoding="utf-8")
+    assert "steel {GLO}| steel | Cut-off, U" in serial
+    assert serial == (tmp_path / "parallel" / filename).read_text(encoding="utf-8")
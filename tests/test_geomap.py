@@ -1,4 +1,6 @@
-from premise.geomap import Geomap
+import pickle
+
+from premise.geomap import Geomap, Topology, build_location_faces, get_topology
 
 geomap = Geomap(model="remind")
 
@@ -23,3 +25,36 @@ def test_REMIND_to_ecoinvent():
 def test_REMIND_to_ecoinvent_contained():
     # RU is not contained in EUR
     assert "RU" not in geomap.iam_to_ecoinvent_location("EUR", contained=True)
+
+
+def test_geomap_is_shared_per_model():
+    assert Geomap(model="remind") is geomap
+    assert Geomap(model="image") is not geomap
+
+    locations = geomap.iam_to_ecoinvent_location("EUR")
+    locations.append("XYZ")
+    assert "XYZ" not in geomap.iam_to_ecoinvent_location("EUR")
+
+
+def test_geomap_can_be_pickled():
+    assert pickle.loads(pickle.dumps(geomap)) is geomap
+
+
+def test_topology_matches_geomatcher():
+    topology = get_topology()
+
+    assert topology.contained(("REMIND", "EUR")) == geomap.geo.contained(
+        ("REMIND", "EUR")
+    )
+    assert topology.within("CH") == geomap.geo.within("CH")
+    assert topology.intersects("RER", exclusive=True) == geomap.geo.intersects(
+        "RER", exclusive=True
+    )
+    assert "RoW" in topology.resolved_row(["DE", "FR"]).within("JP")
+
+
+def test_build_location_faces(tmp_path):
+    filepath = tmp_path / "location_faces.npz"
+    topology = build_location_faces(filepath)
+
+    assert Topology.load(filepath).topology == topology.topology
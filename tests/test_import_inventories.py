@@ -1,14 +1,23 @@
 # content of test_activity_maps.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 import pytest
+from bw2io.importers.base_lci import LCIImporter
 
-from premise import DATA_DIR, INVENTORY_DIR
+from premise import DATA_DIR, INVENTORY_DIR, cache, inventory_imports
+from premise.dataset_index import KeyIndex
 from premise.inventory_imports import (
     BaseInventoryImport,
     BiofuelInventory,
     CarculatorInventory,
     CarmaCCSInventory,
+    VEHICLE_INVENTORIES,
+    create_region_inventories,
+    load_inventories,
+    load_vehicle_inventory,
 )
 
 FILEPATH_CARMA_INVENTORIES = INVENTORY_DIR / "lci-Carma-CCS.xlsx"
@@ -112,6 +121,200 @@ def test_load_biofuel():
     assert len(bio.import_db.data) == 36
 
 
+def get_suppliers(import_db, product):
+    """
+    Return a source database with a supplier, of reference product `product`,
+    for each technosphere exchange of `import_db` that is not supplied by `import_db`.
+    """
+    keys = {(ds["name"], ds["location"], ds["unit"]) for ds in import_db.data}
+    suppliers = {
+        (exc["name"], exc["location"], exc["unit"])
+        for ds in import_db.data
+        for exc in ds["exchanges"]
+        if exc["type"] == "technosphere"
+    } - keys
+
+    return [
+        {
+            "code": str(i),
+            "name": name,
+            "reference product": product,
+            "location": location,
+            "unit": unit,
+            "database": "ecoinvent",
+            "exchanges": [],
+        }
+        for i, (name, location, unit) in enumerate(sorted(suppliers))
+    ]
+
+
+def test_linked_inventory_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    db, version = get_db()
+    probe = BiofuelInventory(db, version, FILEPATH_BIOFUEL_INVENTORIES)
+    probe.link_inventory()
+
+    bio = BiofuelInventory(
+        get_suppliers(probe.import_db, "first product"),
+        version,
+        FILEPATH_BIOFUEL_INVENTORIES,
+        use_cache=True,
+    )
+    bio.prepare_inventory()
+    # the reference products are looked up in the source database of each import
+    source_db = get_suppliers(probe.import_db, "second product")
+    cached = BiofuelInventory(
+        source_db, version, FILEPATH_BIOFUEL_INVENTORIES, use_cache=True
+    )
+
+    assert bio.cache_key is not None and cached.is_linked
+    assert not BiofuelInventory(
+        db, "3.6", FILEPATH_BIOFUEL_INVENTORIES, use_cache=True
+    ).is_linked
+
+    cached.prepare_inventory()
+    uncached = BiofuelInventory(source_db, version, FILEPATH_BIOFUEL_INVENTORIES)
+    uncached.prepare_inventory()
+
+    def get_products(inventory):
+        return [
+            exc.get("product")
+            for ds in inventory.import_db.data
+            for exc in ds["exchanges"]
+        ]
+
+    assert get_products(cached) == get_products(uncached)
+    assert get_products(cached) != get_products(bio)
+
+
+def test_importers_share_the_key_index():
+    db, version = get_db()
+    key_index = KeyIndex(db)
+    new_ds = dict(db[0], code="new code", location="CH")
+
+    for _ in range(2):
+        importer = BaseInventoryImport(
+            db, version, Path("."), import_db=LCIImporter("test"), key_index=key_index
+        )
+        importer.import_db.data = [dict(new_ds)]
+        importer.merge_inventory()
+
+    assert [ds["location"] for ds in db] == ["IAI Area, Africa", "CH"]
+
+
+def test_load_inventories_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    db, version = get_db()
+    inventories = [
+        (CarmaCCSInventory, FILEPATH_CARMA_INVENTORIES),
+        (BiofuelInventory, FILEPATH_BIOFUEL_INVENTORIES),
+    ]
+
+    loaded = load_inventories(inventories, version, n_jobs=2)
+
+    for (importer, path), import_db in zip(inventories, loaded):
+        assert import_db.data == importer(db, version, path).import_db.data
+
+
+def test_migrate_inventory():
+    db, version = get_db()
+    testpath = Path("testfile")
+    open(testpath, "w")
+    dbc = BaseInventoryImport(db, version, testpath)
+    exc = {
+        "name": "Market for water, deionised",
+        "reference product": "water, deionised",
+        "location": "RoW",
+        "type": "technosphere",
+    }
+    dbc.import_db = LCIImporter("test")
+    dbc.import_db.data = [dict(db[0], exchanges=[exc])]
+
+    dbc.migrate_inventory("37", "35")
+
+    assert exc["name"] == "market for water, deionised, from tap water, at user"
+    assert exc["reference product"] == "water, deionised, from tap water, at user"
+    assert exc["location"] == "RoW"
+    assert dbc.import_db.data[0]["name"] == "fake activity"
+
+    testpath.unlink()
+
+
+def test_vehicle_inventories_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", tmp_path)
+    db, _ = get_db()
+    created = []
+
+    def create():
+        created.append(1)
+        import_db = LCIImporter("carculator export")
+        import_db.data = db
+        return import_db
+
+    first = load_vehicle_inventory("EUR", create)
+    first.data[0]["name"] = "modified"
+    assert load_vehicle_inventory("EUR", create).data == get_db()[0]
+
+    VEHICLE_INVENTORIES.clear()
+    assert load_vehicle_inventory("EUR", create).db_name == "carculator export"
+    assert len(created) == 1
+
+
+class RegionCarculatorInventory(CarculatorInventory):
+    """
+    Carculator importer whose region inventories only hold the ecoinvent
+    locations of the region, as found by the geomap of the process.
+    """
+
+    def load_inventory(self, path):
+        return LCIImporter("carculator export")
+
+    def create_region_inventory(
+        self, fleet_array, liquid_fuel_blend, gas_fuel_blend, region
+    ):
+        import_db = LCIImporter("carculator export")
+        import_db.data = [
+            {
+                "name": f"transport, {region}",
+                "fleet": fleet_array,
+                "locations": self.geomap.iam_to_ecoinvent_location(region),
+            }
+        ]
+        return import_db
+
+
+def test_create_region_inventories_in_parallel(monkeypatch):
+    # spawned processes receive the importer pickled
+    monkeypatch.setattr(
+        inventory_imports,
+        "ProcessPoolExecutor",
+        partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("spawn")),
+    )
+    db, _ = get_db()
+    importer = RegionCarculatorInventory(
+        database=db,
+        version="3.7.1",
+        fleet_file=None,
+        model="remind",
+        year=2020,
+        regions=["EUR", "CHA"],
+        iam_data=None,
+    )
+
+    inventories = create_region_inventories(
+        importer, ["EUR", "CHA"], "fleet", None, None, n_jobs=2
+    )
+
+    assert [i.data[0]["name"] for i in inventories] == [
+        "transport, EUR",
+        "transport, CHA",
+    ]
+    assert [i.data[0]["locations"] for i in inventories] == [
+        importer.geomap.iam_to_ecoinvent_location(region) for region in ["EUR", "CHA"]
+    ]
+    assert importer.db is db
+
+
 # def test_load_carculator():
 #    db, version = get_db()
 #    carc = CarculatorInventory(
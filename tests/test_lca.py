@@ -0,0 +1,125 @@
+import csv
+
+import numpy as np
+
+from premise.ecoinvent_modification import NewDatabase
+from premise.export import FILEPATH_BIOSPHERE_FLOWS
+from premise.lca import LCA, load_characterization_factors
+
+
+def make_database(flow):
+    def exchange(type, name, amount):
+        return {
+            "type": type,
+            "name": name,
+            "product": name,
+            "unit": "kilogram",
+            "location": "GLO",
+            "amount": amount,
+        }
+
+    def emission(amount):
+        return {
+            "type": "biosphere",
+            "name": flow[0],
+            "categories": (flow[1], flow[2]),
+            "input": ("biosphere3", flow[-1]),
+            "amount": amount,
+        }
+
+    steel = {
+        "name": "steel",
+        "reference product": "steel",
+        "unit": "kilogram",
+        "location": "GLO",
+        "exchanges": [exchange("production", "steel", 1), emission(4)],
+    }
+    car = {
+        "name": "car",
+        "reference product": "car",
+        "unit": "kilogram",
+        "location": "GLO",
+        "exchanges": [
+            exchange("production", "car", 1),
+            exchange("technosphere", "steel", 0.5),
+            emission(2),
+        ],
+    }
+    return [steel, car]
+
+
+def test_lca_scores_several_functional_units(tmp_path):
+    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
+        flow = next(csv.reader(f, delimiter=";"))
+
+    filepath = tmp_path / "method.csv"
+    with open(filepath, "w") as f:
+        f.write("name;compartment;subcompartment;unit;factor\n")
+        f.write(";".join(flow[:4] + ["3"]) + "\n")
+
+    lca = LCA(make_database(flow))
+    scores = lca.calculate(
+        [
+            {("car", "car", "kilogram", "GLO"): 1},
+            {("steel", "steel", "kilogram", "GLO"): 2},
+        ],
+        [load_characterization_factors(filepath)],
+    )
+
+    assert np.allclose(scores, [[(2 + 0.5 * 4) * 3], [2 * 4 * 3]])
+
+
+def test_lca_warm_started_from_base_database():
+    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
+        flow = next(csv.reader(f, delimiter=";"))
+
+    base = LCA(make_database(flow))
+
+    db = make_database(flow)
+    db[1]["exchanges"][1]["amount"] = 0.8
+    db[1]["exchanges"][1]["name"] = db[1]["exchanges"][1]["product"] = "iron"
+    db.append(
+        {
+            "name": "iron",
+            "reference product": "iron",
+            "unit": "kilogram",
+            "location": "GLO",
+            "exchanges": [
+                dict(db[1]["exchanges"][1], type="production", amount=2),
+                dict(db[1]["exchanges"][0], type="technosphere", amount=0.1),
+            ],
+        }
+    )
+    lca = LCA(db)
+    fu = [{("car", "car", "kilogram", "GLO"): 1}]
+
+    supply = lca.solve(fu, base)
+
+    assert lca.solver is None
+    assert np.allclose(supply, LCA(db).solve(fu))
+
+
+def test_new_database_scores_follow_database_changes(tmp_path):
+    with open(FILEPATH_BIOSPHERE_FLOWS) as f:
+        flow = next(csv.reader(f, delimiter=";"))
+
+    method = tmp_path / "method.csv"
+    with open(method, "w") as f:
+        f.write("name;compartment;subcompartment;unit;factor\n")
+        f.write(";".join(flow[:4] + ["1"]) + "\n")
+
+    db = make_database(flow)
+    # a duplicate dataset would make the technosphere matrix singular
+    db.append(dict(db[0]))
+    ndb = NewDatabase.__new__(NewDatabase)
+    ndb.db = make_database(flow)
+    ndb.scenarios = [
+        {"model": "remind", "pathway": "SSP2-Base", "year": 2030, "database": db}
+    ]
+    ndb.lca = {}
+    fu = {("car", "car", "kilogram", "GLO"): 1}
+
+    assert np.allclose(ndb.calculate(fu, method).values, [[[4]]])
+
+    ndb.scenarios[0]["database"][1]["exchanges"][1]["amount"] = 1
+    assert np.allclose(ndb.calculate(fu, method).values, [[[6]]])
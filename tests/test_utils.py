@@ -0,0 +1,205 @@
+import pandas as pd
+
+from premise.utils import (
+    Relinker,
+    add_modified_tags,
+    build_superstructure_db,
+    copy_database,
+    find_changed_datasets,
+    get_delta_database,
+)
+
+
+def make_dataset(name, location, exchanges=None):
+    return {
+        "name": name,
+        "reference product": name,
+        "location": location,
+        "unit": "kilogram",
+        "exchanges": [
+            {
+                "name": name,
+                "product": name,
+                "unit": "kilogram",
+                "location": location,
+                "amount": 1,
+                "type": "production",
+                "production volume": 1,
+            }
+        ]
+        + (exchanges or []),
+    }
+
+
+def make_exchange(name):
+    return {
+        "name": name,
+        "product": name,
+        "unit": "kilogram",
+        "amount": 2,
+        "type": "technosphere",
+        "location": "GLO",
+    }
+
+
+def test_copy_database_shares_no_dataset():
+    db = [make_dataset("steel", "RER", [make_exchange("iron")])]
+
+    copy = copy_database(db)
+    copy[0]["exchanges"][1]["location"] = "CN"
+    copy[0]["exchanges"].append(make_exchange("coal"))
+
+    assert copy[0] is not db[0]
+    assert db[0]["exchanges"][1]["location"] == "GLO"
+    assert len(db[0]["exchanges"]) == 2
+
+
+def test_relinker_finds_local_providers():
+    db = [
+        make_dataset("steel", "DE"),
+        make_dataset("steel", "FR"),
+        make_dataset("steel", "GLO"),
+        make_dataset("coal", "GLO"),
+    ]
+    relinker = Relinker(db, "remind")
+
+    de, eur, jp = relinker.relink_many(
+        make_dataset("car", location, [make_exchange("steel"), make_exchange("coal")])
+        for location in ("DE", "EUR", "JP")
+    )
+
+    def inputs(ds):
+        return [
+            (exc["name"], exc["location"], exc["amount"])
+            for exc in ds["exchanges"]
+            if exc["type"] == "technosphere"
+        ]
+
+    assert inputs(de) == [("steel", "DE", 2), ("coal", "GLO", 2)]
+    assert inputs(eur) == [("steel", "DE", 1), ("steel", "FR", 1), ("coal", "GLO", 2)]
+    assert inputs(jp) == [("steel", "GLO", 2), ("coal", "GLO", 2)]
+    # matched locations are not shared between relinkers
+    assert relinker.matches and not Relinker(db, "remind").matches
+
+
+def make_superstructure_inputs():
+    db = [make_dataset("steel", "GLO"), make_dataset("car", "GLO")]
+    db[1]["exchanges"].append(make_exchange("steel"))
+    for ds in db:
+        ds["database"] = "ei"
+
+    scenario_db = copy_database(db)
+    scenario_db[1]["exchanges"][1]["amount"] = 1.5
+    scenario_db.append(make_dataset("truck", "GLO", [make_exchange("steel")]))
+    scenario_db[-1]["database"] = "ei"
+    scenarios = [
+        {"database": scenario_db, "model": "remind", "pathway": "SSP2", "year": 2030}
+    ]
+    return db, scenarios
+
+
+def test_superstructure_db_lists_changed_exchanges(tmp_path):
+    db, scenarios = make_superstructure_inputs()
+
+    new_db = build_superstructure_db(db, scenarios, "ei", tmp_path)
+
+    diff = pd.read_excel(next(tmp_path.glob("scenario_diff_*.xlsx")), header=1)
+    rows = {
+        (r["from activity name"], r["to activity name"]): (
+            r["original"],
+            r["remind - SSP2 - 2030"],
+        )
+        for _, r in diff.iterrows()
+    }
+    assert rows == {
+        ("steel", "car"): (2, 1.5),
+        ("steel", "truck"): (0, 2),
+        ("truck", "truck"): (1, 1),
+    }
+    assert [ds["name"] for ds in new_db] == ["steel", "car", "truck"]
+
+
+def test_scenario_difference_file_in_csv(tmp_path):
+    db, scenarios = make_superstructure_inputs()
+
+    build_superstructure_db(db, scenarios, "ei", tmp_path, file_format="csv")
+
+    diff = pd.read_csv(next(tmp_path.glob("scenario_diff_*.csv")), sep=";")
+    assert list(diff.columns[-2:]) == ["original", "remind - SSP2 - 2030"]
+    assert len(diff) == 3
+    assert not list(tmp_path.glob("*.xlsx"))
+
+
+def test_add_modified_tags():
+    db = [
+        make_dataset("steel", "GLO", [make_exchange("coal")]),
+        make_dataset("coal", "GLO"),
+        make_dataset("iron", "GLO"),
+    ]
+    for i, ds in enumerate(db):
+        ds["code"] = str(i)
+
+    scenario_db = copy_database(db)
+    scenario_db[0]["exchanges"][1]["amount"] = 3
+    scenario_db[1]["exchanges"].append(make_exchange("steel"))
+    scenario_db[2] = make_dataset("hydrogen", "GLO")
+    scenario_db[2]["code"] = "3"
+    scenarios = [{"database": scenario_db}]
+
+    add_modified_tags(db, scenarios)
+
+    assert [
+        [exc.get("modified", False) for exc in ds["exchanges"]] for ds in scenario_db
+    ] == [[False, True], [False, True], [False]]
+    assert scenario_db[2]["modified"] and "modified" not in scenario_db[0]
+    assert scenarios[0]["changes"] == {
+        "new activities": 1,
+        "modified activities": 2,
+        "removed activities": 1,
+        "new exchanges": 1,
+        "modified exchanges": 1,
+        "removed exchanges": 0,
+    }
+
+
+def test_delta_database_links_unchanged_datasets_to_base():
+    db = [
+        make_dataset("coal", "GLO"),
+        make_dataset("steel", "GLO", [make_exchange("coal")]),
+        make_dataset("car", "GLO", [make_exchange("steel")]),
+    ]
+    for ds in db:
+        ds["code"], ds["database"] = ds["name"], "ei"
+
+    scenario_db = copy_database(db)
+    scenario_db[1]["exchanges"][1]["amount"] = 1.5
+
+    (codes,) = find_changed_datasets(db, [scenario_db])
+    delta, links = get_delta_database(scenario_db, codes, "scenario", "base")
+
+    # the car is unchanged: it stays in the base, and its link to the steel is returned
+    assert codes == {"steel"}
+    assert [ds["code"] for ds in delta] == ["steel"]
+    assert [exc["input"] for exc in delta[0]["exchanges"]] == [
+        ("scenario", "steel"),
+        ("base", "coal"),
+    ]
+    assert links == [("car", "steel")]
+    assert "input" not in scenario_db[1]["exchanges"][1]
+
+
+def test_delta_database_of_changed_upstream_market():
+    consumers = [f"consumer {i}" for i in range(50)]
+    db = [make_dataset("electricity", "GLO"), make_dataset("coal", "GLO")]
+    db += [make_dataset(c, "GLO", [make_exchange("electricity")]) for c in consumers]
+    for ds in db:
+        ds["code"], ds["database"] = ds["name"], "ei"
+
+    scenario_db = copy_database(db)
+    scenario_db[0]["exchanges"].append(make_exchange("coal"))
+
+    (codes,) = find_changed_datasets(db, [scenario_db])
+    delta, links = get_delta_database(scenario_db, codes, "scenario", "base")
+
+    assert [ds["code"] for ds in delta] == ["electricity"]
+    assert links == sorted((c, "electricity") for c in consumers)